@@ -71,10 +71,14 @@ if __name__ == "__main__":
             make_results=vivarium_csu_ltbi.tools.cli:make_results
             make_specs=vivarium_csu_ltbi.tools.cli:make_specs
             build_ltbi_artifact=vivarium_csu_ltbi.tools.build_ltbi_artifact:build_artifact
+            benchmark_ltbi=vivarium_csu_ltbi.tools.benchmark:benchmark_ltbi
+            build_synthetic_ltbi_artifact=vivarium_csu_ltbi.tools.synthetic_artifact:build_synthetic_ltbi_artifact
+            run_branched_ltbi=vivarium_csu_ltbi.tools.branching:run_branched_ltbi
             get_ltbi_incidence_input_data=vivarium_csu_ltbi.data.cli:get_ltbi_incidence_input_data
             get_ltbi_incidence_parallel=vivarium_csu_ltbi.data.cli:get_ltbi_incidence_parallel
             restart_ltbi_incidence_parallel=vivarium_csu_ltbi.data.cli:restart_ltbi_incidence_parallel
             get_household_tb_input_data=vivarium_csu_ltbi.data.cli:get_household_tb_input_data
             get_household_tb_parallel=vivarium_csu_ltbi.data.cli:get_household_tb_parallel
+            estimate_treatment_adherence=vivarium_csu_ltbi.data.ltbi_tx_efficacy_and_adherence_model:estimate_treatment_adherence
         '''
     )
@@ -5,3 +5,7 @@ from .observers import (HouseholdTuberculosisDisabilityObserver,
                         HouseholdTuberculosisMortalityObserver)
 from .treatment import LTBITreatmentCoverage
 from .intervention import LTBITreatmentScaleUp
+from .instrumentation import Instrumentation
+from .cache import PipelineCache
+from .categories import CategoricalStates
+from .exposure import DynamicHouseholdTuberculosisExposure
@@ -0,0 +1,105 @@
+from typing import Optional
+
+import pandas as pd
+
+from vivarium_csu_ltbi.components.categories import STATE_CATEGORIES, get_categorical_states
+
+
+class CachedPipeline:
+    """Memoizes the values a pipeline produces for simulants until it is
+    invalidated or the simulation clock moves.
+
+    The pipeline must produce a ``pd.Series``. Values for simulants that
+    were not requested before are computed on demand, passed through
+    ``transform`` and added to the cache.
+
+    """
+
+    def __init__(self, pipeline, clock, transform=None):
+        self.pipeline = pipeline if transform is None else lambda index: transform(pipeline(index))
+        self.clock = clock
+        self._values = None
+        self._time = None
+
+    def __call__(self, index):
+        if self._values is None or self._time != self.clock():
+            self._values = self.pipeline(index)
+            self._time = self.clock()
+        else:
+            missing = index.difference(self._values.index)
+            if len(missing):
+                self._values = pd.concat([self._values, self.pipeline(missing)])
+        # Readers get their own copy, as from the pipeline itself, so changes
+        # they make do not reach the other readers.
+        if index.equals(self._values.index):
+            return self._values.copy()
+        return self._values.loc[index]
+
+    def invalidate(self):
+        self._values = None
+
+
+class PipelineCache:
+    """Shares the values of expensive pipelines between the components
+    that read them in the same phase of a time step.
+
+    Cached values are dropped at the start of each time step, after
+    simulants age and are born in the ``time_step`` event and at the end of
+    the simulation. Components that change the state a pipeline depends on
+    must invalidate it themselves. Values of state pipelines are converted
+    to the types configured by the ``CategoricalStates`` component.
+
+    """
+
+    @property
+    def name(self):
+        return 'pipeline_cache'
+
+    def __init__(self):
+        self.pipelines = {}
+
+    def setup(self, builder):
+        builder.event.register_listener('time_step__prepare', self.on_event, priority=0)
+        builder.event.register_listener('time_step', self.on_event, priority=9)
+        builder.event.register_listener('simulation_end', self.on_event, priority=0)
+
+    def get_value(self, builder, name):
+        if name not in self.pipelines:
+            transform = None
+            if name in STATE_CATEGORIES:
+                categorical_states = get_categorical_states(builder)
+                transform = lambda values: categorical_states.convert(values, name)
+            self.pipelines[name] = CachedPipeline(builder.value.get_value(name), builder.time.clock(), transform)
+        return self.pipelines[name]
+
+    def invalidate(self, name):
+        if name in self.pipelines:
+            self.pipelines[name].invalidate()
+
+    def get_checkpoint_state(self):
+        return {}
+
+    def set_checkpoint_state(self, state):
+        self.on_event(None)
+
+    def on_event(self, event):
+        for pipeline in self.pipelines.values():
+            pipeline.invalidate()
+
+
+def get_pipeline_cache(builder) -> Optional[PipelineCache]:
+    """Returns the ``pipeline_cache`` component, or ``None`` if the model
+    specification does not include one."""
+    try:
+        return builder.components.get_component('pipeline_cache')
+    except ValueError:
+        return None
+
+
+def get_value(builder, name):
+    """Returns the pipeline ``name`` through the pipeline cache, or directly
+    from the value system if the model specification has no cache."""
+    pipeline_cache = get_pipeline_cache(builder)
+    if pipeline_cache is None:
+        return builder.value.get_value(name)
+    return pipeline_cache.get_value(builder, name)
@@ -0,0 +1,66 @@
+import pandas as pd
+
+from vivarium_csu_ltbi import globals as ltbi_globals
+
+STATE_CATEGORIES = {
+    ltbi_globals.TUBERCULOSIS_AND_HIV: ltbi_globals.HIV_TB_STATES,
+    f'previous_{ltbi_globals.TUBERCULOSIS_AND_HIV}': ltbi_globals.HIV_TB_STATES,
+    'treatment_type': ltbi_globals.TREATMENT_TYPES,
+    f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure': ltbi_globals.HOUSEHOLD_TUBERCULOSIS_EXPOSURE_CATEGORIES,
+    f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}_exposure': ltbi_globals.HOUSEHOLD_TUBERCULOSIS_EXPOSURE_CATEGORIES,
+    'ltbi_treatment.exposure': ltbi_globals.TREATMENT_GROUPS,
+}
+
+
+class CategoricalStates:
+    """Optionally stores the LTBI state columns and exposure values as
+    categoricals with the fixed category sets in ``STATE_CATEGORIES``.
+
+    With ``categorical_states.enabled`` the state columns take one byte per
+    simulant and comparisons against a state run on the integer codes.
+    Values outside the category set become null, so every component that
+    writes one of these columns converts its update with ``convert``. The
+    component must be listed before the other LTBI components in the model
+    specification so the option is read before they set up.
+
+    """
+
+    configuration_defaults = {
+        'categorical_states': {
+            'enabled': False,
+        }
+    }
+
+    @property
+    def name(self):
+        return 'categorical_states'
+
+    def __init__(self):
+        self.enabled = False
+
+    def setup(self, builder):
+        self.enabled = builder.configuration.categorical_states.enabled
+
+    def convert(self, values, name):
+        """Converts a series of state values to the categorical type of
+        ``name`` if categorical states are enabled."""
+        if not self.enabled:
+            return values
+        categories = pd.Index(STATE_CATEGORIES[name])
+        codes = categories.get_indexer(values)
+        return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=values.index, name=values.name)
+
+    def initial(self, value, index, name):
+        """Builds a series of ``value`` for the simulants in ``index`` with
+        the type of ``name``. Placeholder values outside the categories,
+        such as an empty previous state, are null when categorical."""
+        return self.convert(pd.Series(value, index=index, name=name), name)
+
+
+def get_categorical_states(builder) -> CategoricalStates:
+    """Returns the ``categorical_states`` component, or a disabled one that
+    leaves values unchanged if the model specification does not include it."""
+    try:
+        return builder.components.get_component('categorical_states')
+    except ValueError:
+        return CategoricalStates()
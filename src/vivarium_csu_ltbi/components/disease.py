@@ -8,6 +8,8 @@ from vivarium_public_health.disease import DiseaseState, SusceptibleState, RateT
 from vivarium_public_health.disease.model import VivariumError
 
 import vivarium_csu_ltbi.globals as ltbi_globals
+from vivarium_csu_ltbi.components.categories import get_categorical_states
+from vivarium_csu_ltbi.components.instrumentation import instrumented
 
 
 def wrap_data_getter(id):
@@ -22,7 +24,19 @@ class BetterDiseaseModel(Machine):
     """FIXME: This class used to extend DiseaseModel itself, but the population
               initializer has an additional dependency now. To facilitate
               declaring it, DiseaseModel itself is reproduced here.
-              This is a hammer."""
+              This is a hammer.
+
+    Disease transitions can run on a coarser clock than the simulation
+    with ``disease_transitions.interval``. Transitions are then evaluated
+    once every ``interval`` time steps, and at the last step of each year so
+    annual outputs keep their boundaries, with the transition
+    probabilities of all the steps since the last evaluation."""
+
+    configuration_defaults = {
+        'disease_transitions': {
+            'interval': 1,
+        }
+    }
 
     def __init__(self, cause, initial_state=None, get_data_functions=None, cause_type="cause", **kwargs):
         super().__init__(cause, **kwargs)
@@ -43,6 +57,13 @@ class BetterDiseaseModel(Machine):
     def setup(self, builder):
         super().setup(builder)
 
+        self.categorical_states = get_categorical_states(builder)
+        self.transition_interval = builder.configuration.disease_transitions.interval
+        if self.transition_interval < 1:
+            raise ValueError(f'disease_transitions.interval must be at least 1, not {self.transition_interval}.')
+        self.step_size_getter = builder.time.step_size()
+        self.steps_since_transition = 0
+
         self.configuration_age_start = builder.configuration.population.age_start
         self.configuration_age_end = builder.configuration.population.age_end
 
@@ -71,8 +92,6 @@ class BetterDiseaseModel(Machine):
         builder.event.register_listener('time_step__cleanup', self.on_time_step_cleanup)
 
     def on_initialize_simulants(self, pop_data):
-        population = self.population_view.subview(['age', 'sex']).get(pop_data.index)
-
         assert self.initial_state in {s.state_id for s in self.states}
 
         # FIXME: this is a hack to figure out whether or not we're at the simulation start based on the fact that the
@@ -91,24 +110,38 @@ class BetterDiseaseModel(Machine):
             else:
                 state_names, weights_bins = self.get_state_weights(pop_data.index, "prevalence")
 
-        if state_names and not population.empty:
+        if state_names and len(pop_data.index):
             # only do this if there are states in the model that supply prevalence data
-            population['sex_id'] = population.sex.apply({'Male': 1, 'Female': 2}.get)
-
-            condition_column = self.assign_initial_status_to_simulants(population, state_names, weights_bins,
-                                                                       self.randomness.get_draw(population.index))
-
-            condition_column = condition_column.rename(columns={'condition_state': self.state_column})
+            condition_column = self.assign_initial_status_to_simulants(pop_data.index, state_names, weights_bins,
+                                                                       self.randomness.get_draw(pop_data.index))
+            condition_column = self.categorical_states.convert(condition_column.rename(self.state_column),
+                                                               self.state_column)
         else:
-            condition_column = pd.Series(self.initial_state, index=population.index, name=self.state_column)
+            condition_column = self.categorical_states.initial(self.initial_state, pop_data.index,
+                                                               self.state_column)
         self.population_view.update(condition_column)
 
+    @instrumented
     def on_time_step(self, event):
+        self.steps_since_transition += 1
+        last_step_of_year = (event.time + self.step_size_getter()).year != event.time.year
+        if self.steps_since_transition < self.transition_interval and not last_step_of_year:
+            return
+
+        # The rate transitions read the number of steps they cover from
+        # steps_since_transition.
         self.transition(event.index, event.time)
+        self.steps_since_transition = 0
 
     def on_time_step_cleanup(self, event):
         self.cleanup(event.index, event.time)
 
+    def get_checkpoint_state(self):
+        return {'steps_since_transition': self.steps_since_transition}
+
+    def set_checkpoint_state(self, state):
+        self.steps_since_transition = state['steps_since_transition']
+
     def load_cause_specific_mortality_rate_data(self, builder):
         if 'cause_specific_mortality_rate' not in self._get_data_functions:
             only_morbid = builder.data.load(f'cause.{self.cause}.restrictions')['yld_only']
@@ -136,27 +169,23 @@ class BetterDiseaseModel(Machine):
         if not states:
             return states, None
 
-        weights = [getattr(s, f'{prevalence_type}')(pop_index) for s in states]
-        for w in weights:
-            w.reset_index(inplace=True, drop=True)
-        weights += ((1 - np.sum(weights, axis=0)), )
-
-        weights = np.array(weights).T
-        weights_bins = np.cumsum(weights, axis=1)
+        # One column per state plus the initial state, filled in place.
+        weights_bins = np.empty((len(pop_index), len(states) + 1))
+        for i, state in enumerate(states):
+            weights_bins[:, i] = getattr(state, f'{prevalence_type}')(pop_index).values
+        weights_bins[:, -1] = 1 - weights_bins[:, :-1].sum(axis=1)
+        np.cumsum(weights_bins, axis=1, out=weights_bins)
 
         state_names = [s.state_id for s in states] + [self.initial_state]
 
         return state_names, weights_bins
 
     @staticmethod
-    def assign_initial_status_to_simulants(simulants_df, state_names, weights_bins, propensities):
-        simulants = simulants_df[['age', 'sex']].copy()
-
-        choice_index = (propensities.values[np.newaxis].T > weights_bins).sum(axis=1)
-        initial_states = pd.Series(np.array(state_names)[choice_index], index=simulants.index)
-
-        simulants.loc[:, 'condition_state'] = initial_states
-        return simulants
+    def assign_initial_status_to_simulants(index, state_names, weights_bins, propensities):
+        # Counting the bins below each propensity matches vivarium's choice
+        # exactly and, with a handful of states, beats a per-row search.
+        choice_index = (propensities.values[:, np.newaxis] > weights_bins).sum(axis=1)
+        return pd.Series(np.array(state_names)[choice_index], index=index, name='condition_state')
 
     def to_dot(self):
         """Produces a ball and stick graph of this state machine.
@@ -243,6 +272,13 @@ class BetterDiseaseState(DiseaseState):
             requires_columns=['sex']
         )
 
+        self.categorical_states = get_categorical_states(builder)
+
+    def transition_effect(self, index, event_time, population_view):
+        state = self.categorical_states.initial(self.state_id, index, ltbi_globals.TUBERCULOSIS_AND_HIV)
+        population_view.update(state)
+        self._transition_side_effect(index, event_time)
+
     def add_transition(self, output, source_data_type=None, get_data_functions=None, **kwargs):
         if get_data_functions == None:
             get_data_functions = {'transition_rate': lambda cause, builder: builder.data.load(
@@ -262,6 +298,15 @@ class BetterSusceptibleState(SusceptibleState):
         # skip the initializer that adds the redundant prefix
         super(SusceptibleState, self).__init__(cause, *args, name_prefix='', **kwargs)
 
+    def setup(self, builder):
+        super().setup(builder)
+        self.categorical_states = get_categorical_states(builder)
+
+    def transition_effect(self, index, event_time, population_view):
+        state = self.categorical_states.initial(self.state_id, index, ltbi_globals.TUBERCULOSIS_AND_HIV)
+        population_view.update(state)
+        self._transition_side_effect(index, event_time)
+
     def add_transition(self, output, source_data_type=None, get_data_functions=None, **kwargs):
         if get_data_functions == None:
             get_data_functions = {'transition_rate': lambda cause, builder: builder.data.load(
@@ -276,6 +321,19 @@ class BetterSusceptibleState(SusceptibleState):
 
 
 class BetterRateTransition(RateTransition):
+
+    def setup(self, builder):
+        super().setup(builder)
+        self.disease_model = builder.components.get_component(f'disease_model.{self.input_state._model}')
+
+    def _probability(self, index):
+        probability = super()._probability(index)
+        steps = self.disease_model.steps_since_transition
+        if steps == 1:
+            return probability
+        # Surviving every step since the last transition at a constant hazard.
+        return 1 - (1 - probability) ** steps
+
     def load_transition_rate_data(self, builder):
         if 'transition_rate' in self._get_data_functions:
             rate_data = self._get_data_functions['transition_rate'](self.output_state.cause, builder)
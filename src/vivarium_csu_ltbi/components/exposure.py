@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi.components.categories import get_categorical_states
+
+DAYS_PER_YEAR = 365.25
+# Keeps the incidence hazard finite where almost everyone is exposed.
+MAX_PREVALENCE = 0.999
+
+
+# noinspection PyAttributeOutsideInit
+class DynamicHouseholdTuberculosisExposure:
+    """Household tuberculosis exposure as a two state process.
+
+    Replaces ``Risk("risk_factor.household_tuberculosis")``, whose
+    propensities are fixed for life, with exposure that turns over. Exposed
+    simulants (cat1) become unexposed at the configured remission rate and
+    unexposed simulants (cat2) become exposed at the incidence rate that
+    keeps the exposure prevalence of the artifact in equilibrium,
+    ``remission_rate * prevalence / (1 - prevalence)``.
+
+    Each simulant's next change is sampled ahead of time from the hazard of
+    its current state and kept in an array sorted by time, so a time step
+    only touches the simulants whose exposure changes. Waits longer than
+    ``maximum_wait`` years end in a resample instead of a change, so
+    hazards follow the simulant's age and the calendar year.
+
+    """
+
+    configuration_defaults = {
+        'household_tuberculosis_turnover': {
+            'remission_rate': 2.0,  # Transitions per person year
+            'maximum_wait': 1.0,  # Years
+        }
+    }
+
+    @property
+    def name(self):
+        return f'dynamic_risk.{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}'
+
+    def setup(self, builder):
+        config = builder.configuration.household_tuberculosis_turnover
+        self.remission_rate = config.remission_rate
+        self.maximum_wait = config.maximum_wait
+        self.clock = builder.time.clock()
+        self.categorical_states = get_categorical_states(builder)
+
+        exposure_data = builder.data.load(f'risk_factor.{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure')
+        exposure_data = exposure_data.loc[exposure_data.parameter == 'cat1'].drop(columns='parameter')
+        self.prevalence = builder.lookup.build_table(exposure_data, key_columns=['sex'],
+                                                     parameter_columns=['age', 'year'])
+
+        self.randomness = builder.randomness.get_stream(f'{self.name}.next_change')
+
+        self.exposure_column = f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}_exposure'
+        self.next_change_column = f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}_next_change'
+        self.changes_column = f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}_changes'
+        columns_created = [self.exposure_column, self.next_change_column, self.changes_column]
+        builder.population.initializes_simulants(self.on_initialize_simulants,
+                                                 creates_columns=columns_created,
+                                                 requires_columns=['age', 'sex'],
+                                                 requires_streams=[f'{self.name}.next_change'])
+        self.population_view = builder.population.get_view(columns_created + ['alive'])
+
+        self.exposure = builder.value.register_value_producer(f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure',
+                                                              source=self.get_current_exposure,
+                                                              requires_columns=[self.exposure_column])
+
+        # Scheduled changes, sorted by time.
+        self._times = np.array([], dtype='datetime64[ns]')
+        self._simulants = np.array([], dtype=np.int64)
+
+        builder.event.register_listener('time_step__prepare', self.on_time_step_prepare, priority=1)
+
+    def on_initialize_simulants(self, pop_data):
+        exposed = self.randomness.get_draw(pop_data.index, additional_key='initial_exposure') < self.prevalence(
+            pop_data.index)
+        self.update(pop_data.index, exposed.values)
+
+    def on_time_step_prepare(self, event):
+        due = np.searchsorted(self._times, event.time.to_datetime64(), side='left')
+        simulants = pd.Index(self._simulants[:due])
+        self._times = self._times[due:]
+        self._simulants = self._simulants[due:]
+
+        # Dead simulants drop out of the schedule.
+        pop = self.population_view.get(simulants, query="alive == 'alive'")
+        if pop.empty:
+            return
+        exposed = (pop[self.exposure_column] == 'cat1').values
+        changes = pop[self.changes_column].values
+        self.update(pop.index, np.where(changes, ~exposed, exposed))
+
+    def update(self, index, exposed):
+        """Sets the exposure of the simulants in ``index`` and schedules
+        their next change."""
+        prevalence = np.clip(self.prevalence(index).values, 0., MAX_PREVALENCE)
+        hazard = np.where(exposed, self.remission_rate, self.remission_rate * prevalence / (1 - prevalence))
+        draw = self.randomness.get_draw(index, additional_key='wait').values
+        with np.errstate(divide='ignore'):
+            wait = -np.log1p(-draw) / hazard
+        changes = wait <= self.maximum_wait
+        wait = np.minimum(wait, self.maximum_wait)
+        times = (self.clock() + pd.to_timedelta(wait * DAYS_PER_YEAR, unit='D')).values
+
+        exposure = pd.Series(np.where(exposed, 'cat1', 'cat2'), index=index)
+        self.population_view.update(pd.DataFrame({
+            self.exposure_column: self.categorical_states.convert(exposure, self.exposure_column),
+            self.next_change_column: times,
+            self.changes_column: changes,
+        }, index=index))
+        self.schedule(index.values, times)
+
+    def schedule(self, simulants, times):
+        order = np.argsort(times, kind='mergesort')
+        times, simulants = times[order], simulants[order]
+        position = np.searchsorted(self._times, times, side='right')
+        self._times = np.insert(self._times, position, times)
+        self._simulants = np.insert(self._simulants, position, simulants)
+
+    def get_current_exposure(self, index):
+        return self.population_view.subview([self.exposure_column]).get(index)[self.exposure_column]
+
+    def get_checkpoint_state(self):
+        return {'times': self._times, 'simulants': self._simulants}
+
+    def set_checkpoint_state(self, state):
+        self._times = state['times']
+        self._simulants = state['simulants']
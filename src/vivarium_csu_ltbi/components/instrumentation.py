@@ -0,0 +1,146 @@
+import functools
+import os
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+from loguru import logger
+
+PHASES = ['time_step__prepare', 'time_step', 'time_step__cleanup', 'collect_metrics', 'simulation_end']
+RECORD_COLUMNS = ['calls', 'seconds', 'rows', 'allocated_bytes']
+
+
+class _Registry:
+    """Process wide store of the timings of instrumented calls, keyed by
+    (event phase, handler)."""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_allocations = False
+        self.phase = 'setup'
+        self.records = defaultdict(lambda: dict.fromkeys(RECORD_COLUMNS, 0))
+
+    def reset(self, enabled, trace_allocations):
+        self.enabled = enabled
+        self.trace_allocations = trace_allocations
+        self.phase = 'setup'
+        self.records.clear()
+
+    def to_frame(self):
+        data = pd.DataFrame([{'phase': phase, 'handler': handler, **record}
+                             for (phase, handler), record in self.records.items()],
+                            columns=['phase', 'handler'] + RECORD_COLUMNS)
+        return data.sort_values(['phase', 'seconds'], ascending=[True, False]).reset_index(drop=True)
+
+
+REGISTRY = _Registry()
+
+
+def instrumented(handler):
+    """Records calls, wall time, rows and allocations of a component method
+    in the instrumentation registry. Does nothing unless an
+    ``Instrumentation`` component enabled the registry."""
+    label = handler.__qualname__
+
+    @functools.wraps(handler)
+    def wrapper(self, *args, **kwargs):
+        if not REGISTRY.enabled:
+            return handler(self, *args, **kwargs)
+
+        allocated = tracemalloc.get_traced_memory()[0] if REGISTRY.trace_allocations else 0
+        start = time.perf_counter()
+        result = handler(self, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        record = REGISTRY.records[(REGISTRY.phase, label)]
+        record['calls'] += 1
+        record['seconds'] += elapsed
+        record['rows'] += _count_rows(args)
+        if REGISTRY.trace_allocations:
+            record['allocated_bytes'] += tracemalloc.get_traced_memory()[0] - allocated
+        return result
+
+    return wrapper
+
+
+def _count_rows(args):
+    if not args:
+        return 0
+    index = args[0] if isinstance(args[0], pd.Index) else getattr(args[0], 'index', None)
+    return len(index) if isinstance(index, pd.Index) else 0
+
+
+class Instrumentation:
+    """Opt-in timing of the instrumented component methods.
+
+    When enabled, instrumented methods record their call count, cumulative
+    wall time and the number of simulants they were called with, grouped by
+    the event phase they ran in. With ``trace_allocations`` the net memory
+    they allocate is traced as well, at a considerable cost in run time.
+
+    The records are written with the job parameters to
+    ``instrumentation_{draw}_{seed}_{scenario}.hdf`` next to ``output.hdf``
+    when the final metrics are collected, so this component must be listed
+    after every observer in the model specification.
+
+    """
+
+    configuration_defaults = {
+        'instrumentation': {
+            'enabled': False,
+            'trace_allocations': False,
+            'output_directory': '',
+        }
+    }
+
+    @property
+    def name(self):
+        return 'instrumentation'
+
+    def setup(self, builder):
+        config = builder.configuration.instrumentation
+        self.enabled = config.enabled
+        REGISTRY.reset(config.enabled, config.trace_allocations)
+        if not self.enabled:
+            return
+
+        if config.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self.job_parameters = self.get_job_parameters(builder)
+        self.output_directory = self.get_output_directory(builder)
+        for phase in PHASES:
+            builder.event.register_listener(phase, self.set_phase(phase), priority=0)
+        builder.value.register_value_modifier('metrics', modifier=self.metrics)
+        REGISTRY.phase = 'initialization'
+
+    @staticmethod
+    def set_phase(phase):
+        def on_event(event):
+            REGISTRY.phase = phase
+        return on_event
+
+    @staticmethod
+    def get_job_parameters(builder):
+        configuration = builder.configuration.to_dict()
+        return {'input_draw': configuration['input_data']['input_draw_number'],
+                'random_seed': configuration['randomness']['random_seed'],
+                'scenario': configuration.get('ltbi_treatment_scale_up', {}).get('scenario', 'baseline')}
+
+    @staticmethod
+    def get_output_directory(builder):
+        configuration = builder.configuration.to_dict()
+        return Path(configuration['instrumentation']['output_directory']
+                    or configuration.get('output_data', {}).get('results_directory')
+                    or os.getcwd())
+
+    def metrics(self, index, metrics):
+        data = REGISTRY.to_frame().assign(**self.job_parameters)
+        output_path = self.output_directory / 'instrumentation_{input_draw}_{random_seed}_{scenario}.hdf'.format(
+            **self.job_parameters)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        data.to_hdf(str(output_path), key='instrumentation', mode='w')
+        logger.info(f'Instrumentation records written to {output_path}.')
+        return metrics
@@ -1,3 +1,4 @@
+import pandas as pd
 
 
 class LTBITreatmentScaleUp:
@@ -13,24 +14,40 @@ class LTBITreatmentScaleUp:
         return 'ltbi_treatment_scale_up'
 
     def setup(self, builder):
-        coverage_shift_data = self.load_coverage_shift_data(builder)
-        self.coverage_shift = builder.lookup.build_table(coverage_shift_data,
-                                                         parameter_columns=['age', 'year'],
-                                                         key_columns=['sex'],
-                                                         value_columns=['with_hiv_6H', 'with_hiv_3HP',
-                                                                        'under_five_hhtb_6H', 'under_five_hhtb_3HP'])
+        shift_data = builder.data.load('ltbi_treatment.intervention_coverage_shift')
+        self.branch_time = self.get_branch_time(shift_data)
+        self.coverage_shifts = {scenario: builder.lookup.build_table(self.format_coverage_shift_data(data),
+                                                                     parameter_columns=['age', 'year'],
+                                                                     key_columns=['sex'],
+                                                                     value_columns=['with_hiv_6H', 'with_hiv_3HP',
+                                                                                    'under_five_hhtb_6H',
+                                                                                    'under_five_hhtb_3HP'])
+                                for scenario, data in shift_data.groupby('scenario')}
+        self.set_scenario(builder.configuration.ltbi_treatment_scale_up.scenario)
         builder.value.register_value_modifier('ltbi_treatment.data', self.adjust_coverage,
                                               requires_columns=['age', 'sex'])
 
+    def set_scenario(self, scenario):
+        """Switches the coverage shift applied from now on to ``scenario``."""
+        self.scenario = scenario
+        self.coverage_shift = self.coverage_shifts[scenario]
+
     def adjust_coverage(self, index, coverage):
         updated_coverage = coverage + self.coverage_shift(index)
         return updated_coverage
 
     @staticmethod
-    def load_coverage_shift_data(builder):
-        scenario = builder.configuration.ltbi_treatment_scale_up.scenario
-        shift_data = builder.data.load('ltbi_treatment.intervention_coverage_shift')
-        shift_data = shift_data.loc[shift_data.scenario == scenario].drop(columns=['scenario'])
+    def get_branch_time(shift_data):
+        """Gets the start of the first year in which any scenario shifts
+        coverage. All scenarios are identical before this time."""
+        shifted = shift_data.loc[shift_data.value != 0]
+        if shifted.empty:
+            return pd.NaT
+        return pd.Timestamp(year=int(shifted.year_start.min()), month=1, day=1)
+
+    @staticmethod
+    def format_coverage_shift_data(shift_data):
+        shift_data = shift_data.drop(columns=['scenario'])
         shift_data['treatment_group'] = shift_data['treatment_subgroup'] + '_' + shift_data['treatment_type']
         shift_data = shift_data.drop(['treatment_subgroup', 'treatment_type'], axis=1)
         key_cols = ['sex', 'age_start', 'age_end', 'year_start', 'year_end']
@@ -38,4 +55,3 @@ class LTBITreatmentScaleUp:
                                             values='value').reset_index()
         shift_data.columns.name = None
         return shift_data
-
@@ -1,13 +1,14 @@
 import itertools
 
-import pandas as pd
-
 from vivarium_public_health.metrics import (DiseaseObserver, MortalityObserver, DisabilityObserver)
 from vivarium_public_health.metrics.utilities import (get_output_template, QueryString,
                                                       get_group_counts, to_years, get_years_lived_with_disability,
                                                       get_person_time, get_deaths, get_years_of_life_lost)
 
 from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi.components.cache import get_value
+from vivarium_csu_ltbi.components.categories import get_categorical_states
+from vivarium_csu_ltbi.components.instrumentation import instrumented
 
 
 class HouseholdTuberculosisDiseaseObserver(DiseaseObserver):
@@ -23,6 +24,7 @@ class HouseholdTuberculosisDiseaseObserver(DiseaseObserver):
         disease_component = builder.components.get_component(f"disease_model.{ltbi_globals.TUBERCULOSIS_AND_HIV}")
         self.states = [state.name.split('.')[1] for state in disease_component.states]
 
+        self.categorical_states = get_categorical_states(builder)
         self.previous_state_column = f'previous_{self.disease}'
         builder.population.initializes_simulants(self.initialize_previous_state,
                                                  creates_columns=[self.previous_state_column])
@@ -38,11 +40,11 @@ class HouseholdTuberculosisDiseaseObserver(DiseaseObserver):
             columns_required += ['sex']
         self.population_view = builder.population.get_view(columns_required)
 
-        self.household_tb_exposure = builder.value.get_value(f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure')
-        self.treatment_group = builder.value.get_value('ltbi_treatment.exposure')
+        self.household_tb_exposure = get_value(builder, f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure')
+        self.treatment_group = get_value(builder, 'ltbi_treatment.exposure')
 
     def initialize_previous_state(self, pop_data):
-        self.population_view.update(pd.Series('', index=pop_data.index, name=self.previous_state_column))
+        self.population_view.update(self.categorical_states.initial('', pop_data.index, self.previous_state_column))
 
     @staticmethod
     def get_state_person_time(pop, config, disease, state, current_year, step_size, age_bins):
@@ -70,6 +72,7 @@ class HouseholdTuberculosisDiseaseObserver(DiseaseObserver):
         base_filter = QueryString(f'alive == "alive"')
         return get_group_counts(pop, base_filter, base_key, config, age_bins)
 
+    @instrumented
     def on_time_step_prepare(self, event):
         pop = self.population_view.get(event.index)
         pop_exposure_category = self.household_tb_exposure(event.index)
@@ -109,6 +112,7 @@ class HouseholdTuberculosisDiseaseObserver(DiseaseObserver):
         prior_state_pop[self.previous_state_column] = prior_state_pop[self.disease]
         self.population_view.update(prior_state_pop)
 
+    @instrumented
     def on_collect_metrics(self, event):
         pop = self.population_view.get(event.index)
         pop_exposure_category = self.household_tb_exposure(event.index)
@@ -135,11 +139,22 @@ class HouseholdTuberculosisDiseaseObserver(DiseaseObserver):
                                     for k, v in transition_count.items()}
                 self.counts.update(transition_count)
 
+    @instrumented
     def metrics(self, index, metrics):
         metrics = super().metrics(index, metrics)
         metrics.update(self.total_population)
         return metrics
 
+    def get_checkpoint_state(self):
+        return {'counts': self.counts, 'person_time': self.person_time,
+                'prevalence': self.prevalence, 'total_population': self.total_population}
+
+    def set_checkpoint_state(self, state):
+        self.counts = state['counts']
+        self.person_time = state['person_time']
+        self.prevalence = state['prevalence']
+        self.total_population = state['total_population']
+
 
 class HouseholdTuberculosisMortalityObserver(MortalityObserver):
 
@@ -148,9 +163,10 @@ class HouseholdTuberculosisMortalityObserver(MortalityObserver):
 
     def setup(self, builder):
         super().setup(builder)
-        self.household_tb_exposure = builder.value.get_value(f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure')
-        self.treatment_group = builder.value.get_value('ltbi_treatment.exposure')
+        self.household_tb_exposure = get_value(builder, f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure')
+        self.treatment_group = get_value(builder, 'ltbi_treatment.exposure')
 
+    @instrumented
     def metrics(self, index, metrics):
         pop = self.population_view.get(index)
         pop.loc[pop.exit_time.isnull(), 'exit_time'] = self.clock()
@@ -194,11 +210,18 @@ class HouseholdTuberculosisDisabilityObserver(DisabilityObserver):
 
     def setup(self, builder):
         super().setup(builder)
-        self.household_tb_exposure = builder.value.get_value(f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure')
-        self.treatment_group = builder.value.get_value('ltbi_treatment.exposure')
+        self.household_tb_exposure = get_value(builder, f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure')
+        self.treatment_group = get_value(builder, 'ltbi_treatment.exposure')
         self.disability_weight_pipelines = {k: v for k, v in self.disability_weight_pipelines.items()
                                             if k in ltbi_globals.CAUSE_OF_DISABILITY_STATES}
 
+    def get_checkpoint_state(self):
+        return {'years_lived_with_disability': self.years_lived_with_disability}
+
+    def set_checkpoint_state(self, state):
+        self.years_lived_with_disability = state['years_lived_with_disability']
+
+    @instrumented
     def on_time_step_prepare(self, event):
         pop = self.population_view.get(event.index, query='tracked == True and alive == "alive"')
 
@@ -3,6 +3,8 @@ from vivarium_public_health.risks.data_transformations import (get_relative_risk
                                                                get_population_attributable_fraction_data)
 
 from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi.components.cache import get_value
+from vivarium_csu_ltbi.components.instrumentation import instrumented
 
 
 class HHTBCorrelatedRiskEffect:
@@ -36,7 +38,7 @@ class HHTBCorrelatedRiskEffect:
         )
 
         self.relative_risk = self._get_relative_risk_data(builder)
-        self.exposure = builder.value.get_value(f'{self.risk.name}.exposure')
+        self.exposure = get_value(builder, f'{self.risk.name}.exposure')
         self.population_attributable_fraction = self._get_population_attributable_fraction_data(builder)
 
         builder.value.register_value_modifier(f'{self.target.name}.{self.target.measure}',
@@ -56,6 +58,7 @@ class HHTBCorrelatedRiskEffect:
                                          parameter_columns=['age', 'year'])
         return paf
 
+    @instrumented
     def adjust_target(self, index, target):
         exposure = self.exposure(index)
         paf = self.population_attributable_fraction(index)
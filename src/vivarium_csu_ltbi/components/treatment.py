@@ -2,6 +2,9 @@ import numpy as np
 import pandas as pd
 
 from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi.components.cache import get_pipeline_cache, get_value
+from vivarium_csu_ltbi.components.categories import get_categorical_states
+from vivarium_csu_ltbi.components.instrumentation import instrumented
 
 
 # noinspection PyAttributeOutsideInit
@@ -17,7 +20,9 @@ class LTBITreatmentCoverage:
         self.treatment_stream = builder.randomness.get_stream(f'{self.name}.treatment_selection')
         self.adherence_stream = builder.randomness.get_stream(f'{self.name}.adherence_propensity')
 
-        self.household_tb_exposure = builder.value.get_value('household_tuberculosis.exposure')
+        self.categorical_states = get_categorical_states(builder)
+        self.pipeline_cache = get_pipeline_cache(builder)
+        self.household_tb_exposure = get_value(builder, 'household_tuberculosis.exposure')
 
         adherence_data = builder.data.load("ltbi_treatment.adherence")
         self.adherence = builder.lookup.build_table(adherence_data,
@@ -38,7 +43,7 @@ class LTBITreatmentCoverage:
                                                                        requires_values=['household_tuberculosis.exposure'],
                                                                        preferred_post_processor=self.enforce_not_eligible)
 
-        self._ltbi_treatment_status = pd.Series()
+        self._ltbi_treatment_status = self.categorical_states.convert(pd.Series(), 'ltbi_treatment.exposure')
         self.ltbi_treatment_status = builder.value.register_value_producer(
             'ltbi_treatment.exposure',
             source=lambda index: self._ltbi_treatment_status[index],
@@ -58,14 +63,17 @@ class LTBITreatmentCoverage:
 
     def on_initialize_simulants(self, pop_data):
 
-        self._ltbi_treatment_status = self._ltbi_treatment_status.append(pd.Series('untreated', index=pop_data.index))
+        untreated = self.categorical_states.initial('untreated', pop_data.index, 'ltbi_treatment.exposure')
+        self._ltbi_treatment_status = self._ltbi_treatment_status.append(untreated)
         initialized = pd.DataFrame({'treatment_date': pd.NaT,
-                                    'treatment_type': 'untreated',
+                                    'treatment_type': self.categorical_states.initial('untreated', pop_data.index,
+                                                                                      'treatment_type'),
                                     'adherence_propensity': self.adherence_stream.get_draw(pop_data.index),
                                     'treatment_propensity': self.treatment_stream.get_draw(pop_data.index)},
                                    index=pop_data.index)
         self.population_view.update(initialized)
 
+    @instrumented
     def on_time_step_prepare(self, event):
         pop = self.population_view.get(event.index, query="treatment_type == 'untreated'")
 
@@ -87,8 +95,17 @@ class LTBITreatmentCoverage:
         treatment_status.loc[are_adherent] += '_adherent'
         treatment_status.loc[~are_adherent] += '_nonadherent'
 
-        self._ltbi_treatment_status.update(pd.Series(treatment_status, index=treatment_status.index))
+        self._ltbi_treatment_status.update(self.categorical_states.convert(treatment_status, 'ltbi_treatment.exposure'))
+        if self.pipeline_cache is not None:
+            self.pipeline_cache.invalidate('ltbi_treatment.exposure')
 
+    def get_checkpoint_state(self):
+        return {'ltbi_treatment_status': self._ltbi_treatment_status}
+
+    def set_checkpoint_state(self, state):
+        self._ltbi_treatment_status = state['ltbi_treatment_status']
+
+    @instrumented
     def get_coverage(self, index):
         pop = self.population_view.get(index, query="treatment_type == 'untreated'")
 
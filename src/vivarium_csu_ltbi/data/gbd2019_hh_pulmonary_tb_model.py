@@ -1,7 +1,9 @@
-import numpy as np
+from typing import List, Union
+
 import pandas as pd
 from get_draws.api import get_draws
-from vivarium.interpolation import Interpolation
+
+from vivarium_csu_ltbi.data import household_engine, microdata_cache
 
 master_dir = '/home/j/Project/simulation_science/latent_tuberculosis_infection/literature/household_structure/microdata/'
 country_dict = {
@@ -33,7 +35,11 @@ sex_dict = {1: 'Male', 2: 'Female'}
 
 def load_hh_data(location_id: int):
     country_name = country_dict[location_id]
-    df = pd.read_stata(master_dir + country_name + '.dta').dropna()
+    return microdata_cache.load_microdata(master_dir + country_name + '.dta',
+                                          lambda df: clean_hh_data(df, country_name), country_name, 'gbd2019')
+
+def clean_hh_data(df: pd.DataFrame, country_name: str):
+    df = df.dropna()
     if 'hhid' in df.columns:
         df.rename(columns={'hhid': 'hh_id'}, inplace=True)
     if country_name in ['China', 'Russian_Federation', 'South_Africa']:
@@ -99,79 +105,23 @@ def get_pulmonary_tb_prev(prev_actb: pd.DataFrame, frac: pd.DataFrame):
     prev_pulmonary_tb = prev * (1 - prop)
     return prev_pulmonary_tb.reset_index()
 
-def interpolation(prev_pulmonary_tb: pd.DataFrame, hh_data: pd.DataFrame, draw: int):
-    """assign the probability of active pulmonary TB for each household member"""
-    mask = hh_data.copy()
-    interp = Interpolation(prev_pulmonary_tb.query(f'draw == {draw}'),
-                           categorical_parameters=['sex'],
-                           continuous_parameters=[['age', 'age_group_start', 'age_group_end']],
-                           order=0,
-                           extrapolate=True,
-                           validate=True)
-    mask['pr_pulmonary_tb'] = interp(mask).value
-    return mask
-
-def calc_pr_no_pulmonary_tb_in_hh(df: pd.DataFrame):
-    """compute the probability that no person with active pulmonary TB in a single household"""
-    pr_no_tb = 1 - df.pr_pulmonary_tb
-    pr_no_tb_in_hh = np.prod(pr_no_tb)
-    return pr_no_tb_in_hh
-
-def calc_age_sex_specific_no_pulmonary_tb_prop(df: pd.DataFrame):
-    """
-    calculate the probability of no active pulmonary TB case in the household
-    for certain age and sex group
-    """
-    age_bins = [0, 5] + list(range(15, 70, 10)) + [125]
-    result = pd.DataFrame()
-    for i, age_group_start in enumerate(age_bins[:-1]):
-        age_group_end = age_bins[i+1]
-        for sex in ['Male', 'Female']:
-            hh_with = df.query(f'age >= {age_group_start} and age < {age_group_end} and sex == "{sex}"').hh_id.unique()
-            prop = df[df.hh_id.isin(hh_with)].groupby('hh_id').apply(calc_pr_no_pulmonary_tb_in_hh)
-            prop_mean = prop.mean()
-            age_sex_result = pd.DataFrame({'age_group_start': [age_group_start], 
-                                           'age_group_end': [age_group_end], 
-                                           'sex': [sex], 
-                                           'value': [prop_mean]})
-            result = pd.concat([result, age_sex_result], ignore_index=True)
-    return result
+def load_pulmonary_tb_prevalence(location_id: int):
+    return get_pulmonary_tb_prev(pull_actb_prevalence(location_id), pull_extra_pulmonary_tb_frac(location_id))
 
-def get_estimates(draw: int):
-    """calculate the prevalence of household pulmonary TB contact"""
-    output = pd.DataFrame()
-    cols = ['age_group_start', 'age_group_end', 'sex']
-    for location_id in country_dict.keys():
-        df_hh = load_hh_data(location_id)
-        hh_ids = df_hh.hh_id.unique()
-        # boostrap HH data by resampling hh_id with replacement
-        sample_hhids = np.random.choice(hh_ids, size=min(len(hh_ids), 50000), replace=True)
-        df_hh = df_hh.set_index("hh_id")
-        df_hh_sample = df_hh.loc[sample_hhids].reset_index()
-        prev_actb = pull_actb_prevalence(location_id)
-        frac = pull_extra_pulmonary_tb_frac(location_id) 
-        prev_pulmonary_tb = get_pulmonary_tb_prev(prev_actb, frac)
-        data = interpolation(prev_pulmonary_tb, df_hh_sample, draw)
-        result = calc_age_sex_specific_no_pulmonary_tb_prop(data)
-        prev_pulmonary_tb_draw = prev_pulmonary_tb.query(f'draw == {draw}')
-        prev_pulmonary_tb_draw['value'] = 1 - prev_pulmonary_tb_draw['value']
-        # prev_hhc = 1 - pr_no_pulmonary_tb_in_hh / prev_susceptible_to_pulmonary_tb
-        f = (1 - result.set_index(cols).value / prev_pulmonary_tb_draw.set_index(cols).value).reset_index()
-        f['location'] = country_dict[location_id]
-        output = pd.concat([output, f], ignore_index=True)
-    output['year_start'] = 2019
-    output['year_end'] = 2020
-    output['draw'] = draw
-    return output.set_index(['location', 'sex', 'age_group_start', 'year_start', 'age_group_end', 'year_end', 'draw']).reset_index()
+def get_estimates(draws: Union[int, List[int]]):
+    """calculate the prevalence of household pulmonary TB contact for one or more draws"""
+    return household_engine.estimate_locations(country_dict, master_dir, load_hh_data,
+                                               load_pulmonary_tb_prevalence, draws)
 
 
 if __name__ == '__main__':
     import sys
     import os
     try:
-        draw = int(os.environ['SGE_TASK_ID']) - 1
+        draws = int(os.environ['SGE_TASK_ID']) - 1
     except (KeyError, ValueError):
-        draw = int(sys.argv[1])
+        draws = list(range(1000)) if sys.argv[1] == 'all' else int(sys.argv[1])
 
-    output = get_estimates(draw)
-    output.to_hdf(f'/share/scratch/users/yongqx2/hh_pulmonary_tb_estimates/draw_{draw}.hdf', 'draw')
+    output = get_estimates(draws)
+    output_name = 'all_draws' if isinstance(draws, list) else f'draw_{draws}'
+    output.to_hdf(f'/share/scratch/users/yongqx2/hh_pulmonary_tb_estimates/{output_name}.hdf', 'draw')
@@ -1,7 +1,9 @@
-import numpy as np
+from typing import List, Union
+
 import pandas as pd
 from get_draws.api import get_draws
-from vivarium.interpolation import Interpolation
+
+from vivarium_csu_ltbi.data import household_engine, microdata_cache
 
 master_dir = '/home/j/Project/simulation_science/latent_tuberculosis_infection/literature/household_structure/microdata/'
 country_dict = {
@@ -33,7 +35,11 @@ sex_dict = {1: 'Male', 2: 'Female'}
 
 def load_hh_data(location_id: int):
     country_name = country_dict[location_id]
-    df = pd.read_stata(master_dir + country_name + '.dta').dropna()
+    return microdata_cache.load_microdata(master_dir + country_name + '.dta',
+                                          lambda df: clean_hh_data(df, country_name), country_name, 'gbd2019')
+
+def clean_hh_data(df: pd.DataFrame, country_name: str):
+    df = df.dropna()
     if 'hhid' in df.columns:
         df.rename(columns={'hhid': 'hh_id'}, inplace=True)
     if country_name in ['China', 'Russian_Federation', 'South_Africa']:
@@ -87,77 +93,22 @@ def format_actb_prevalence(prev_actb: pd.DataFrame):
     prev_actb_long['draw'] = prev_actb_long.draw.map(lambda x: int(x.split('_')[1]))
     return prev_actb_long
 
-def interpolation(prev_actb: pd.DataFrame, hh_data: pd.DataFrame, draw: int):
-    """assign the probability of active TB for each household member"""
-    mask = hh_data.copy()
-    interp = Interpolation(prev_actb.query(f'draw == {draw}'),
-                           categorical_parameters=['sex'],
-                           continuous_parameters=[['age', 'age_group_start', 'age_group_end']],
-                           order=0,
-                           extrapolate=True,
-                           validate=True)
-    mask['pr_actb'] = interp(mask).value
-    return mask
-
-def calc_pr_no_actb_in_hh(df: pd.DataFrame):
-    """compute the probability that no person with active TB in a single household"""
-    pr_no_tb = 1 - df.pr_actb
-    pr_no_tb_in_hh = np.prod(pr_no_tb)
-    return pr_no_tb_in_hh
-
-def calc_age_sex_specific_no_actb_prop(df: pd.DataFrame):
-    """
-    calculate the probability of no active TB case in the household
-    for certain age and sex group
-    """
-    age_bins = [0, 1] + list(range(5, 96, 5)) + [125]
-    result = pd.DataFrame()
-    for i, age_group_start in enumerate(age_bins[:-1]):
-        age_group_end = age_bins[i+1]
-        for sex in ['Male', 'Female']:
-            hh_with = df.query(f'age >= {age_group_start} and age < {age_group_end} and sex == "{sex}"').hh_id.unique()
-            prop = df[df.hh_id.isin(hh_with)].groupby('hh_id').apply(calc_pr_no_actb_in_hh)
-            prop_mean = prop.mean()
-            age_sex_result = pd.DataFrame({'age_group_start': [age_group_start], 
-                                           'age_group_end': [age_group_end], 
-                                           'sex': [sex], 
-                                           'value': [prop_mean]})
-            result = pd.concat([result, age_sex_result], ignore_index=True)
-    return result
+def load_actb_prevalence(location_id: int):
+    return format_actb_prevalence(pull_actb_prevalence(location_id))
 
-def get_estimates(draw: int):
-    """calculate the prevalence of household contact"""
-    output = pd.DataFrame()
-    cols = ['age_group_start', 'age_group_end', 'sex']
-    for location_id in country_dict.keys():
-        df_hh = load_hh_data(location_id)
-        hh_ids = df_hh.hh_id.unique()
-        # boostrap HH data by resampling hh_id with replacement
-        sample_hhids = np.random.choice(hh_ids, size=min(len(hh_ids), 50000), replace=True)
-        df_hh = df_hh.set_index("hh_id")
-        df_hh_sample = df_hh.loc[sample_hhids].reset_index()
-        prev_actb = format_actb_prevalence(pull_actb_prevalence(location_id))
-        data = interpolation(prev_actb, df_hh_sample, draw)
-        result = calc_age_sex_specific_no_actb_prop(data)
-        prev_actb_draw = prev_actb.query(f'draw == {draw}')
-        prev_actb_draw['value'] = 1 - prev_actb_draw['value']
-        # prev_hhc = 1 - pr_no_actb_in_hh / prev_susceptible_to_actb
-        f = (1 - result.set_index(cols).value / prev_actb_draw.set_index(cols).value).reset_index()
-        f['location'] = country_dict[location_id]
-        output = pd.concat([output, f], ignore_index=True)
-    output['year_start'] = 2019
-    output['year_end'] = 2020
-    output['draw'] = draw
-    return output.set_index(['location', 'sex', 'age_group_start', 'year_start', 'age_group_end', 'year_end', 'draw']).reset_index()
+def get_estimates(draws: Union[int, List[int]]):
+    """calculate the prevalence of household contact for one or more draws"""
+    return household_engine.estimate_locations(country_dict, master_dir, load_hh_data, load_actb_prevalence, draws)
 
 
 if __name__ == '__main__':
     import sys
     import os
     try:
-        draw = int(os.environ['SGE_TASK_ID']) - 1
+        draws = int(os.environ['SGE_TASK_ID']) - 1
     except (KeyError, ValueError):
-        draw = int(sys.argv[1])
+        draws = list(range(1000)) if sys.argv[1] == 'all' else int(sys.argv[1])
 
-    output = get_estimates(draw)
-    output.to_hdf(f'/share/scratch/users/yongqx2/hhc_estimates/draw_{draw}.hdf', 'draw')
+    output = get_estimates(draws)
+    output_name = 'all_draws' if isinstance(draws, list) else f'draw_{draws}'
+    output.to_hdf(f'/share/scratch/users/yongqx2/hhc_estimates/{output_name}.hdf', 'draw')
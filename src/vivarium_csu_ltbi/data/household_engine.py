@@ -0,0 +1,253 @@
+"""
+Household contact engine
+
+Vectorized estimation of the probability of living with an active TB case,
+shared by the GBD 2019 household models. For every age and sex group it
+estimates, over bootstrapped households that have a member in the group,
+the mean probability that no member has TB, and from that the prevalence
+of household contact.
+
+Household survey microdata are parsed once per location and kept as typed
+arrays. All draws are evaluated together: case probabilities are held in a
+``BinLookup`` by age/sex bin and draw, member counts per household and bin
+are gathered with one ``np.bincount``, the probability of no TB
+in each household is the exponential of a (households x bins) by
+(bins x draws) product of log probabilities, and the bootstrap is a matrix
+of household resampling counts per draw.
+"""
+from typing import Callable, Dict, Hashable, List, NamedTuple, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+SEXES = ['Male', 'Female']
+BOOTSTRAP_SIZE = 50_000
+DRAW_CHUNK_SIZE = 100
+
+
+class HouseholdMicrodata(NamedTuple):
+    """Household members as typed arrays, with households numbered from 0."""
+    household: np.ndarray  # int32 household code
+    age: np.ndarray  # float32
+    sex: np.ndarray  # int8 index into SEXES
+    household_count: int
+
+
+_MICRODATA: Dict[Hashable, HouseholdMicrodata] = {}
+
+
+def compact_household_data(data: pd.DataFrame) -> HouseholdMicrodata:
+    """Converts cleaned microdata with ``hh_id``, ``age`` and ``sex``
+    columns to typed arrays."""
+    household, household_ids = pd.factorize(data['hh_id'])
+    return HouseholdMicrodata(household=household.astype(np.int32),
+                              age=data['age'].values.astype(np.float32),
+                              sex=pd.Categorical(data['sex'], categories=SEXES).codes.astype(np.int8),
+                              household_count=len(household_ids))
+
+
+def get_microdata(location: Hashable, loader: Callable[[Hashable], pd.DataFrame]) -> HouseholdMicrodata:
+    """Loads the microdata of ``location`` with ``loader`` on first use and
+    serves the typed arrays from memory afterwards."""
+    if location not in _MICRODATA:
+        _MICRODATA[location] = compact_household_data(loader(location))
+    return _MICRODATA[location]
+
+
+class BinLookup:
+    """Order 0 lookup of age/sex binned values for every draw.
+
+    The long-format ``data`` is arranged once as a (bins x draws) array.
+    Bins are ordered by sex, then age group, and people are assigned to bins
+    with ``get_bins``, so the values of any draw for a population are a
+    gather from the array instead of a new ``Interpolation``. Ages outside
+    the age groups fall into the nearest group, as with order 0
+    interpolation with extrapolation.
+
+    Parameters
+    ----------
+    data
+        Long-format values with ``age_group_start``, ``age_group_end``,
+        ``sex``, ``draw`` and ``value`` columns and no other dimensions.
+    draws
+        The draws to keep. Defaults to every draw in ``data``.
+
+    """
+
+    def __init__(self, data: pd.DataFrame, draws: Sequence[int] = None):
+        self.draws = sorted(data['draw'].unique()) if draws is None else list(draws)
+        data = data.loc[data['draw'].isin(self.draws)]
+        age_groups = (data[['age_group_start', 'age_group_end']]
+                      .drop_duplicates()
+                      .sort_values('age_group_start'))
+        self.age_group_starts = age_groups['age_group_start'].values
+        self.age_group_ends = age_groups['age_group_end'].values
+        bins = pd.MultiIndex.from_product([SEXES, self.age_group_starts], names=['sex', 'age_group_start'])
+        table = (data
+                 .set_index(['sex', 'age_group_start', 'draw'])['value']
+                 .unstack('draw')
+                 .reindex(index=bins, columns=self.draws))
+        if table.isnull().values.any():
+            raise ValueError('Values are missing for some age groups, sexes or draws.')
+        self.table = table.values
+        self._draw_positions = pd.Index(self.draws)
+
+    @property
+    def bin_count(self) -> int:
+        return self.table.shape[0]
+
+    def get_bins(self, age: np.ndarray, sex: Union[np.ndarray, pd.Series]) -> np.ndarray:
+        """Finds the bin of each person from their age and their sex, as
+        names or as codes into ``SEXES``."""
+        if not np.issubdtype(np.asarray(sex).dtype, np.integer):
+            sex = pd.Categorical(sex, categories=SEXES).codes
+        age_group = np.clip(np.searchsorted(self.age_group_starts, age, side='right') - 1,
+                            0, len(self.age_group_starts) - 1)
+        return np.asarray(sex, dtype=np.int64) * len(self.age_group_starts) + age_group
+
+    def __call__(self, bins: np.ndarray, draw: int) -> np.ndarray:
+        """The values of ``draw`` for people in ``bins``."""
+        return self.table[bins, self._draw_positions.get_loc(draw)]
+
+
+def get_member_counts(microdata: HouseholdMicrodata, lookup: BinLookup) -> np.ndarray:
+    """Counts the members of each household in each bin of ``lookup``."""
+    bins = lookup.get_bins(microdata.age, microdata.sex)
+    counts = np.bincount(microdata.household.astype(np.int64) * lookup.bin_count + bins,
+                         minlength=microdata.household_count * lookup.bin_count)
+    return counts.reshape(microdata.household_count, lookup.bin_count).astype(np.float64)
+
+
+def estimate_no_case_probability(member_counts: np.ndarray, probabilities: np.ndarray,
+                                 bootstrap_counts: np.ndarray) -> np.ndarray:
+    """Estimates the mean probability of no case in households with a
+    member in each bin.
+
+    Parameters
+    ----------
+    member_counts
+        (households x bins) member counts.
+    probabilities
+        (bins x draws) probability that a member has the condition.
+    bootstrap_counts
+        (draws x households) number of times each household was sampled.
+
+    Returns
+    -------
+        (draws x bins) mean probability of no case, weighted by the
+        bootstrap counts. Null for bins no sampled household has a member in.
+
+    """
+    no_case = np.exp(member_counts @ np.log1p(-probabilities))
+    has_member = (member_counts > 0).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (bootstrap_counts * no_case.T) @ has_member / (bootstrap_counts @ has_member)
+
+
+def estimate_household_contact(microdata: HouseholdMicrodata, probabilities: pd.DataFrame,
+                               draws: Sequence[int], sample_size: int = BOOTSTRAP_SIZE,
+                               random_state: np.random.RandomState = None,
+                               chunk_size: int = DRAW_CHUNK_SIZE) -> pd.DataFrame:
+    """Estimates the prevalence of household contact by age and sex for
+    every draw of one location.
+
+    Each draw resamples ``min(households, sample_size)`` households with
+    replacement and computes
+
+        contact = 1 - P(no case in household) / P(person is not a case)
+
+    Parameters
+    ----------
+    microdata
+        The household members of the location.
+    probabilities
+        Long-format probability that a person is a case, with
+        ``age_group_start``, ``age_group_end``, ``sex``, ``draw`` and
+        ``value`` columns.
+    draws
+        The draws to estimate.
+    sample_size
+        The maximum number of households to resample per draw.
+    random_state
+        The source of the bootstrap samples.
+    chunk_size
+        The number of draws evaluated together, which bounds memory use.
+
+    Returns
+    -------
+        The household contact prevalence with ``sex``, ``age_group_start``,
+        ``age_group_end``, ``draw`` and ``value`` columns.
+
+    """
+    random_state = np.random.RandomState() if random_state is None else random_state
+    draws = list(draws)
+    lookup = BinLookup(probabilities, draws)
+    table = lookup.table
+    member_counts = get_member_counts(microdata, lookup)
+
+    household_count = microdata.household_count
+    resample_probabilities = np.full(household_count, 1 / household_count)
+    no_case = np.empty((len(draws), table.shape[0]))
+    for start in range(0, len(draws), chunk_size):
+        stop = min(start + chunk_size, len(draws))
+        bootstrap_counts = random_state.multinomial(min(household_count, sample_size),
+                                                    resample_probabilities, size=stop - start)
+        no_case[start:stop] = estimate_no_case_probability(member_counts, table[:, start:stop],
+                                                           bootstrap_counts.astype(np.float64))
+
+    contact = 1 - no_case / (1 - table.T)
+    age_group_count = len(lookup.age_group_starts)
+    return pd.DataFrame({
+        'sex': np.tile(np.repeat(SEXES, age_group_count), len(draws)),
+        'age_group_start': np.tile(lookup.age_group_starts, len(SEXES) * len(draws)),
+        'age_group_end': np.tile(lookup.age_group_ends, len(SEXES) * len(draws)),
+        'draw': np.repeat(draws, table.shape[0]),
+        'value': contact.ravel(),
+    })
+
+
+def estimate_locations(locations: Dict[Hashable, str], source: str,
+                       load_microdata: Callable[[Hashable], pd.DataFrame],
+                       load_probabilities: Callable[[Hashable], pd.DataFrame], draws: Union[int, List[int]],
+                       year_start: int = 2019, seed: int = None) -> pd.DataFrame:
+    """Estimates household contact for every location and draw.
+
+    Parameters
+    ----------
+    locations
+        Mapping between location keys passed to the loaders and the location
+        names written to the output.
+    source
+        Where ``load_microdata`` reads from. Microdata parsed in this
+        process are reused for the same source and location.
+    load_microdata
+        Loads the cleaned household microdata of a location.
+    load_probabilities
+        Loads the long-format case probabilities of a location.
+    draws
+        A draw or a list of draws.
+    year_start
+        The year the estimates apply to.
+    seed
+        Seed of the bootstrap samples.
+
+    Returns
+    -------
+        The estimates in the layout of the household exposure data.
+
+    """
+    draws = [draws] if isinstance(draws, int) else list(draws)
+    random_state = np.random.RandomState(seed)
+    output = []
+    for location, location_name in locations.items():
+        logger.info(f'Estimating household contact for {location_name} and {len(draws)} draws.')
+        microdata = get_microdata((source, location), lambda key: load_microdata(key[1]))
+        estimates = estimate_household_contact(microdata, load_probabilities(location), draws,
+                                               random_state=random_state)
+        estimates['location'] = location_name
+        output.append(estimates)
+    output = pd.concat(output, ignore_index=True)
+    output['year_start'] = year_start
+    output['year_end'] = year_start + 1
+    return output[['location', 'sex', 'age_group_start', 'year_start', 'age_group_end', 'year_end', 'draw', 'value']]
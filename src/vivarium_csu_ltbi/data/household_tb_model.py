@@ -1,21 +1,27 @@
+from typing import List
+
 import pandas as pd
 import numpy as np
 
 from gbd_mapping import causes
-from vivarium.interpolation import Interpolation
 from vivarium_inputs.interface import get_measure
 from vivarium_inputs.data_artifact.utilities import split_interval
 
 from vivarium_csu_ltbi import globals as ltbi_globals
 from vivarium_csu_ltbi import paths as ltbi_paths
+from vivarium_csu_ltbi.data import household_engine, microdata_cache
 
 
 def load_household_input_data(location: str):
     input_data_path = ltbi_paths.get_hh_tb_input_data_path(location)
+    formatted_location = ltbi_globals.formatted_location(location)
+    return microdata_cache.load_microdata(input_data_path,
+                                          lambda df: clean_household_input_data(df, formatted_location),
+                                          location, 'household_tb_model')
 
-    df = pd.read_stata(input_data_path).dropna()
 
-    formatted_location = ltbi_globals.formatted_location(location)
+def clean_household_input_data(df: pd.DataFrame, formatted_location: str):
+    df = df.dropna()
     if formatted_location == 'south_africa':
         df['age'] = df['age'].replace({'Less than 1 year': '0',
                                        'less than 1 year': '0',
@@ -50,16 +56,20 @@ def load_actb_prevalence_input_data(location: str):
     return prev_actb
 
 
-def interpolation(prev_actb: pd.DataFrame, df: pd.DataFrame, year_start: int, draw: int):
-    """assign the probability of active TB for each simulant."""
+def get_actb_lookup(prev_actb: pd.DataFrame, year_start: int, draws: List[int] = None):
+    """arrange the probability of active TB of ``year_start`` by age/sex bin and draw."""
+    return household_engine.BinLookup(prev_actb.loc[prev_actb.year_start == year_start], draws)
+
 
-    interp = Interpolation(prev_actb.query(f'year_start == {year_start} and draw == {draw}'),
-                           categorical_parameters=['sex'],
-                           continuous_parameters=[['age', 'age_group_start', 'age_group_end']],
-                           order=0,
-                           extrapolate=True)
+def interpolation(prev_actb: pd.DataFrame, df: pd.DataFrame, year_start: int, draw: int,
+                  lookup: household_engine.BinLookup = None):
+    """assign the probability of active TB for each simulant.
 
-    df['pr_actb'] = interp(df).value
+    Pass a ``lookup`` from ``get_actb_lookup`` to evaluate several draws
+    without rearranging ``prev_actb`` for each of them."""
+    if lookup is None:
+        lookup = get_actb_lookup(prev_actb, year_start, [draw])
+    df['pr_actb'] = lookup(lookup.get_bins(df['age'].values, df['sex']), draw)
     return df
 
 
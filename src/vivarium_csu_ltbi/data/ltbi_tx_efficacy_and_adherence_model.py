@@ -1,114 +1,94 @@
+"""
+LTBI treatment efficacy and adherence model
+
+Bayesian model of the adherence to and the efficacy of LTBI treatment, fit
+with pymc to the tidy adherence and efficacy literature data.
+
+Adherence is a fixed-effects logistic regression on treatment length,
+weekly dosing (3HP) and trial setting with a random effect per study. The
+predicted adherence to 6H in a trial informs the incidence model, which
+relates per-protocol and non-adherent incidence in every study arm to the
+intention-to-treat efficacy of 6H.
+
+Several independent chains are sampled in parallel and pooled into the
+1000 draws of ``treatment_adherence_draws.csv``, which the artifact builder
+reads. Gelman-Rubin statistics and effective sample sizes of the model
+parameters are written next to the draws.
+"""
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List
+
+import click
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+LITERATURE_DIR = Path('/home/j/Project/simulation_science/latent_tuberculosis_infection/'
+                      'literature/adherence_and_efficacy/')
+ADHERENCE_DATA_PATH = LITERATURE_DIR / 'treatment_adherence_tidy.csv'
+INCIDENCE_DATA_PATH = LITERATURE_DIR / 'treatment_efficacy_tidy.csv'
+OUTPUT_DIR = Path(__file__).resolve().parent
+DRAWS_FILE = 'treatment_adherence_draws.csv'
+DIAGNOSTICS_FILE = 'treatment_adherence_diagnostics.csv'
+
+NUMBER_OF_DRAWS = 1000
+BURN = 10_000
+THIN = 10
+
+# Adherence is predicted for 3HP in the real world, 6H in the real world
+# and 6H in a trial.
+PREDICTION_MONTHS = np.array([3, 6, 6])
+PREDICTION_HP = np.array([1, 0, 0])
+PREDICTION_RCT = np.array([0, 0, 1])
+DIAGNOSTIC_PARAMETERS = ['beta_0', 'beta_1', 'beta_2', 'beta_3', 'sigma', 'RR_NA', 'itt_efficacy']
+
+
+def adherence_model(df: pd.DataFrame) -> Dict:
+    """Fixed-effects model of adherence with a random effect per study."""
+    import pymc as pm
 
-# coding: utf-8
-
-# In[1]:
-
-import numpy as np, matplotlib.pyplot as plt, pandas as pd
-pd.set_option('display.max_rows', 8)
-get_ipython().system('date')
-
-get_ipython().run_line_magic('load_ext', 'autoreload')
-get_ipython().run_line_magic('autoreload', '2')
-
-
-# # Model for efficacy and adherence of LTBI treatment
-# 
-
-# In[2]:
-
-
-import pymc as pm
-
-
-# In[3]:
-
-
-df_adherence = pd.read_csv('/home/j/Project/simulation_science/latent_tuberculosis_infection'
-                 '/literature/adherence_and_efficacy/treatment_adherence_tidy.csv')
-df_adherence
-
-
-# In[4]:
-
-
-df_adherence.rct.sum()
-
-
-# In[5]:
-
-
-# df_adherence['fract'] = df_adherence.n_completed / df_adherence.n_enrolled
-# df_adherence.loc[df_adherence.fract > .5, 'rct'] = 1 # just for testing!
-
-
-# In[6]:
-
-
-df_incidence = pd.read_csv('/home/j/Project/simulation_science/latent_tuberculosis_infection'
-                 '/literature/adherence_and_efficacy/treatment_efficacy_tidy.csv')
-df_incidence
-
-
-# In[7]:
-
-
-# fixed-effects model of adherence
-def adherence_model(df):
     beta = [pm.Uninformative('beta_0', value=0),  # constant
             pm.Uniform('beta_1', -10, 0, value=0),  # treatment length effect (continuous, unit change = 1 month)
             pm.Uninformative('beta_2', value=0),  # HP effect (0 = daily dose, 1 = weekly dose)
-            pm.Uniform('beta_3', 0, 10, value=0), # RCT effect (0 = real world, 1 = RCT)
-           ]
-    
+            pm.Uniform('beta_3', 0, 10, value=0),  # RCT effect (0 = real world, 1 = RCT)
+            ]
+
     sigma = pm.Uniform('sigma', .001, 1, value=.1)
-    u = np.array([pm.Normal(f'u_{i}', 0, tau=sigma**-2, value=0) for i in range(df.study.nunique())])
-    
+    u = pm.Normal('u', 0, tau=sigma**-2, value=np.zeros(df.study.nunique()))
+
+    months, hp, rct, study = df.months.values, df.hp.values, df.rct.values, df.study.values
+
     @pm.deterministic
     def pi(beta=beta, u=u):
-        return pm.invlogit(beta[0] + beta[1]*df.months + beta[2]*df.hp + beta[3]*df.rct + u[df.study])
-    
+        return pm.invlogit(beta[0] + beta[1]*months + beta[2]*hp + beta[3]*rct + u[study])
+
     u_pred = pm.Normal('u_pred', 0, tau=sigma**-2, value=0)
+
     @pm.deterministic
     def pi_pred(beta=beta, u_pred=u_pred):
-        return pm.invlogit(beta[0] + beta[1]*np.array([3,6,6])
-                           + beta[2]*np.array([1,0,0])
-                           + beta[3]*np.array([0,0,1])
+        return pm.invlogit(beta[0] + beta[1]*PREDICTION_MONTHS + beta[2]*PREDICTION_HP + beta[3]*PREDICTION_RCT
                            + u_pred)
-    y = pm.Binomial('y', n=df.n_enrolled, p=pi,
-                    value=df.n_completed, observed=True)
-    return locals()
-
-m = pm.MCMC(adherence_model(df_adherence))
-m.sample(10_000, 5_000, 5)
-m.pi_pred.summary()
-
-
-# In[8]:
 
+    y = pm.Binomial('y', n=df.n_enrolled.values, p=pi, value=df.n_completed.values, observed=True)
+    return locals()
 
-m.beta[1].summary()
-m.beta[2].summary()
-m.beta[3].summary()
 
+def incidence_model(df: pd.DataFrame, f_A) -> Dict:
+    """Model of per-protocol and non-adherent incidence in every arm of
+    every study, given the adherence fraction ``f_A`` of 6H in a trial."""
+    import pymc as pm
 
-# In[9]:
+    RR_NA = pm.Uniform('RR_NA', 1., 10., value=2)
+    # latent variable : per-protocol incidence rate, different in all arms of all studies
+    i0 = pm.Uniform('i0', 0., 1., value=np.full(len(df), .01))
 
+    pp_cases = pm.Binomial('pp_cases', df.pp_n.values, i0, value=df.pp_c.values, observed=True)
+    na_n = (df.itt_n - df.pp_n).values
+    na_c = (df.itt_c - df.pp_c).values
+    na_cases = pm.Binomial('na_cases', na_n, RR_NA*i0, value=na_c, observed=True)
 
-def incidence_model(f_A):
-    RR_NA = pm.Uniform('RR_NA', 1., 10., value=2)
-    # latent variable : per-protocol incidence rate
-    i0 = [pm.Uniform(f'i0_{j}', 0., 1., value=.01) for j in range(len(df_incidence))] # allows for different incidence rates in all arms of all studies
-
-    pp_cases = pm.Binomial('pp_cases', df_incidence.pp_n, i0,
-                           value=df_incidence.pp_c, observed=True)
-    na_n = df_incidence.itt_n - df_incidence.pp_n
-    na_c = df_incidence.itt_c-df_incidence.pp_c
-    na_cases = pm.Binomial('na_cases', na_n, RR_NA*i0,
-                           value=na_c, observed=True)
-    
-    
     e_ITT = pm.TruncatedNormal('itt_efficacy', mu=0.41, tau=((.80 - .19)/4)**-2, a=0.05, b=.95)
-                    # consider transforming this to log or logit space
 
     @pm.deterministic
     def RR_no_tx(f_A=f_A, RR_NA=RR_NA, e_ITT=e_ITT):
@@ -116,152 +96,116 @@ def incidence_model(f_A):
 
     return locals()
 
-def joint_model():
-    vars1 = adherence_model(df_adherence)
-    f_A = vars1['pi_pred'][2] # predicted adherence fraction for an RCT of 6H
-    
-    vars2 = incidence_model(f_A)
-    vars1.update(vars2)
-    return vars1
-
-m = pm.MCMC(joint_model())
-m.sample(20_000, 10_000, 10)
-m.pi_pred.summary()
-
-
-# In[10]:
-
-
-m.e_ITT.summary() # should be similar to prior of 0.41 (.19, .80)
-
-
-# In[11]:
-
-
-plt.plot(m.pi_pred.trace())
-plt.xlabel('Draw from approximate posterior distribution')
-plt.grid();
-
-
-# In[12]:
-
-
-plt.plot(m.RR_NA.trace())
-plt.plot(m.RR_no_tx.trace())
-plt.xlabel('Draw from approximate posterior distribution')
-plt.grid();
-
-
-# In[13]:
-
-
-plt.plot(m.e_ITT.trace())
-plt.xlabel('Draw from approximate posterior distribution')
-plt.grid();
-
-
-# In[14]:
-
-
-for i0_j in m.i0:
-    plt.plot(i0_j.trace())
-plt.xlabel('Draw from approximate posterior distribution')
-plt.grid();
-
-
-# In[15]:
-
-
-results = pd.DataFrame()
-results['adherence_3hp_real_world'] = m.pi_pred.trace()[:,0]
-results['adherence_6h_real_world'] = m.pi_pred.trace()[:,1]
-results['adherence_6h_rct'] = m.pi_pred.trace()[:,2]
-results['RR_no_tx'] = m.RR_no_tx.trace()
-results['RR_NA'] = m.RR_NA.trace()
-np.round(results.describe(percentiles=[0.025, 0.975]).loc[['mean', '2.5%', '97.5%']], 3).T
-
-
-# In[16]:
-
-
-# rr_no_tx directly from Comstock 1979
-(42/1550) / (22/1633)
-
-
-# In[17]:
-
-
-import seaborn as sns
-
-def y_eq_x_line(g):
-
-    x0, x1 = g.ax_joint.get_xlim()
-    y0, y1 = g.ax_joint.get_ylim()
-    lims = [max(x0, y0), min(x1, y1)]
-    g.ax_joint.plot(lims, lims, ':k')    
-    g.ax_joint.text(x1, y1, '\ny=x    ', ha='right', va='top')
-
-g = sns.jointplot('adherence_3hp_real_world', 'adherence_6h_real_world',
-                  results, kind="kde", height=7, space=0)
-y_eq_x_line(g)
-
-
-# In[18]:
-
-
-g = sns.jointplot('adherence_6h_rct', 'adherence_6h_real_world',
-                  results, kind="kde", height=7, space=0)
-y_eq_x_line(g)  # should i have a prior that the rct has better adherence than the real-world?
-
-
-# In[19]:
-
-
-g = sns.jointplot('RR_no_tx', 'RR_NA',
-                  results, kind="kde", height=7, space=0)
-
-
-# In[20]:
-
-
-results.to_csv('./treatment_adherence_draws.csv')
-results
-
-
-# In[21]:
-
-
-(results.RR_NA > 1).mean()
-
-
-# In[22]:
-
-
-(results.RR_no_tx > 1).mean()
-
-
-# In[23]:
-
-
-(results.RR_no_tx > results.RR_NA).mean()  # is this a problem?
-
-
-# In[24]:
-
-
-(results.adherence_3hp_real_world > results.adherence_6h_real_world).mean()
-
-
-# In[25]:
-
-
-m.beta[0].summary()
-m.beta[1].summary()
-m.beta[2].summary()
-m.beta[3].summary()
-
-# beta[0] is constant
-# beta[1] is length effect (units are months)
-# beta[2] is the 3hp effect (weekly treatment instead of daily)
-# beta[3] is the rct effect
 
+def joint_model(df_adherence: pd.DataFrame, df_incidence: pd.DataFrame) -> Dict:
+    model = adherence_model(df_adherence)
+    f_A = model['pi_pred'][2]  # predicted adherence fraction for an RCT of 6H
+    model.update(incidence_model(df_incidence, f_A))
+    return model
+
+
+def sample_chain(df_adherence: pd.DataFrame, df_incidence: pd.DataFrame, draws: int, seed: int,
+                 burn: int = BURN, thin: int = THIN) -> Dict[str, np.ndarray]:
+    """Samples one chain of the joint model and returns the traces of the
+    outputs and the diagnostic parameters."""
+    import pymc as pm
+
+    np.random.seed(seed)
+    m = pm.MCMC(joint_model(df_adherence, df_incidence))
+    m.sample(burn + draws * thin, burn, thin, progress_bar=False)
+    return {name: np.asarray(m.trace(name)[:])
+            for name in ['pi_pred', 'RR_no_tx'] + DIAGNOSTIC_PARAMETERS}
+
+
+def _sample_chain(args) -> Dict[str, np.ndarray]:
+    return sample_chain(*args)
+
+
+def sample_chains(df_adherence: pd.DataFrame, df_incidence: pd.DataFrame, chains: int = 4,
+                  draws: int = NUMBER_OF_DRAWS, seed: int = 12345, burn: int = BURN,
+                  thin: int = THIN) -> List[Dict[str, np.ndarray]]:
+    """Samples ``chains`` independent chains on a process pool, together
+    yielding ``draws`` draws."""
+    if draws % chains:
+        raise ValueError(f'{draws} draws cannot be split evenly between {chains} chains.')
+    jobs = [(df_adherence, df_incidence, draws // chains, seed + chain, burn, thin) for chain in range(chains)]
+    with multiprocessing.Pool(chains) as pool:
+        return pool.map(_sample_chain, jobs)
+
+
+def format_draws(traces: List[Dict[str, np.ndarray]]) -> pd.DataFrame:
+    pi_pred = np.concatenate([trace['pi_pred'] for trace in traces])
+    results = pd.DataFrame()
+    results['adherence_3hp_real_world'] = pi_pred[:, 0]
+    results['adherence_6h_real_world'] = pi_pred[:, 1]
+    results['adherence_6h_rct'] = pi_pred[:, 2]
+    results['RR_no_tx'] = np.concatenate([trace['RR_no_tx'] for trace in traces])
+    results['RR_NA'] = np.concatenate([trace['RR_NA'] for trace in traces])
+    return results
+
+
+def get_diagnostics(traces: List[Dict[str, np.ndarray]]) -> pd.DataFrame:
+    """Computes the Gelman-Rubin statistic and the effective sample size of
+    each diagnostic parameter and output across chains."""
+    samples = {name: np.stack([trace[name] for trace in traces]) for name in DIAGNOSTIC_PARAMETERS + ['RR_no_tx']}
+    pi_pred = np.stack([trace['pi_pred'] for trace in traces])
+    for i, name in enumerate(['adherence_3hp_real_world', 'adherence_6h_real_world', 'adherence_6h_rct']):
+        samples[name] = pi_pred[:, :, i]
+
+    diagnostics = pd.DataFrame([{'parameter': name,
+                                 'mean': chains.mean(),
+                                 'r_hat': gelman_rubin(chains),
+                                 'effective_sample_size': effective_sample_size(chains)}
+                                for name, chains in samples.items()])
+    return diagnostics.set_index('parameter')
+
+
+def gelman_rubin(chains: np.ndarray) -> float:
+    """The potential scale reduction of (chains x samples) draws."""
+    n = chains.shape[1]
+    within = chains.var(axis=1, ddof=1).mean()
+    between = n * chains.mean(axis=1).var(ddof=1)
+    pooled = (n - 1) / n * within + between / n
+    return np.sqrt(pooled / within)
+
+
+def effective_sample_size(chains: np.ndarray) -> float:
+    """The effective sample size of (chains x samples) draws, summing the
+    chain-averaged autocorrelation up to its first negative pair."""
+    m, n = chains.shape
+    centered = chains - chains.mean(axis=1, keepdims=True)
+    spectrum = np.fft.rfft(centered, n=2 * n, axis=1)
+    autocovariance = np.fft.irfft(spectrum * np.conjugate(spectrum), axis=1)[:, :n] / n
+    autocorrelation = (autocovariance / autocovariance[:, :1]).mean(axis=0)
+
+    pair_sums = autocorrelation[:-1:2] + autocorrelation[1::2]
+    negative = np.flatnonzero(pair_sums < 0)
+    pair_sums = pair_sums[:negative[0]] if len(negative) else pair_sums
+    return m * n / (2 * pair_sums.sum() - 1)
+
+
+@click.command()
+@click.option('-o', '--output-directory', default=str(OUTPUT_DIR), show_default=True,
+              type=click.Path(file_okay=False), help='The directory to write the draws and diagnostics to.')
+@click.option('-c', '--chains', default=4, show_default=True, type=click.IntRange(1),
+              help='The number of chains to sample in parallel.')
+@click.option('-s', '--seed', default=12345, show_default=True, type=click.INT,
+              help='Seed of the first chain. Chain i is seeded with seed + i.')
+def estimate_treatment_adherence(output_directory, chains, seed):
+    """Fit the LTBI treatment adherence and efficacy model and write 1000
+    posterior draws with convergence diagnostics."""
+    output_directory = Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    df_adherence = pd.read_csv(ADHERENCE_DATA_PATH)
+    df_incidence = pd.read_csv(INCIDENCE_DATA_PATH)
+
+    logger.info(f'Sampling {chains} chains of the treatment adherence and efficacy model.')
+    traces = sample_chains(df_adherence, df_incidence, chains, seed=seed)
+
+    diagnostics = get_diagnostics(traces)
+    unconverged = diagnostics.index[diagnostics.r_hat > 1.1].tolist()
+    if unconverged:
+        logger.warning(f'Chains have not converged for {unconverged}.')
+    diagnostics.to_csv(output_directory / DIAGNOSTICS_FILE)
+    format_draws(traces).to_csv(output_directory / DRAWS_FILE)
+    logger.info(f'Draws and diagnostics written to {output_directory}.')
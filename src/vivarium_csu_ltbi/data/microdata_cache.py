@@ -0,0 +1,147 @@
+"""
+Household microdata cache
+
+Parsing the household survey Stata files and cleaning their ages, sexes and
+household ids dominates the start-up of every household model job. The
+cleaned tables are cached as one ``.npy`` file per column:
+
+    {cache root}/{variant}/{sha256 of the source file}/
+        hh_id.npy     int64 household codes
+        age.npy       float32
+        sex.npy       int8 codes into the sex categories
+        metadata.json sex categories, location and source path
+
+``.npy`` files are opened memory-mapped, so a cached table loads in
+milliseconds. The variant names the cleaning procedure, since the models
+clean the same files differently. A changed source file has a new hash and
+is parsed again. The hash is remembered with the file's size and
+modification time so unchanged files are not re-read to hash them.
+
+Household ids are stored as codes from ``pd.factorize`` rather than the
+survey's own ids, which are strings for some surveys. The models only use
+them to group people into households.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Union
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from vivarium_csu_ltbi import paths as ltbi_paths
+
+COLUMN_TYPES = {'hh_id': np.int64, 'age': np.float32}
+METADATA_FILE = 'metadata.json'
+HASH_BLOCK_SIZE = 1 << 24
+
+
+def load_microdata(source_path: Union[str, Path], clean: Callable[[pd.DataFrame], pd.DataFrame],
+                   location: str, variant: str, cache_root: Union[str, Path] = None) -> pd.DataFrame:
+    """Loads cleaned household microdata through the cache.
+
+    Parameters
+    ----------
+    source_path
+        The Stata file with the survey microdata.
+    clean
+        Cleans the raw table read from ``source_path`` into ``hh_id``,
+        ``age`` and ``sex`` columns.
+    location
+        The location of the survey, stored as the ``location`` column.
+    variant
+        The name of the cleaning procedure.
+    cache_root
+        The cache directory. Defaults to ``paths.MICRODATA_CACHE_ROOT``.
+
+    Returns
+    -------
+        The cleaned microdata with ``hh_id`` (int64 household codes),
+        ``age`` (float32), ``sex`` (categorical) and ``location`` columns.
+
+    """
+    source_path = Path(source_path)
+    cache_root = Path(cache_root) if cache_root is not None else ltbi_paths.MICRODATA_CACHE_ROOT
+    cache_directory = cache_root / variant / get_source_hash(source_path, cache_root)
+    if not (cache_directory / METADATA_FILE).exists():
+        logger.info(f'Parsing {source_path} into the microdata cache.')
+        data = clean(pd.read_stata(str(source_path)))
+        write_microdata(data, cache_directory, location, source_path)
+    return read_microdata(cache_directory)
+
+
+def get_source_hash(source_path: Path, cache_root: Path) -> str:
+    """Returns the sha256 of ``source_path``, recomputing it only when the
+    file's size or modification time changed."""
+    stat = source_path.stat()
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    path_key = hashlib.sha1(str(source_path.resolve()).encode()).hexdigest()
+    record_path = cache_root / 'sources' / f'{path_key}.json'
+    if record_path.exists():
+        record = json.loads(record_path.read_text())
+        if record['signature'] == signature:
+            return record['sha256']
+
+    digest = hashlib.sha256()
+    with source_path.open('rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    record_path.parent.mkdir(parents=True, exist_ok=True)
+    record_path.write_text(json.dumps({'source': str(source_path), 'signature': signature,
+                                       'sha256': digest.hexdigest()}))
+    return digest.hexdigest()
+
+
+def write_microdata(data: pd.DataFrame, cache_directory: Path, location: str, source_path: Path):
+    """Writes cleaned microdata to ``cache_directory``.
+
+    Household ids are replaced by their ``pd.factorize`` codes. Rows without
+    a household id are dropped, as grouping by household would drop them.
+
+    The columns are written to a temporary directory that is renamed into
+    place, so concurrent jobs never read a partial entry.
+
+    """
+    cache_directory.parent.mkdir(parents=True, exist_ok=True)
+    household_codes = pd.factorize(data['hh_id'])[0]
+    if (household_codes < 0).any():
+        logger.warning(f'Dropping {(household_codes < 0).sum()} rows without a household id from {source_path}.')
+        data, household_codes = data[household_codes >= 0], household_codes[household_codes >= 0]
+    columns = {'hh_id': household_codes, 'age': pd.to_numeric(data['age']).values}
+    sex = pd.Categorical(data['sex'])
+    temporary_directory = Path(tempfile.mkdtemp(dir=str(cache_directory.parent)))
+    for column, dtype in COLUMN_TYPES.items():
+        np.save(str(temporary_directory / f'{column}.npy'), columns[column].astype(dtype))
+    np.save(str(temporary_directory / 'sex.npy'), sex.codes.astype(np.int8))
+    metadata = {'sex_categories': list(sex.categories), 'location': location, 'source': str(source_path)}
+    (temporary_directory / METADATA_FILE).write_text(json.dumps(metadata))
+    try:
+        os.rename(str(temporary_directory), str(cache_directory))
+    except OSError:
+        # Another job cached the same file first.
+        shutil.rmtree(str(temporary_directory))
+
+
+def read_microdata_columns(cache_directory: Path) -> Dict[str, np.ndarray]:
+    """Opens the cached columns memory-mapped, with the sex codes and
+    categories as ``sex`` and ``sex_categories``."""
+    columns = {column: np.load(str(cache_directory / f'{column}.npy'), mmap_mode='r')
+               for column in list(COLUMN_TYPES) + ['sex']}
+    metadata = json.loads((cache_directory / METADATA_FILE).read_text())
+    columns['sex_categories'] = metadata['sex_categories']
+    columns['location'] = metadata['location']
+    return columns
+
+
+def read_microdata(cache_directory: Path) -> pd.DataFrame:
+    columns = read_microdata_columns(cache_directory)
+    return pd.DataFrame({
+        'hh_id': columns['hh_id'],
+        'age': columns['age'],
+        'sex': pd.Categorical.from_codes(columns['sex'], categories=columns['sex_categories']),
+        'location': columns['location'],
+    })
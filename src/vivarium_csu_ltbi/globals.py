@@ -74,7 +74,8 @@ TOTAL_YLDS_COLUMN = 'years_lived_with_disability'
 RANDOM_SEED_COLUMN = 'random_seed'
 INPUT_DRAW_COLUMN = 'input_draw'
 SCENARIO_COLUMN = "ltbi_treatment_scale_up.scenario"
-NUM_SCENARIOS = 3
+SCENARIOS = ['baseline', '6H_scale_up', '3HP_scale_up']
+NUM_SCENARIOS = len(SCENARIOS)
 
 
 STANDARD_COLUMNS = {'total_population': TOTAL_POP_COLUMN,
@@ -119,6 +120,7 @@ AGE_GROUPS = [
 ]
 YEARS = ['2019', '2020', '2021', '2022', '2023', '2024']
 EXPOSURE_GROUPS = [HOUSEHOLD_TUBERCULOSIS_EXPOSED, HOUSEHOLD_TUBERCULOSIS_UNEXPOSED]
+TREATMENT_TYPES = ['untreated', '6H', '3HP']
 TREATMENT_GROUPS = ['untreated', '6H_adherent', '6H_nonadherent', '3HP_adherent', '3HP_nonadherent']
 POP_STATES = ['tracked', 'untracked', 'living', 'dead']
 CAUSE_OF_DISABILITY_STATES = [ACTIVETB_POSITIVE_HIV, ACTIVETB_SUSCEPTIBLE_HIV,
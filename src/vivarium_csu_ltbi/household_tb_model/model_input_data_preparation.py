@@ -1,7 +1,8 @@
 import numpy as np
 import pandas as pd
 from get_draws.api import get_draws
-from vivarium.interpolation import Interpolation
+
+from vivarium_csu_ltbi.data import microdata_cache
 
 
 master_dir = '/home/j/Project/simulation_science/latent_tuberculosis_infection/literature/household_structure/microdata/'
@@ -35,7 +36,11 @@ sex_dict = {1: 'Male', 2: 'Female'}
 
 def load_hh_data(location_id: int):
     country_name = country_dict[location_id]
-    df = pd.read_stata(master_dir + country_name + '.dta').dropna()
+    return microdata_cache.load_microdata(master_dir + country_name + '.dta',
+                                          lambda df: clean_hh_data(df, country_name), country_name, 'gbd2019')
+
+def clean_hh_data(df: pd.DataFrame, country_name: str):
+    df = df.dropna()
     if 'hhid' in df.columns:
         df.rename(columns={'hhid': 'hh_id'}, inplace=True)
     if country_name in ['China', 'Russian_Federation', 'South_Africa']:
@@ -8,7 +8,11 @@ from vivarium_csu_ltbi import globals as ltbi_globals
 BASE_DIR = Path(vivarium_csu_ltbi.__file__).resolve().parent
 ARTIFACT_ROOT = BASE_DIR / 'artifacts'
 HOUSEHOLD_TB_ARTIFACT_ROOT = ARTIFACT_ROOT / "household_tb"
+MICRODATA_CACHE_ROOT = HOUSEHOLD_TB_ARTIFACT_ROOT / "microdata"
 LTBI_INCIDENCE_ARTIFACT_ROOT = ARTIFACT_ROOT / "ltbi_incidence"
+POPULATION_ARTIFACT_ROOT = ARTIFACT_ROOT / "population"
+GBD_COMPARISON_ROOT = ARTIFACT_ROOT / "gbd_comparison"
+BENCHMARK_ROOT = BASE_DIR / "benchmarks"
 
 RESULT_DIRECTORY = Path(f'/share/costeffectiveness/results/{ltbi_globals.PROJECT_NAME}/')
 
@@ -68,6 +72,18 @@ def get_ltbi_inc_intermediate_output_dir_path(location):
     return output_path
 
 
+def get_population_snapshot_path(location, gbd_round_id, source='database'):
+    formatted_location = ltbi_globals.formatted_location(location)
+    POPULATION_ARTIFACT_ROOT.mkdir(parents=True, exist_ok=True)
+    return POPULATION_ARTIFACT_ROOT / f'{formatted_location}_gbd_round_{gbd_round_id}_{source}.hdf'
+
+
+def get_gbd_comparison_path(location, gbd_round_id):
+    formatted_location = ltbi_globals.formatted_location(location)
+    GBD_COMPARISON_ROOT.mkdir(parents=True, exist_ok=True)
+    return GBD_COMPARISON_ROOT / f'{formatted_location}_gbd_round_{gbd_round_id}.hdf'
+
+
 def get_final_artifact_path(location):
     formatted_location = ltbi_globals.formatted_location(location)
     return ARTIFACT_ROOT / f'{formatted_location}.hdf'
@@ -0,0 +1,61 @@
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from vivarium_csu_ltbi.results_processing import storage, utilities
+
+ADHERENT_GROUPS = ['6H_adherent', '3HP_adherent']
+TREATED_GROUPS = ADHERENT_GROUPS + ['6H_nonadherent', '3HP_nonadherent']
+ALL_GROUPS = TREATED_GROUPS + ['untreated']
+INDEX_COLUMNS = ['scenario', 'risk_group', 'cause', 'age', 'sex', 'year']
+QUANTILES = {'2.5%': 2.5, '97.5%': 97.5}
+SUBGROUPS = {'treated': TREATED_GROUPS, 'all treatment': ALL_GROUPS}
+
+
+def load_person_time(path: Union[str, Path]) -> pd.DataFrame:
+    """Reads the rows of the person time count data needed for adherence."""
+    return storage.read_table(path, treatment_group=ALL_GROUPS)
+
+
+def summarize_adherence(person_time: pd.DataFrame, location: str) -> pd.DataFrame:
+    """Summarizes the proportion of person time on treatment spent adherent.
+
+    Adherent, treated and total person time are summed in one grouped pass
+    over the treatment groups, and their ratios are summarized over draws.
+
+    Parameters
+    ----------
+    person_time
+        Long-format person time count data by treatment group and draw.
+    location
+        The location of the results.
+
+    Returns
+    -------
+        The mean and the 95% uncertainty interval of the adherent proportion
+        among the treated (``population_subgroup`` 'treated') and among
+        everyone (``population_subgroup`` 'all treatment') by scenario,
+        risk group, cause, age, sex and year.
+
+    """
+    treatment_group = person_time['treatment_group'].astype(str).values
+    value = person_time['value'].values
+    totals = person_time[INDEX_COLUMNS + ['draw']].assign(
+        adherent=np.where(np.isin(treatment_group, ADHERENT_GROUPS), value, 0.),
+        **{subgroup: np.where(np.isin(treatment_group, groups), value, 0.)
+           for subgroup, groups in SUBGROUPS.items()}
+    )
+    totals = totals.groupby(INDEX_COLUMNS + ['draw'], observed=True, sort=False).sum()
+
+    proportions = pd.concat([pd.DataFrame({'population_subgroup': subgroup,
+                                           'value': totals['adherent'] / totals[subgroup]}).reset_index()
+                             for subgroup in SUBGROUPS], ignore_index=True)
+    # Draws without treated person time have no proportion and, as with
+    # ``describe``, are left out of the summary of their group.
+    summary = utilities.summarize_draws(proportions, INDEX_COLUMNS + ['population_subgroup'],
+                                        quantiles=QUANTILES, skipna=True)
+    summary = summary.reset_index()
+    summary.insert(0, 'location', location)
+    return summary
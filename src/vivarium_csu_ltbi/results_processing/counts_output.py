@@ -1,23 +1,75 @@
-from typing import Tuple, NamedTuple
+from typing import Callable, Tuple
 
+import numpy as np
 import pandas as pd
 
-from vivarium_csu_ltbi.results_processing import utilities
+from vivarium_csu_ltbi.results_processing import population, storage, utilities
 
 
-class MeasureData(NamedTuple):
-    deaths: pd.DataFrame
-    person_time: pd.DataFrame
-    ltbi_person_time: pd.DataFrame
-    ylls: pd.DataFrame
-    ylds: pd.DataFrame
-    tb_cases: pd.DataFrame
-    national_population: pd.DataFrame
+class MeasureData:
+    """Count-space measures split out of the model results.
 
-    def dump(self, output_path):
-        for name, df in self._asdict().items():
-            df.to_hdf(str(output_path / f"{name}_count_data.hdf"), mode='w', key='data')
-            df.to_csv(str(output_path / f"{name}_count_data.csv"))
+    The rows of the count-space data are indexed by measure label once, and
+    each measure is computed from the rows of its own labels the first time
+    it is accessed. Computed measures are memoized.
+
+    """
+    fields = ('deaths', 'person_time', 'ltbi_person_time', 'ylls', 'ylds', 'tb_cases', 'national_population')
+
+    def __init__(self, data: pd.DataFrame, location: str, population_provider=None):
+        self.location = location
+        self._data = data
+        self._population_provider = population_provider
+        self._measure_rows = data.groupby('measure').indices
+        self._measures = {}
+
+    @property
+    def deaths(self) -> pd.DataFrame:
+        return self._get('deaths', lambda: get_measure(self._select('death'), 'death'))
+
+    @property
+    def person_time(self) -> pd.DataFrame:
+        return self._get('person_time', self._split_person_time)[0]
+
+    @property
+    def ltbi_person_time(self) -> pd.DataFrame:
+        return self._get('person_time', self._split_person_time)[1]
+
+    @property
+    def ylls(self) -> pd.DataFrame:
+        return self._get('ylls', lambda: get_measure(self._select('ylls'), 'ylls'))
+
+    @property
+    def ylds(self) -> pd.DataFrame:
+        return self._get('ylds', lambda: get_measure(self._select('ylds'), 'ylds'))
+
+    @property
+    def tb_cases(self) -> pd.DataFrame:
+        return self._get('tb_cases', lambda: get_tb_events(self._select('event_count')))
+
+    @property
+    def national_population(self) -> pd.DataFrame:
+        return self._get('national_population',
+                         lambda: get_risk_specific_population(self.person_time, self.location,
+                                                              self._population_provider))
+
+    def dump(self, output_path, csv=False):
+        for name in self.fields:
+            storage.write_table(getattr(self, name), output_path / f"{name}_count_data.hdf", csv=csv)
+
+    def _get(self, name: str, compute: Callable):
+        if name not in self._measures:
+            self._measures[name] = compute()
+        return self._measures[name]
+
+    def _select(self, label: str) -> pd.DataFrame:
+        """Selects the rows of every measure whose name contains ``label``."""
+        rows = [positions for measure, positions in self._measure_rows.items() if label in measure]
+        rows = np.sort(np.concatenate(rows)) if rows else np.array([], dtype=int)
+        return self._data.iloc[rows]
+
+    def _split_person_time(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        return get_person_time(self._select('_person_time'))
 
 
 def get_year_from_template(template_string: str) -> str:
@@ -155,66 +207,16 @@ def get_tb_events(data: pd.DataFrame) -> pd.DataFrame:
     return sort_data(data).drop(columns=['cause'])
 
 
-def get_national_population(location: str) -> pd.DataFrame:
-    from db_queries import get_ids, get_population
-
-    age_group_ids = list(range(2, 21)) + [30, 31, 32, 235]
-    age_table = get_ids('age_group')
-    age_table = age_table[age_table.age_group_id.isin(age_group_ids)]
-    age_table['age_group_name'] = age_table.age_group_name.map(lambda x: x.replace(' ', '_').lower())
-    age_group_dict = dict(zip(age_table.age_group_id, age_table.age_group_name))
-
-    location_dict = {'ethiopia': 179, 'india': 163, 'peru': 123, 'philippines': 16, 'south_africa': 196}
-    pop = get_population(location_id=location_dict[location],
-                         age_group_id=age_group_ids,
-                         sex_id=[1, 2],
-                         gbd_round_id=5)
-    pop['age'] = pop.age_group_id.map(age_group_dict)
-    pop['sex'] = pop.sex_id.map({1: 'male', 2: 'female'})
-    data = pop[['age', 'sex', 'population']]
-
-    labels = {'0_to_5': ['early_neonatal', 'late_neonatal', 'post_neonatal', '1_to_4'],
-              '5_to_15': ['5_to_9', '10_to_14'],
-              '15_to_60': ['15_to_19', '20_to_24', '25_to_29',
-                           '30_to_34', '35_to_39', '40_to_44',
-                           '45_to_49', '50_to_54', '55_to_59', ],
-              '60+': ['60_to_64', '65_to_69', '70_to_74', '75_to_79',
-                      '80_to_84', '85_to_89', '90_to_94', '95_plus']}
-    age_aggregates = []
-    for group, ages in labels.items():
-        age_group = data[data.age.isin(ages)]
-        age_group = (age_group
-                     .groupby(['sex'])
-                     .sum()
-                     .reset_index())
-        age_group['age'] = group
-        age_aggregates.append(age_group)
-    data = pd.concat(age_aggregates)
-
-    all_ages = (data
-                .groupby(['sex'])
-                .sum()
-                .reset_index())
-    all_ages['age'] = 'all'
-    data = pd.concat([data, all_ages])
-
-    both_sexes = (data
-                  .groupby(['age'])
-                  .sum()
-                  .reset_index())
-    both_sexes['sex'] = 'all'
-    data = pd.concat([data, both_sexes])
-
-    data['location'] = location
-    return data
+def get_national_population(location: str, provider=None) -> pd.DataFrame:
+    return population.get_population_snapshot(location, provider=provider).copy()
 
 
-def get_risk_specific_population(data: pd.DataFrame, location: str) -> pd.DataFrame:
-    pt, ltbi_pt = get_person_time(data)
+def get_risk_specific_population(person_time: pd.DataFrame, location: str, population_provider=None) -> pd.DataFrame:
+    pt = person_time.copy()
     pt['location'] = location
     pt = utilities.aggregate_over_treatment_group(pt)
     index_cols = ['location', 'year', 'age', 'sex', 'cause', 'risk_group', 'scenario', 'treatment_group']
-    pt = utilities.pivot_and_summarize(pt, index_cols)
+    pt = utilities.summarize_draws(pt, index_cols)
     # 2019 baseline mean person_time
     pt = (pt
           .reset_index()
@@ -238,7 +240,7 @@ def get_risk_specific_population(data: pd.DataFrame, location: str) -> pd.DataFr
     plwhiv_prop = pt_plwhiv / pt_all_population
     u5_hhtb_prop = pt_u5_hhtb / pt_all_population.query('age == "0_to_5"')
     
-    population = get_national_population(location)
+    population = get_national_population(location, population_provider)
     population = population.rename(columns={'population': 'mean'}).set_index(pt_cols)
     
     plwhiv_pop = (plwhiv_prop * population).reset_index()
@@ -325,12 +327,5 @@ def sort_data(data: pd.DataFrame) -> pd.DataFrame:
     return data.set_index(column_order).sort_index().reset_index()
 
 
-def split_measures(data: pd.DataFrame, location: str) -> MeasureData:
-    deaths = get_measure(data, 'death')
-    person_time, ltbi_person_time = get_person_time(data)
-    ylls = get_measure(data, 'ylls')
-    ylds = get_measure(data, 'ylds')
-    tb_cases = get_tb_events(data)
-    national_population = get_risk_specific_population(data, location)
-    return MeasureData(deaths, person_time, ltbi_person_time, ylls, ylds,
-                       tb_cases, national_population)
+def split_measures(data: pd.DataFrame, location: str, population_provider=None) -> MeasureData:
+    return MeasureData(data, location, population_provider)
@@ -0,0 +1,162 @@
+"""
+Merging of raw outputs across model runs.
+
+Large analyses are split over several runs of the same model, e.g. the 10%
+and 100% coverage end points, each writing its own ``output.hdf`` per
+location. Runs are combined by stacking all of their rows with a
+``location`` key and summing once over location, draw and scenario, which
+also sums over seeds. Observer columns are then reduced to the measures and
+population subgroups of interest with one product against a matrix of
+column masks, and summaries of every location, measure and subgroup are
+taken in a single grouped pass.
+"""
+from pathlib import Path
+from typing import Dict, Mapping, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from vivarium_csu_ltbi.results_processing import utilities
+
+DRAW_COLUMN = 'input_draw_number'
+SCENARIO_COLUMN = 'ltbi_treatment_scale_up.scenario'
+RUN_INDEX_COLUMNS = ['location', DRAW_COLUMN, SCENARIO_COLUMN]
+BASELINE = 'baseline'
+AVERTED = {'6H_averted': '6H_scale_up', '3HP_averted': '3HP_scale_up'}
+QUANTILES = {'lower': 2.5, 'upper': 97.5}
+
+COLUMN_PATTERNS = {
+    'age_group': '^.*age_group_([a-z]*_?[a-z]*[0-9]*_?t?o?_?[0-9]*)',
+    'hiv_status': 'activetb_([a-z]*)_hiv',
+    'hh_status': '^.*_([a-z]*)_to_hhtb',
+    'year': '^.*in_([0-9]{4})',
+}
+UNDER_FIVE = ['early_neonatal_', 'late_neonatal_', 'post_neonatal_', '1_to_4']
+YEARS = ['2020', '2021', '2022', '2023', '2024']
+
+
+def get_paths_by_location(runs: Mapping[str, Mapping[str, Union[str, Path]]]) -> Dict[str, list]:
+    """Groups the output paths of every run by location.
+
+    Parameters
+    ----------
+    runs
+        Mapping between run names and the mapping between locations and the
+        output file of the run for that location.
+
+    Returns
+    -------
+        Mapping between locations and the output files of every run that
+        covers the location.
+
+    """
+    paths = {}
+    for run_paths in runs.values():
+        for location, path in run_paths.items():
+            paths.setdefault(location, []).append(path)
+    return paths
+
+
+def load_runs(paths: Mapping[str, Sequence[Union[str, Path]]]) -> pd.DataFrame:
+    """Reads and combines the outputs of several runs.
+
+    Parameters
+    ----------
+    paths
+        Mapping between locations and the output files of their runs.
+
+    Returns
+    -------
+        The observer columns summed over runs and seeds, indexed by location,
+        draw and scenario. Person time columns are dropped and columns a run
+        does not have count as zero.
+
+    """
+    outputs = []
+    for location, location_paths in paths.items():
+        for path in location_paths:
+            logger.info(f'Reading {path}.')
+            output = pd.read_hdf(str(path)).reset_index()
+            output = output.drop(columns=[c for c in output.columns if c in ['index', 'random_seed']])
+            output.insert(0, 'location', location)
+            outputs.append(output)
+    data = pd.concat(outputs, ignore_index=True, sort=False)
+    data = data.drop(columns=list(data.filter(like='person_time').columns))
+    return data.groupby(RUN_INDEX_COLUMNS).sum()
+
+
+def parse_columns(columns: pd.Index) -> pd.DataFrame:
+    """Extracts the age group, HIV status, household TB status and year from
+    observer column names, one row per column."""
+    columns = pd.Index(columns)
+    return pd.DataFrame({attribute: columns.str.extract(pattern, expand=False)
+                         for attribute, pattern in COLUMN_PATTERNS.items()}, index=columns)
+
+
+def sum_columns(data: pd.DataFrame, masks: pd.DataFrame) -> pd.DataFrame:
+    """Sums the columns of ``data`` selected by each boolean column of
+    ``masks``, which is indexed by the columns of ``data``."""
+    masks = masks.reindex(data.columns, fill_value=False)
+    return pd.DataFrame(data.values @ masks.values.astype(np.float64), index=data.index, columns=masks.columns)
+
+
+def get_averted_masks(columns: pd.Index, measure_patterns: Mapping[str, str]) -> pd.DataFrame:
+    """Builds the column masks of every measure for children under five in
+    households with TB and for people living with HIV, over 2020-2024."""
+    attributes = parse_columns(columns)
+    in_years = attributes['year'].isin(YEARS)
+    subgroups = {
+        'U5_hh': attributes['age_group'].isin(UNDER_FIVE) & (attributes['hh_status'] == 'exposed') & in_years,
+        'PLWHIV': (attributes['hiv_status'] == 'positive') & in_years,
+    }
+    masks = {}
+    for measure, pattern in measure_patterns.items():
+        in_measure = columns.str.contains(pattern)
+        for people, subgroup in subgroups.items():
+            masks[(measure, people)] = in_measure & subgroup.values
+    masks = pd.DataFrame(masks, index=columns)
+    masks.columns.names = ['measure', 'people']
+    return masks
+
+
+def summarize_averted(data: pd.DataFrame, measure_patterns: Mapping[str, str]) -> pd.DataFrame:
+    """Summarizes the percent of each measure averted by each scale up.
+
+    Parameters
+    ----------
+    data
+        Combined run outputs from ``load_runs``.
+    measure_patterns
+        Mapping between measure names and regular expressions selecting
+        their observer columns.
+
+    Returns
+    -------
+        A tidy table with the mean and the 95% uncertainty interval of the
+        percent averted by location, measure, population subgroup and
+        scenario. Draws with no baseline events count as zero averted.
+
+    """
+    totals = sum_columns(data, get_averted_masks(data.columns, measure_patterns))
+    totals = totals.stack(['measure', 'people']).unstack(SCENARIO_COLUMN)
+    baseline = totals[BASELINE]
+    averted = pd.DataFrame({scenario: ((baseline - totals[scale_up]) * 100 / baseline).fillna(0)
+                            for scenario, scale_up in AVERTED.items()})
+    averted.columns.name = 'scenario'
+    averted = averted.stack().rename('value').reset_index().rename(columns={DRAW_COLUMN: 'draw'})
+
+    summary = utilities.summarize_draws(averted, ['location', 'measure', 'people', 'scenario'], quantiles=QUANTILES)
+    return summary.reset_index().rename(columns={'location': 'country'})
+
+
+def get_under_five_household_exposure(data: pd.DataFrame) -> pd.Series:
+    """The proportion of person time among children under five spent in a
+    household with TB, by location, over all draws and scenarios."""
+    columns = data.columns[data.columns.str.contains('hhtb')]
+    attributes = parse_columns(columns)
+    under_five = attributes['age_group'].isin(UNDER_FIVE)
+    masks = pd.DataFrame({'under_five': under_five,
+                          'exposed': under_five & (attributes['hh_status'] == 'exposed')})
+    totals = sum_columns(data, masks).groupby(level='location').sum()
+    return (totals['exposed'] / totals['under_five']).rename('hhtb_prop')
@@ -0,0 +1,128 @@
+"""
+National population snapshots used to scale risk group person time up to
+population counts.
+
+Populations are pulled from a provider once per location and GBD round,
+aggregated to the age groups and sexes reported in the final tables and
+stored as a local snapshot. Later results processing reads the snapshot and
+does not need database access. Snapshots are keyed on the source of the
+populations, so changing the population file, or editing it, builds a new
+snapshot instead of serving the old one.
+"""
+import hashlib
+from pathlib import Path
+from typing import Dict, Union
+
+import pandas as pd
+from loguru import logger
+
+import vivarium_csu_ltbi.paths as ltbi_paths
+
+GBD_ROUND_ID = 5
+LOCATION_IDS = {'ethiopia': 179, 'india': 163, 'peru': 123, 'philippines': 16, 'south_africa': 196}
+AGE_GROUP_IDS = list(range(2, 21)) + [30, 31, 32, 235]
+SEX_IDS = {1: 'male', 2: 'female'}
+AGE_AGGREGATES = {'0_to_5': ['early_neonatal', 'late_neonatal', 'post_neonatal', '1_to_4'],
+                  '5_to_15': ['5_to_9', '10_to_14'],
+                  '15_to_60': ['15_to_19', '20_to_24', '25_to_29',
+                               '30_to_34', '35_to_39', '40_to_44',
+                               '45_to_49', '50_to_54', '55_to_59', ],
+                  '60+': ['60_to_64', '65_to_69', '70_to_74', '75_to_79',
+                          '80_to_84', '85_to_89', '90_to_94', '95_plus']}
+
+
+class DatabasePopulationProvider:
+    """Pulls GBD populations from the IHME databases."""
+
+    def get_source_key(self) -> str:
+        return 'database'
+
+    def get_population(self, location: str, gbd_round_id: int) -> pd.DataFrame:
+        from db_queries import get_ids, get_population
+
+        age_table = get_ids('age_group')
+        age_table = age_table[age_table.age_group_id.isin(AGE_GROUP_IDS)]
+        age_names = dict(zip(age_table.age_group_id,
+                             age_table.age_group_name.map(lambda x: x.replace(' ', '_').lower())))
+
+        pop = get_population(location_id=LOCATION_IDS[location],
+                             age_group_id=AGE_GROUP_IDS,
+                             sex_id=list(SEX_IDS),
+                             gbd_round_id=gbd_round_id)
+        pop['age'] = pop.age_group_id.map(age_names)
+        pop['sex'] = pop.sex_id.map(SEX_IDS)
+        return pop[['age', 'sex', 'population']]
+
+
+class FilePopulationProvider:
+    """Serves populations from a local csv or hdf file.
+
+    The file has ``location``, ``age``, ``sex`` and ``population`` columns
+    with GBD age group names formatted as in the model results. An optional
+    ``gbd_round_id`` column allows one file to hold several rounds.
+
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    def get_source_key(self) -> str:
+        """Identifies the file by its path, size and modification time."""
+        stat = self.path.stat()
+        signature = f'{self.path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}'
+        return 'file_' + hashlib.sha1(signature.encode()).hexdigest()[:16]
+
+    def get_population(self, location: str, gbd_round_id: int) -> pd.DataFrame:
+        if self.path.suffix == '.csv':
+            data = pd.read_csv(self.path)
+        else:
+            data = pd.read_hdf(self.path)
+        data = data[data.location == location]
+        if 'gbd_round_id' in data.columns:
+            data = data[data.gbd_round_id == gbd_round_id]
+        if data.empty:
+            raise ValueError(f'No population for {location} and GBD round {gbd_round_id} in {self.path}.')
+        return data[['age', 'sex', 'population']]
+
+
+def aggregate_population(population: pd.DataFrame) -> pd.DataFrame:
+    """Aggregates populations by GBD age group and sex into the reporting
+    age groups, all ages and both sexes."""
+    age_map = {age: group for group, ages in AGE_AGGREGATES.items() for age in ages}
+    data = population.assign(age=population.age.map(age_map)).dropna(subset=['age'])
+    data = data.groupby(['sex', 'age']).population.sum().reset_index()
+
+    all_ages = data.groupby('sex').population.sum().reset_index()
+    all_ages['age'] = 'all'
+    data = pd.concat([data, all_ages], ignore_index=True, sort=False)
+
+    both_sexes = data.groupby('age').population.sum().reset_index()
+    both_sexes['sex'] = 'all'
+    return pd.concat([data, both_sexes], ignore_index=True, sort=False)
+
+
+_SNAPSHOTS: Dict[Path, pd.DataFrame] = {}
+
+
+def get_population_snapshot(location: str, gbd_round_id: int = GBD_ROUND_ID,
+                            provider=None) -> pd.DataFrame:
+    """Gets the aggregated national population of a location.
+
+    The snapshot of ``provider``, which defaults to the GBD databases, is
+    read from disk if it exists. Otherwise it is built from ``provider`` and
+    written to disk. Snapshots are memoized by source, so callers must not
+    modify the returned frame.
+
+    """
+    provider = DatabasePopulationProvider() if provider is None else provider
+    snapshot_path = ltbi_paths.get_population_snapshot_path(location, gbd_round_id, provider.get_source_key())
+    if snapshot_path not in _SNAPSHOTS:
+        if snapshot_path.exists():
+            data = pd.read_hdf(str(snapshot_path), key='population')
+        else:
+            logger.info(f"Building population snapshot for {location} and GBD round {gbd_round_id}.")
+            data = aggregate_population(provider.get_population(location, gbd_round_id))
+            data['location'] = location
+            data.to_hdf(str(snapshot_path), key='population', mode='w')
+        _SNAPSHOTS[snapshot_path] = data
+    return _SNAPSHOTS[snapshot_path]
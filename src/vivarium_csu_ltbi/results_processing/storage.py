@@ -0,0 +1,161 @@
+"""
+On-disk format for processed results.
+
+Each table is written to a single compressed HDF file in PyTables ``table``
+format, split into one node per (scenario, year) partition. Label columns
+are stored as categoricals and the columns most often used to subset the
+results are indexed data columns, so reads can skip whole partitions and
+push the remaining filters down to PyTables instead of loading every draw.
+"""
+from pathlib import Path
+import re
+from typing import Any, Dict, List, Union
+
+import pandas as pd
+
+PARTITION_COLUMNS = ['scenario', 'year']
+FILTER_COLUMNS = ['location', 'risk_group', 'outcome', 'treatment_group']
+PARTITIONS_KEY = 'partitions'
+COMPRESSION_LIBRARY = 'blosc'
+COMPRESSION_LEVEL = 5
+
+
+def write_table(data: pd.DataFrame, path: Union[str, Path], csv: bool = False):
+    """Writes a results table partitioned by scenario and year.
+
+    Parameters
+    ----------
+    data
+        The table to write. Named index levels are stored as columns and
+        restored by ``read_table``.
+    path
+        The HDF file to write. Any existing file is replaced.
+    csv
+        Whether to also export the table as csv next to the HDF file.
+
+    """
+    path = Path(path)
+    index_columns = [name for name in data.index.names if name is not None]
+    table = data.reset_index() if index_columns else data.reset_index(drop=True)
+    partition_columns = [c for c in PARTITION_COLUMNS if c in table.columns]
+
+    partitions = []
+    with pd.HDFStore(str(path), mode='w', complevel=COMPRESSION_LEVEL, complib=COMPRESSION_LIBRARY) as store:
+        if partition_columns:
+            for values, partition in table.groupby(partition_columns, sort=False, observed=True):
+                values = values if isinstance(values, tuple) else (values,)
+                labels = dict(zip(partition_columns, [str(v) for v in values]))
+                key = get_partition_key(labels)
+                _put(store, key, partition.drop(columns=partition_columns))
+                partitions.append({'key': key, **labels})
+        else:
+            _put(store, 'data', table)
+            partitions.append({'key': 'data'})
+
+        store.put(PARTITIONS_KEY, pd.DataFrame(partitions, columns=['key'] + partition_columns), format='table')
+        attrs = store.get_storer(PARTITIONS_KEY).attrs
+        attrs.index_columns = index_columns
+        attrs.columns = list(table.columns)
+        attrs.dtypes = {column: str(dtype) for column, dtype in table.dtypes.items()}
+
+    if csv:
+        data.to_csv(str(path.with_suffix('.csv')))
+
+
+def read_table(path: Union[str, Path], **filters: Any) -> pd.DataFrame:
+    """Reads a table written by ``write_table``.
+
+    Parameters
+    ----------
+    path
+        The HDF file to read.
+    filters
+        Column values to keep, as a single value or a list of values.
+        Scenario and year filters select partitions without reading the
+        others. Filters on location, risk group, outcome and treatment
+        group are evaluated by PyTables while reading. Filters on any other
+        column are applied in memory.
+
+    Returns
+    -------
+        The table with its original index, columns and column types. Rows
+        are ordered by partition.
+
+    Raises
+    ------
+    ValueError
+        If a filter refers to a column that is not in the table.
+
+    """
+    filters = {column: _as_list(values) for column, values in filters.items()}
+    with pd.HDFStore(str(path), mode='r') as store:
+        partitions = store.select(PARTITIONS_KEY)
+        attrs = store.get_storer(PARTITIONS_KEY).attrs
+        index_columns = attrs.index_columns
+        # Tables written before column types were recorded read back
+        # partition values as categorical labels.
+        columns = getattr(attrs, 'columns', None)
+        dtypes = getattr(attrs, 'dtypes', {})
+        partition_columns = [c for c in partitions.columns if c != 'key']
+        values = {column: _restore(partitions[column], dtypes.get(column, 'category'))
+                  for column in partition_columns}
+
+        selected = pd.Series(True, index=partitions.index)
+        for column in partition_columns:
+            if column in filters:
+                selected &= values[column].isin(filters[column])
+        selected = partitions[selected]
+        row_filters = {c: v for c, v in filters.items() if c not in partition_columns}
+
+        # An empty selection still reads the (empty) schema of one partition.
+        empty = selected.empty
+        chunks = []
+        for _, partition in (partitions.iloc[:1] if empty else selected).iterrows():
+            storer = store.get_storer(partition['key'])
+            where = [f'{column} == {values!r}' for column, values in row_filters.items()
+                     if column in storer.data_columns]
+            chunk = store.select(partition['key'], where=where or None, stop=0 if empty else None)
+            for column in partition_columns:
+                chunk[column] = values[column].loc[[partition.name] * len(chunk)].values
+            chunks.append(chunk)
+
+    categorical = {c for chunk in chunks for c in chunk.columns if chunk[c].dtype.name == 'category'}
+    data = pd.concat(chunks, ignore_index=True, sort=False)
+    for column, values in row_filters.items():
+        if column not in data.columns:
+            raise ValueError(f'Cannot filter {path} on unknown column {column}.')
+        data = data[data[column].isin(values)]
+    for column in categorical:
+        data[column] = data[column].astype('category')
+    for column, dtype in dtypes.items():
+        if column in data.columns and dtype != 'category' and str(data[column].dtype) != dtype:
+            data[column] = _restore(data[column], dtype)
+    data = data.reset_index(drop=True)
+    if columns is not None:
+        data = data[columns]
+    return data.set_index(index_columns) if index_columns else data
+
+
+def get_partition_key(labels: Dict[str, str]) -> str:
+    return '/'.join(f'{column}_{re.sub(r"[^0-9a-zA-Z_]", "_", value)}' for column, value in labels.items())
+
+
+def _put(store: pd.HDFStore, key: str, data: pd.DataFrame):
+    data = data.reset_index(drop=True)
+    labels = [c for c in data.columns if pd.api.types.is_string_dtype(data[c])]
+    data[labels] = data[labels].astype('category')
+    data_columns = [c for c in FILTER_COLUMNS if c in data.columns]
+    store.put(key, data, format='table', data_columns=data_columns)
+
+
+def _restore(values: pd.Series, dtype: str) -> pd.Series:
+    """Casts stored labels or categoricals back to their original type."""
+    if dtype == 'bool' and values.dtype.name != 'bool':
+        return values.astype(str) == 'True'
+    if dtype == 'object':
+        return values.astype(object)
+    return values.astype(dtype)
+
+
+def _as_list(values: Any) -> List:
+    return list(values) if isinstance(values, (list, tuple, set, pd.Index)) else [values]
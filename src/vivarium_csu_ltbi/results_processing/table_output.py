@@ -5,7 +5,7 @@ import numpy as np
 import pandas as pd
 
 from vivarium_csu_ltbi.results_processing.counts_output import MeasureData
-from vivarium_csu_ltbi.results_processing import utilities
+from vivarium_csu_ltbi.results_processing import storage, utilities
 
 warnings.filterwarnings('ignore')
 
@@ -19,76 +19,136 @@ class FinalData(NamedTuple):
     u5_hhtb_percent: pd.DataFrame
     aggregate: pd.DataFrame
 
-    def dump(self, output_path):
+    def dump(self, output_path, csv=False):
         for name, df in self._asdict().items():
-            df.to_hdf(str(output_path / f"{name}_final_table.hdf"), mode='w', key='data')
-            df.to_csv(str(output_path / f"{name}_final_table.csv"))
-
-
-def get_delta(data, join_columns):
-    baseline = (data[data.scenario == 'baseline']
-                .drop(columns='scenario')
-                .set_index(join_columns))
-
-    delta = (baseline - data.set_index(join_columns + ['scenario'])).reset_index()
-
-    return delta
-
-
-def scale_data(base_data, data_to_scale, join_columns, agg_columns=None, py_multiplier=1):
-    if agg_columns is None:
-        agg_columns = []
-
-    agg_data = (base_data
-                .groupby(join_columns)
-                .value.sum())
-    scaled = (py_multiplier * data_to_scale.set_index(join_columns + agg_columns).value / agg_data).reset_index()
-    # Remove numerical round off issues
-    scaled.loc[np.abs(scaled.value) < 1e-10, 'value'] = 0
-    return scaled
-
-
-def make_coverage_table(mdata: MeasureData, location: str):
-    pt = mdata.person_time.drop(columns='cause')
-    pt['location'] = location
-    pt['outcome'] = 'treatment_coverage'
-
-    delta_join_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'draw', 'treatment_group']
-    delta = get_delta(pt, delta_join_columns)
-
-    scale_join_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'draw', 'scenario']
-    raw_scaled = scale_data(pt, pt, scale_join_columns, ['treatment_group'])
-    delta_scaled = scale_data(pt, delta, scale_join_columns, ['treatment_group'])
-
-    index_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'scenario', 'treatment_group']
-    raw_summary = utilities.pivot_and_summarize(raw_scaled, index_columns)
-    delta_summary = utilities.pivot_and_summarize(delta_scaled, index_columns, prefix='averted_')
-
+            storage.write_table(df, output_path / f"{name}_final_table.hdf", csv=csv)
+
+
+INDEX_COLUMNS = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'scenario', 'treatment_group']
+
+
+class AlignmentIndex:
+    """Positional layout of the (scenario, key) space shared by the tables
+    built from one ``MeasureData``.
+
+    The keys are factorized once from the person time. Any count frame with
+    the same keys is scattered into a (scenarios x keys) array, so scenario
+    deltas and person time rates are plain array arithmetic rather than
+    index-aligned joins.
+    """
+    key_columns = ['year', 'age', 'sex', 'risk_group', 'treatment_group', 'draw']
+
+    def __init__(self, person_time: pd.DataFrame):
+        person_time = person_time.drop(columns='cause')
+        keys = (pd.concat([person_time, utilities.aggregate_over_treatment_group(person_time)],
+                          ignore_index=True, sort=False)
+                .filter(self.key_columns)
+                .drop_duplicates())
+        self.keys = pd.MultiIndex.from_arrays([keys[c] for c in self.key_columns])
+        self.scenarios = pd.Index(sorted(person_time.scenario.unique()))
+        self.baseline = self.scenarios.get_loc('baseline')
+
+        treatment_group = self.keys.get_level_values('treatment_group')
+        self.aggregate_keys = np.flatnonzero(treatment_group == 'all')
+        self.treatment_keys = np.flatnonzero(treatment_group != 'all')
+        # Position of the key summed over treatment groups for every key.
+        self.aggregate_position = self.keys.get_indexer(
+            pd.MultiIndex.from_arrays([keys[c] if c != 'treatment_group' else np.full(len(keys), 'all')
+                                       for c in self.key_columns])
+        )
+
+        self.person_time = self.aggregate_over_treatment_group(self.to_array(person_time))
+        self.denominator = self.person_time[:, self.aggregate_position]
+
+    def to_array(self, data: pd.DataFrame) -> np.ndarray:
+        """Scatters the ``value`` column of long-format data into a
+        (scenarios x keys) array. Keys missing from the data are null."""
+        scenario_position = self.scenarios.get_indexer(data['scenario'])
+        key_position = self.keys.get_indexer(pd.MultiIndex.from_arrays([data[c] for c in self.key_columns]))
+        if (scenario_position < 0).any() or (key_position < 0).any():
+            raise ValueError('Data contains keys not present in the person time alignment index.')
+        values = np.full((len(self.scenarios), len(self.keys)), np.nan)
+        values[scenario_position, key_position] = data['value'].values
+        return values
+
+    def aggregate_over_treatment_group(self, values: np.ndarray) -> np.ndarray:
+        """Fills the ``all`` treatment group keys with sums over the
+        individual treatment groups."""
+        values = values.copy()
+        targets = self.aggregate_position[self.treatment_keys]
+        for scenario_values in values:
+            scenario_values[self.aggregate_keys] = 0
+            scenario_values[:] += np.bincount(targets, weights=scenario_values[self.treatment_keys],
+                                              minlength=len(self.keys))
+        return values
+
+    def delta(self, values: np.ndarray) -> np.ndarray:
+        """Baseline minus each scenario, including the baseline itself."""
+        return values[self.baseline] - values
+
+    def scale(self, values: np.ndarray, py_multiplier=1) -> np.ndarray:
+        """Divides by the person time summed over treatment groups."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scaled = py_multiplier * values / self.denominator
+        # Remove numerical round off issues
+        scaled[np.abs(scaled) < 1e-10] = 0
+        return scaled
+
+    def to_frame(self, values: np.ndarray, by_treatment_group: bool, **constant_columns) -> pd.DataFrame:
+        """Gathers an array back into long format, either over the individual
+        treatment groups or over their aggregate."""
+        positions = self.treatment_keys if by_treatment_group else self.aggregate_keys
+        keys = self.keys[positions]
+        n_scenarios = len(self.scenarios)
+        data = pd.DataFrame({c: np.tile(keys.get_level_values(c).values, n_scenarios) for c in self.key_columns})
+        data['scenario'] = np.repeat(self.scenarios.values, len(positions))
+        data['value'] = values[:, positions].ravel()
+        for column, value in constant_columns.items():
+            data[column] = value
+        return data
+
+
+def summarize(alignment: AlignmentIndex, raw: np.ndarray, delta: np.ndarray,
+              by_treatment_group=False, **constant_columns) -> pd.DataFrame:
+    raw = alignment.to_frame(raw, by_treatment_group, **constant_columns)
+    delta = alignment.to_frame(delta, by_treatment_group, **constant_columns)
+    raw_summary = utilities.summarize_draws(raw, INDEX_COLUMNS)
+    delta_summary = utilities.summarize_draws(delta, INDEX_COLUMNS, prefix='averted_')
     return pd.concat([raw_summary, delta_summary], axis=1)
 
 
-def make_tb_table(mdata: MeasureData, location: str):
-    counts = mdata.tb_cases
-    counts['location'] = location
-    counts['outcome'] = 'actb_incidence_rate'
-    counts = utilities.aggregate_over_treatment_group(counts)
-
-    delta_join_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'treatment_group', 'draw']
-    delta = get_delta(counts, delta_join_columns)
-
-    pt = mdata.person_time.drop(columns='cause')
-    pt['location'] = location
-    pt['outcome'] = 'actb_incidence_rate'
-    pt = utilities.aggregate_over_treatment_group(pt)
-    
-    scale_join_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group','treatment_group', 'draw', 'scenario']
-    raw_scaled = scale_data(pt, counts, scale_join_columns, py_multiplier=100_000)
-    delta_scaled = scale_data(pt, delta, scale_join_columns, py_multiplier=100_000)
-    
-    index_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'scenario', 'treatment_group']
-    raw_scaled_summary = utilities.pivot_and_summarize(raw_scaled, index_columns)
-    delta_scaled_summary = utilities.pivot_and_summarize(delta_scaled, index_columns, prefix='averted_')
-    scaled_summary = pd.concat([raw_scaled_summary, delta_scaled_summary], axis=1)
+def summarize_by_cause(alignment: AlignmentIndex, counts: pd.DataFrame, location: str, outcome: str,
+                       extra_counts: pd.DataFrame = None) -> pd.DataFrame:
+    """Summarizes rates by cause. Causes missing from ``extra_counts`` are
+    treated as zero."""
+    extra_counts = {} if extra_counts is None else dict(list(extra_counts.groupby('cause')))
+    summaries = []
+    for cause, cause_counts in counts.groupby('cause'):
+        values = alignment.to_array(cause_counts)
+        if cause in extra_counts:
+            values += np.nan_to_num(alignment.to_array(extra_counts[cause]))
+        values = alignment.aggregate_over_treatment_group(values)
+        summaries.append(summarize(alignment,
+                                   alignment.scale(values, py_multiplier=100_000),
+                                   alignment.scale(alignment.delta(values), py_multiplier=100_000),
+                                   location=location, outcome=f'{outcome}_due_to_{cause}'))
+    return pd.concat(summaries, axis=0)
+
+
+def make_coverage_table(mdata: MeasureData, location: str, alignment: AlignmentIndex = None):
+    alignment = AlignmentIndex(mdata.person_time) if alignment is None else alignment
+    pt = alignment.person_time
+    return summarize(alignment, alignment.scale(pt), alignment.scale(alignment.delta(pt)),
+                     by_treatment_group=True, location=location, outcome='treatment_coverage')
+
+
+def make_tb_table(mdata: MeasureData, location: str, alignment: AlignmentIndex = None):
+    alignment = AlignmentIndex(mdata.person_time) if alignment is None else alignment
+    counts = alignment.aggregate_over_treatment_group(alignment.to_array(mdata.tb_cases))
+    scaled_summary = summarize(alignment,
+                               alignment.scale(counts, py_multiplier=100_000),
+                               alignment.scale(alignment.delta(counts), py_multiplier=100_000),
+                               location=location, outcome='actb_incidence_rate')
 
     population = mdata.national_population
     value_columns = ['mean', 'ub', 'lb', 'averted_mean', 'averted_ub', 'averted_lb']
@@ -107,21 +167,21 @@ def make_tb_table(mdata: MeasureData, location: str):
     counts_summary.drop(columns='population', inplace=True)
     
     all_ages = (counts_summary
-                .groupby([c for c in index_columns if c != 'age'])
+                .groupby([c for c in INDEX_COLUMNS if c != 'age'])
                 .sum()
                 .reset_index())
     all_ages['age'] = 'all'
     counts_summary = pd.concat([counts_summary, all_ages])
 
     both_sexes = (counts_summary
-                  .groupby([c for c in index_columns if c != 'sex'])
+                  .groupby([c for c in INDEX_COLUMNS if c != 'sex'])
                   .sum()
                   .reset_index())
     both_sexes['sex'] = 'all'
     counts_summary = pd.concat([counts_summary, both_sexes])
 
     all_years = (counts_summary[counts_summary.year.isin(['2020', '2021', '2022', '2023', '2024'])]
-                 .groupby([c for c in index_columns if c != 'year'])
+                 .groupby([c for c in INDEX_COLUMNS if c != 'year'])
                  .sum()
                  .reset_index())
     all_years['year'] = 'all'
@@ -130,93 +190,26 @@ def make_tb_table(mdata: MeasureData, location: str):
     counts_summary = counts_summary.loc[
         ~((counts_summary.risk_group == 'u5_hhtb') & (counts_summary.age == 'all'))
     ]
-    counts_summary = counts_summary.set_index(index_columns)[value_columns]
+    counts_summary = counts_summary.set_index(INDEX_COLUMNS)[value_columns]
     
     return pd.concat([counts_summary, scaled_summary])
 
 
-def make_deaths_table(mdata: MeasureData, location: str):
-    counts = mdata.deaths
-    counts['location'] = location
-    counts['outcome'] = 'deaths'
-    counts = utilities.aggregate_over_treatment_group(counts)
-
-    delta_join_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'treatment_group', 'cause', 'draw']
-    delta = get_delta(counts, delta_join_columns)
-
-    pt = mdata.person_time.drop(columns='cause')
-    pt['location'] = location
-    pt['outcome'] = 'deaths'
-    pt = utilities.aggregate_over_treatment_group(pt)
-
-    scale_join_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'treatment_group', 'draw',
-                          'scenario']
-    raw_scaled = scale_data(pt, counts, scale_join_columns, ['cause'], py_multiplier=100_000)
-    raw_scaled['outcome'] = raw_scaled.cause.apply(lambda x: 'deaths_due_to_' + x)
-    raw_scaled = raw_scaled.drop(columns='cause')
-    delta_scaled = scale_data(pt, delta, scale_join_columns, ['cause'], py_multiplier=100_000)
-    delta_scaled['outcome'] = delta_scaled.cause.apply(lambda x: 'deaths_due_to_' + x)
-    delta_scaled = delta_scaled.drop(columns='cause')
-
-    index_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'scenario', 'treatment_group']
-    raw_scaled_summary = utilities.pivot_and_summarize(raw_scaled, index_columns)
-    delta_scaled_summary = utilities.pivot_and_summarize(delta_scaled, index_columns, prefix='averted_')
-    scaled_summary = pd.concat([raw_scaled_summary, delta_scaled_summary], axis=1)
-
-    return scaled_summary
-
-
-def make_dalys_table(mdata: MeasureData, location: str):
-    ylls = mdata.ylls
-    ylds = mdata.ylds
-    cols = [c for c in ylls.columns if c != 'value']
-    ylls = ylls.set_index(cols)
-    # fill ylds due to other causes with 0
-    counts = (ylls + ylds.set_index(cols).reindex(ylls.index).fillna(0)).reset_index()
-
-    counts['location'] = location
-    counts['outcome'] = 'dalys'
-    counts = utilities.aggregate_over_treatment_group(counts)
-
-    delta_join_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'treatment_group', 'cause', 'draw']
-    delta = get_delta(counts, delta_join_columns)
-
-    pt = mdata.person_time.drop(columns='cause')
-    pt['location'] = location
-    pt['outcome'] = 'dalys'
-    pt = utilities.aggregate_over_treatment_group(pt)
-
-    scale_join_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'treatment_group', 'draw',
-                          'scenario']
-    raw_scaled = scale_data(pt, counts, scale_join_columns, ['cause'], py_multiplier=100_000)
-    raw_scaled['outcome'] = raw_scaled.cause.apply(lambda x: 'dalys_due_to_' + x)
-    raw_scaled = raw_scaled.drop(columns='cause')
-    delta_scaled = scale_data(pt, delta, scale_join_columns, ['cause'], py_multiplier=100_000)
-    delta_scaled['outcome'] = delta_scaled.cause.apply(lambda x: 'dalys_due_to_' + x)
-    delta_scaled = delta_scaled.drop(columns='cause')
+def make_deaths_table(mdata: MeasureData, location: str, alignment: AlignmentIndex = None):
+    alignment = AlignmentIndex(mdata.person_time) if alignment is None else alignment
+    return summarize_by_cause(alignment, mdata.deaths, location, 'deaths')
 
-    index_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'scenario', 'treatment_group']
-    raw_scaled_summary = utilities.pivot_and_summarize(raw_scaled, index_columns)
-    delta_scaled_summary = utilities.pivot_and_summarize(delta_scaled, index_columns, prefix='averted_')
-    scaled_summary = pd.concat([raw_scaled_summary, delta_scaled_summary], axis=1)
 
-    return scaled_summary
+def make_dalys_table(mdata: MeasureData, location: str, alignment: AlignmentIndex = None):
+    alignment = AlignmentIndex(mdata.person_time) if alignment is None else alignment
+    # ylds due to other causes are zero
+    return summarize_by_cause(alignment, mdata.ylls, location, 'dalys', extra_counts=mdata.ylds)
 
 
-def make_person_time_table(mdata: MeasureData, location: str):
-    pt = mdata.person_time.drop(columns='cause')
-    pt['location'] = location
-    pt['outcome'] = 'person_time'
-    pt = utilities.aggregate_over_treatment_group(pt)
-
-    delta_join_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'draw', 'treatment_group']
-    delta = get_delta(pt, delta_join_columns)
-
-    index_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'scenario', 'treatment_group']
-    raw_summary = utilities.pivot_and_summarize(pt, index_columns)
-    delta_summary = utilities.pivot_and_summarize(delta, index_columns, prefix='averted_')
-
-    return pd.concat([raw_summary, delta_summary], axis=1)
+def make_person_time_table(mdata: MeasureData, location: str, alignment: AlignmentIndex = None):
+    alignment = AlignmentIndex(mdata.person_time) if alignment is None else alignment
+    pt = alignment.person_time
+    return summarize(alignment, pt, alignment.delta(pt), location=location, outcome='person_time')
 
 
 def make_prop_under_five_hhtb_table(mdata: MeasureData, location: str):
@@ -243,17 +236,18 @@ def make_prop_under_five_hhtb_table(mdata: MeasureData, location: str):
 
     index_columns = ['scenario', 'location', 'year', 'age', 'sex', 'outcome']
     return pd.concat([
-        utilities.pivot_and_summarize(under_five_population, index_columns=index_columns),
-        utilities.pivot_and_summarize(under_five_prop_hhtb_population, index_columns=index_columns)
+        utilities.summarize_draws(under_five_population, index_columns=index_columns),
+        utilities.summarize_draws(under_five_prop_hhtb_population, index_columns=index_columns)
     ], axis=0)
 
 
 def make_tables(measure_data: MeasureData, location: str) -> FinalData:
-    coverage = make_coverage_table(measure_data, location)
-    tb = make_tb_table(measure_data, location)
-    deaths = make_deaths_table(measure_data, location)
-    dalys = make_dalys_table(measure_data, location)
-    person_time = make_person_time_table(measure_data, location)
+    alignment = AlignmentIndex(measure_data.person_time)
+    coverage = make_coverage_table(measure_data, location, alignment)
+    tb = make_tb_table(measure_data, location, alignment)
+    deaths = make_deaths_table(measure_data, location, alignment)
+    dalys = make_dalys_table(measure_data, location, alignment)
+    person_time = make_person_time_table(measure_data, location, alignment)
     u5_hhtb_percent = make_prop_under_five_hhtb_table(measure_data, location)
     aggregate = pd.concat([coverage, tb, deaths, dalys, person_time], axis=0)
 
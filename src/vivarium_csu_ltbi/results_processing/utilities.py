@@ -1,4 +1,8 @@
 import numpy as np
+import pandas as pd
+
+# CI = 95%
+DEFAULT_QUANTILES = {'ub': 97.5, 'lb': 2.5}
 
 
 def aggregate_over_treatment_group(data):
@@ -11,18 +15,64 @@ def aggregate_over_treatment_group(data):
     return data
 
 
-def pivot_and_summarize(data, index_columns, prefix=''):
-    data = (data
-            .set_index(index_columns + ['draw'])
-            .unstack())
-    data.columns = data.columns.droplevel()
-    data.columns.name = None
-    mean = data.mean(axis=1)
-    # CI = 95%
-    ub = np.percentile(data, 97.5, axis=1)
-    lb = np.percentile(data, 2.5, axis=1)
-    data[prefix + 'mean'] = mean
-    data[prefix + 'ub'] = ub
-    data[prefix + 'lb'] = lb
-    data = data[[c for c in data.columns if isinstance(c, str)]]
-    return data
+def summarize_draws(data, index_columns, prefix='', quantiles=None, skipna=False):
+    """Summarizes long-format draw-level data without pivoting it to wide form.
+
+    Each group of ``index_columns`` is scattered into one row of a
+    (groups x draws) array which is sorted once, so the mean and every
+    requested quantile are read off the same sorted draws.
+
+    Parameters
+    ----------
+    data
+        Long-format data with ``index_columns``, a ``draw`` column and a
+        ``value`` column.
+    index_columns
+        The columns identifying a group of draws.
+    prefix
+        Prefix for the names of the summary columns.
+    quantiles
+        Mapping between summary column names and percentiles in [0, 100].
+        Defaults to the 95% uncertainty interval as ``ub`` and ``lb``.
+    skipna
+        Whether to take quantiles over the non-null draws of each group, as
+        ``describe`` does, instead of nulling groups missing any draw.
+
+    Returns
+    -------
+        The summary indexed by ``index_columns`` with a ``mean`` column and
+        one column per quantile. Unless ``skipna`` is set, quantiles of
+        groups missing any draw are null, matching ``np.percentile`` on the
+        wide table.
+
+    """
+    quantiles = DEFAULT_QUANTILES if quantiles is None else quantiles
+
+    grouped = data.groupby(index_columns, sort=True)
+    group_codes = grouped.ngroup().values
+    group_index = grouped.size().index
+    draw_codes, draws = pd.factorize(data['draw'], sort=True)
+
+    values = np.full((len(group_index), len(draws)), np.nan)
+    values[group_codes, draw_codes] = data['value'].values
+
+    draw_counts = (~np.isnan(values)).sum(axis=1)
+    complete = draw_counts == len(draws)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(values, axis=1) / draw_counts
+
+    # Nulls sort to the end of each row, so the non-null draws of every row
+    # are ordered at its start.
+    values.sort(axis=1)
+    counts = draw_counts if skipna else np.full(len(group_index), len(draws))
+    rows = np.arange(len(group_index))
+    summary = pd.DataFrame({prefix + 'mean': mean}, index=group_index)
+    for name, q in quantiles.items():
+        position = q / 100 * np.maximum(counts - 1, 0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        weight = position - lower
+        quantile = values[rows, lower] + (values[rows, upper] - values[rows, lower]) * weight
+        quantile[(draw_counts == 0) if skipna else ~complete] = np.nan
+        summary[prefix + name] = quantile
+    return summary
@@ -0,0 +1,229 @@
+"""
+End-to-end simulation benchmarks
+
+click application that runs the LTBI model specification over a sweep of
+population sizes and step sizes and reports the wall time spent in each
+simulation phase along with the peak resident memory of each run.
+
+Each configuration runs in its own process so peak memory is measured per
+run. Without an artifact, a synthetic one is generated so benchmarks can
+run without access to the GBD databases. The first run stores its results
+as the baselines and later runs are compared against them to catch
+performance regressions before a full cluster run.
+"""
+import itertools
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+import click
+import numpy as np
+import pandas as pd
+import yaml
+from jinja2 import Template
+from loguru import logger
+
+from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi import paths as ltbi_paths
+from vivarium_csu_ltbi.tools.synthetic_artifact import build_synthetic_artifact
+
+MODEL_SPEC_TEMPLATE = (Path(__file__).parent.parent / 'model_specifications' / 'model_spec.in').resolve()
+DEFAULT_BASELINES = ltbi_paths.BENCHMARK_ROOT / 'baselines.yaml'
+PHASES = ['setup', 'initialization', 'time_step__prepare', 'time_step', 'time_step__cleanup', 'collect_metrics']
+
+
+class BenchmarkResult(NamedTuple):
+    population_size: int
+    step_size: int
+    time_steps: int
+    phases: Dict[str, float]
+    peak_rss: float
+
+    @property
+    def key(self) -> str:
+        return f'population_{self.population_size}_step_{self.step_size}'
+
+    def to_dict(self) -> Dict:
+        return {'population_size': self.population_size, 'step_size': self.step_size,
+                'time_steps': self.time_steps, 'phases': self.phases, 'peak_rss': self.peak_rss}
+
+
+def render_model_specification(location: str, artifact_path: Path, output_dir: Path) -> Path:
+    """Renders the model specification template for a single artifact."""
+    with MODEL_SPEC_TEMPLATE.open() as f:
+        template = Template(f.read())
+    model_specification = output_dir / 'model_spec.yaml'
+    with model_specification.open('w') as f:
+        f.write(template.render(location_proper=location,
+                                location_sanitized=artifact_path.stem,
+                                artifact_root=str(artifact_path.parent)))
+    return model_specification
+
+
+def time_simulation(model_specification: Path, population_size: int, step_size: int,
+                    num_steps: int = None) -> BenchmarkResult:
+    """Runs one simulation, timing each phase of the simulation lifecycle.
+
+    Main loop phases are timed by wrapping the event emitters the
+    simulation calls in each time step, so the times include every
+    listener on the event and the population views they read.
+
+    """
+    from vivarium.framework.engine import SimulationContext
+
+    timings = dict.fromkeys(PHASES, 0.)
+    configuration = {'population': {'population_size': population_size},
+                     'time': {'step_size': step_size}}
+
+    start = time.perf_counter()
+    sim = SimulationContext(str(model_specification), configuration=configuration)
+    sim.setup()
+    timings['setup'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sim.initialize_simulants()
+    timings['initialization'] = time.perf_counter() - start
+
+    for event, emitter in sim.time_step_emitters.items():
+        sim.time_step_emitters[event] = _timed(emitter, event, timings)
+
+    time_steps = get_time_steps(sim.configuration)
+    if num_steps is not None:
+        time_steps = min(time_steps, num_steps)
+    for _ in range(time_steps):
+        sim.step()
+
+    sim.finalize()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kilobytes on linux
+    return BenchmarkResult(population_size, step_size, time_steps, timings, peak_rss)
+
+
+def get_time_steps(configuration) -> int:
+    """Returns the number of time steps from the start to the end of the
+    simulation, counted from its configuration as the clock steps."""
+    start = pd.Timestamp(**configuration.time.start.to_dict())
+    end = pd.Timestamp(**configuration.time.end.to_dict())
+    return int(np.ceil((end - start) / pd.Timedelta(days=configuration.time.step_size)))
+
+
+def run_benchmarks(model_specification: Path, population_sizes: List[int], step_sizes: List[int],
+                   num_steps: int = None) -> List[BenchmarkResult]:
+    results = []
+    for population_size, step_size in itertools.product(population_sizes, step_sizes):
+        logger.info(f'Benchmarking {population_size} simulants with a {step_size} day step.')
+        # A fresh process per run keeps peak memory from carrying over between runs.
+        with multiprocessing.Pool(1) as pool:
+            result = pool.apply(time_simulation, (model_specification, population_size, step_size, num_steps))
+        logger.info(format_result(result))
+        results.append(result)
+    return results
+
+
+def compare_to_baselines(results: List[BenchmarkResult], baselines: Dict, tolerance: float) -> List[str]:
+    """Lists the phases and memory use that exceed the baseline by more
+    than ``tolerance``, as a fraction of the baseline."""
+    regressions = []
+    for result in results:
+        if result.key not in baselines:
+            continue
+        baseline = baselines[result.key]
+        if baseline['time_steps'] != result.time_steps:
+            logger.warning(f'Baseline for {result.key} ran {baseline["time_steps"]} time steps, '
+                           f'not {result.time_steps}. Skipping comparison.')
+            continue
+        measures = {**result.phases, 'peak_rss': result.peak_rss}
+        reference = {**baseline['phases'], 'peak_rss': baseline['peak_rss']}
+        for measure, value in measures.items():
+            if reference.get(measure) and value > reference[measure] * (1 + tolerance):
+                regressions.append(f'{result.key} {measure}: {value:.2f} against a baseline of '
+                                   f'{reference[measure]:.2f}')
+    return regressions
+
+
+def format_result(result: BenchmarkResult) -> str:
+    phases = ', '.join(f'{phase}: {seconds:.2f}s' for phase, seconds in result.phases.items())
+    return f'{result.key} ({result.time_steps} steps) - {phases}, peak rss: {result.peak_rss:.0f}MB'
+
+
+def _timed(emitter, event, timings):
+    def emit(index):
+        start = time.perf_counter()
+        emitter(index)
+        timings[event] += time.perf_counter() - start
+    return emit
+
+
+@click.command()
+@click.option('-a', '--artifact-path',
+              type=click.Path(exists=True, dir_okay=False),
+              help='The artifact to run the model specification against. '
+                   'A synthetic artifact is generated if not provided.')
+@click.option('-l', '--location', default='India', type=click.Choice(ltbi_globals.LOCATIONS),
+              show_default=True, help='The location of the artifact.')
+@click.option('-p', '--population-size', 'population_sizes', multiple=True, type=click.INT,
+              default=[10_000, 100_000, 1_000_000], show_default=True,
+              help='Population sizes to benchmark. May be passed more than once.')
+@click.option('-s', '--step-size', 'step_sizes', multiple=True, type=click.INT,
+              default=[7], show_default=True,
+              help='Step sizes in days to benchmark. May be passed more than once.')
+@click.option('-d', '--draws', default=1, show_default=True, type=click.IntRange(1, 1000),
+              help='Number of draws in the synthetic artifact.')
+@click.option('-n', '--num-steps', type=click.INT,
+              help='Stop each run after this many time steps instead of at the end of the simulation.')
+@click.option('-b', '--baselines', default=str(DEFAULT_BASELINES), show_default=True,
+              type=click.Path(dir_okay=False),
+              help='The stored baselines to compare against or save to.')
+@click.option('--save-baselines', is_flag=True,
+              help='Store these results as the baselines instead of comparing against them.')
+@click.option('-t', '--tolerance', default=0.2, show_default=True,
+              help='Allowed fractional slow down or memory growth relative to the baselines.')
+@click.option('-o', '--output-path', type=click.Path(dir_okay=False),
+              help='Also write the results to this *.csv file.')
+def benchmark_ltbi(artifact_path, location, population_sizes, step_sizes, draws, num_steps,
+                   baselines, save_baselines, tolerance, output_path):
+    """Benchmark the LTBI model specification.
+
+    Runs the full component stack of the model specification against the
+    artifact passed with ``--artifact-path``, or a synthetic artifact of
+    the location, for every combination of population size and step size
+    and reports the wall time of each simulation phase and the peak
+    resident memory. Exits with an error if any run regresses against the
+    stored baselines. The first run stores its results as the baselines.
+
+    """
+    baselines = Path(baselines)
+    with tempfile.TemporaryDirectory() as spec_dir:
+        if artifact_path:
+            artifact_path = Path(artifact_path).resolve()
+        else:
+            artifact_path = Path(spec_dir) / f'{ltbi_globals.formatted_location(location)}.hdf'
+            logger.info(f'Generating a synthetic artifact for {location} with {draws} draws.')
+            build_synthetic_artifact(artifact_path, location, draws=draws)
+        model_specification = render_model_specification(location, artifact_path, Path(spec_dir))
+        results = run_benchmarks(model_specification, population_sizes, step_sizes, num_steps)
+
+    if output_path:
+        table = pd.DataFrame([{**r.to_dict(), **r.phases} for r in results]).drop(columns='phases')
+        table.to_csv(output_path, index=False)
+
+    if save_baselines or not baselines.exists():
+        if not save_baselines:
+            logger.info(f'No baselines found at {baselines}. Storing these results as the baselines.')
+        stored = yaml.full_load(baselines.read_text()) if baselines.exists() else {}
+        stored.update({r.key: r.to_dict() for r in results})
+        baselines.parent.mkdir(parents=True, exist_ok=True)
+        baselines.write_text(yaml.dump(stored, default_flow_style=False))
+        logger.info(f'Baselines written to {baselines}.')
+    else:
+        stored = yaml.full_load(baselines.read_text())
+        regressions = compare_to_baselines(results, stored, tolerance)
+        new = {r.key: r.to_dict() for r in results if r.key not in stored}
+        if new:
+            baselines.write_text(yaml.dump({**stored, **new}, default_flow_style=False))
+            logger.info(f'Stored baselines for {", ".join(new)} in {baselines}.')
+        if regressions:
+            raise click.ClickException('Benchmark regressions:\n' + '\n'.join(regressions))
+        logger.info('No regressions against the stored baselines.')
@@ -0,0 +1,271 @@
+"""
+Scenario branching
+
+click application that runs every intervention scenario of a draw and seed
+from a single simulation. The part of the simulation before any scenario
+shifts treatment coverage is identical across scenarios, so it is run once
+and the simulation is forked into one process per scenario at the start of
+the first year with a coverage shift.
+
+Forked processes share the population state and the component state of the
+common prefix, and vivarium's randomness streams are keyed on the simulant,
+the time and the seed, so every scenario sees the same random numbers and
+scenario differences have lower variance than with independent runs.
+
+Scenarios are not carried as parallel arms of one state table. Once
+coverage differs, LTBI progression differs, and with it the combined TB and
+HIV state, mortality, births and every observer stratification, so after
+the branch point each scenario runs on its own full copy of the state. The
+work saved is the shared prefix, not the scenario count.
+
+Results are written as ``output.hdf`` and ``keyspace.yaml`` in the layout
+``make_results`` reads from a psimulate run.
+"""
+import itertools
+import multiprocessing
+import os
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import click
+import pandas as pd
+import yaml
+from loguru import logger
+
+from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi.tools.checkpoint import Checkpointer
+
+
+def run_branched_scenarios(model_specification: Path, input_draw: int, random_seed: int,
+                           scenarios: List[str] = ltbi_globals.SCENARIOS, checkpoint_directory: Path = None,
+                           checkpoint_interval: int = 26) -> List[Dict]:
+    """Runs the scenarios of one draw and seed from a shared prefix.
+
+    Parameters
+    ----------
+    model_specification
+        The rendered model specification to run.
+    input_draw
+        The input draw of the artifact data.
+    random_seed
+        The randomness seed shared by all scenarios.
+    scenarios
+        The ``ltbi_treatment_scale_up`` scenarios to branch into.
+    checkpoint_directory
+        If given, the shared prefix and each scenario write a checkpoint
+        every ``checkpoint_interval`` time steps to their own subdirectory
+        and resume from their latest checkpoint when run again.
+    checkpoint_interval
+        The number of time steps between checkpoints.
+
+    Returns
+    -------
+        One row of metrics per scenario, with the job parameters.
+
+    """
+    from vivarium.framework.engine import SimulationContext
+
+    configuration = {'input_data': {'input_draw_number': input_draw},
+                     'randomness': {'random_seed': random_seed},
+                     'ltbi_treatment_scale_up': {'scenario': scenarios[0]}}
+    sim = SimulationContext(str(model_specification), configuration=configuration)
+    sim.setup()
+    # Components can only be looked up during setup and the main loop.
+    scale_up = sim._component_manager.get_component('ltbi_treatment_scale_up')
+    try:
+        instrumentation = sim._component_manager.get_component('instrumentation')
+    except ValueError:
+        instrumentation = None
+    sim.initialize_simulants()
+
+    checkpointer = None
+    if checkpoint_directory is not None:
+        checkpointer = Checkpointer(checkpoint_directory / 'prefix', checkpoint_interval)
+        checkpointer.restore(sim)
+
+    clock = sim._clock
+    branch_time = clock.stop_time if pd.isnull(scale_up.branch_time) else scale_up.branch_time
+    while clock.time < clock.stop_time and clock.time + clock.step_size <= branch_time:
+        if checkpointer is None:
+            sim.step()
+        else:
+            checkpointer.step(sim)
+    logger.info(f'Branching {len(scenarios)} scenarios at {clock.time} for draw {input_draw} '
+                f'and seed {random_seed}.')
+
+    def set_scenario(scenario):
+        scale_up.set_scenario(scenario)
+        if instrumentation is not None and instrumentation.enabled:
+            instrumentation.job_parameters['scenario'] = scenario
+
+    metrics = fork_scenarios(sim, checkpointer, scenarios, set_scenario)
+    return [{**scenario_metrics,
+             ltbi_globals.INPUT_DRAW_COLUMN: input_draw,
+             ltbi_globals.RANDOM_SEED_COLUMN: random_seed,
+             ltbi_globals.SCENARIO_COLUMN: scenario}
+            for scenario, scenario_metrics in zip(scenarios, metrics)]
+
+
+def fork_scenarios(sim, checkpointer: Optional[Checkpointer], scenarios: List[str],
+                   set_scenario: Callable[[str], None]) -> List[Dict]:
+    """Finishes each scenario in its own forked process.
+
+    Every process is forked from the simulation at the branch point and
+    runs exactly one scenario, so no scenario starts from a simulation
+    another scenario already advanced. The simulation is inherited by the
+    forks rather than pickled, and each fork calls ``set_scenario`` before
+    running and sends its metrics back over a pipe.
+
+    """
+    context = multiprocessing.get_context('fork')
+    forks = []
+    for scenario in scenarios:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_run_scenario, args=(sim, checkpointer, scenario, set_scenario, sender))
+        process.start()
+        sender.close()
+        forks.append((scenario, process, receiver))
+
+    metrics, failures = [], []
+    for scenario, process, receiver in forks:
+        try:
+            succeeded, result = receiver.recv()
+        except EOFError:
+            succeeded, result = False, 'The process exited without sending results.'
+        process.join()
+        if succeeded:
+            metrics.append(result)
+        else:
+            failures.append(f'{scenario}: {result}')
+    if failures:
+        raise RuntimeError('Scenarios failed after branching:\n' + '\n'.join(failures))
+    return metrics
+
+
+def _run_scenario(sim, prefix_checkpointer: Optional[Checkpointer], scenario: str,
+                  set_scenario: Callable[[str], None], sender):
+    try:
+        set_scenario(scenario)
+        if prefix_checkpointer is None:
+            sim.run()
+        else:
+            checkpointer = Checkpointer(prefix_checkpointer.directory.parent / scenario,
+                                        prefix_checkpointer.interval, prefix_checkpointer.keep)
+            checkpointer.step_count = prefix_checkpointer.step_count
+            checkpointer.restore(sim)
+            checkpointer.run(sim)
+        sim.finalize()
+        sender.send((True, dict(sim.report())))
+    except Exception:
+        sender.send((False, traceback.format_exc()))
+    finally:
+        sender.close()
+
+
+def get_keyspace(branches_file: Path) -> Dict[str, List]:
+    """Reads the draws, seeds and scenarios of a psimulate branches file.
+
+    Draws and seeds are numbered from zero up to the configured counts.
+
+    """
+    with branches_file.open() as f:
+        branches = yaml.full_load(f)
+    scenarios = [scenario for branch in branches['branches']
+                 for scenario in branch['ltbi_treatment_scale_up']['scenario']]
+    return {ltbi_globals.INPUT_DRAW_COLUMN: list(range(branches['input_draw_count'])),
+            ltbi_globals.RANDOM_SEED_COLUMN: list(range(branches['random_seed_count'])),
+            ltbi_globals.SCENARIO_COLUMN: list(dict.fromkeys(scenarios))}
+
+
+def get_job_index(job: Optional[int]) -> Optional[int]:
+    if job is None and os.environ.get('SGE_TASK_ID', 'undefined') != 'undefined':
+        job = int(os.environ['SGE_TASK_ID']) - 1
+    return job
+
+
+def write_output(rows: List[Dict], keyspace: Dict[str, List], output_directory: Path):
+    pd.DataFrame(rows).to_hdf(str(output_directory / 'output.hdf'), key='data', mode='w')
+    with (output_directory / 'keyspace.yaml').open('w') as f:
+        yaml.dump(keyspace, f)
+    logger.info(f'Branched results written to {output_directory}.')
+
+
+@click.command()
+@click.argument('model_specification', type=click.Path(exists=True, dir_okay=False))
+@click.option('-o', '--output-directory', required=True, type=click.Path(file_okay=False),
+              help='The directory to write output.hdf and keyspace.yaml to.')
+@click.option('-b', '--branches-file', type=click.Path(exists=True, dir_okay=False),
+              help='A psimulate branches file with the draw and seed counts and scenarios to run. '
+                   'Overrides the draw, seed and scenario options.')
+@click.option('-d', '--input-draw', 'input_draws', multiple=True, type=click.INT, default=[0],
+              show_default=True, help='Input draws to run. May be passed more than once.')
+@click.option('-s', '--random-seed', 'random_seeds', multiple=True, type=click.INT, default=[0],
+              show_default=True, help='Random seeds to run. May be passed more than once.')
+@click.option('--scenario', 'scenarios', multiple=True, type=click.Choice(ltbi_globals.SCENARIOS),
+              default=ltbi_globals.SCENARIOS, show_default=True,
+              help='Scenarios to branch into. May be passed more than once.')
+@click.option('-j', '--job', type=click.INT,
+              help='Run only this (draw, seed) job, numbered from zero. Defaults to the SGE array task '
+                   'when run as an array job.')
+@click.option('-c', '--checkpoint-directory', type=click.Path(file_okay=False),
+              help='Write periodic checkpoints of each job here and resume from them when rerun.')
+@click.option('--checkpoint-interval', default=26, show_default=True, type=click.IntRange(1),
+              help='Number of time steps between checkpoints.')
+@click.option('--combine', is_flag=True,
+              help='Combine the outputs of finished jobs instead of running a simulation.')
+def run_branched_ltbi(model_specification, output_directory, branches_file, input_draws, random_seeds,
+                      scenarios, job, checkpoint_directory, checkpoint_interval, combine):
+    """Run the LTBI scenarios of each draw and seed from a shared prefix.
+
+    Every combination of input draw and random seed is simulated once up to
+    the first coverage shift and then forked into the scenarios, which
+    finish in parallel, each on its own copy of the simulation state.
+
+    On the cluster, submit one array task per (draw, seed) job with
+    ``--job`` or ``SGE_TASK_ID`` so each task carries all scenarios of its
+    population, then run once more with ``--combine`` to gather the job
+    outputs into ``output.hdf``. With ``--checkpoint-directory`` a
+    preempted job that is resubmitted resumes from its latest checkpoint.
+
+    """
+    output_directory = Path(output_directory)
+    job_directory = output_directory / 'jobs'
+    job_directory.mkdir(parents=True, exist_ok=True)
+
+    if branches_file:
+        keyspace = get_keyspace(Path(branches_file))
+    else:
+        keyspace = {ltbi_globals.INPUT_DRAW_COLUMN: list(input_draws),
+                    ltbi_globals.RANDOM_SEED_COLUMN: list(random_seeds),
+                    ltbi_globals.SCENARIO_COLUMN: list(scenarios)}
+    jobs = list(itertools.product(keyspace[ltbi_globals.INPUT_DRAW_COLUMN],
+                                  keyspace[ltbi_globals.RANDOM_SEED_COLUMN]))
+
+    if combine:
+        job_outputs = sorted(job_directory.glob('output_*.hdf'))
+        if len(job_outputs) < len(jobs):
+            logger.warning(f'Only {len(job_outputs)} of {len(jobs)} jobs have finished.')
+        rows = pd.concat([pd.read_hdf(str(path)) for path in job_outputs], ignore_index=True)
+        write_output(rows.to_dict('records'), keyspace, output_directory)
+        return
+
+    job = get_job_index(job)
+    scenarios = keyspace[ltbi_globals.SCENARIO_COLUMN]
+
+    def run_job(input_draw, random_seed):
+        job_checkpoints = None
+        if checkpoint_directory:
+            job_checkpoints = Path(checkpoint_directory) / f'draw_{input_draw}_seed_{random_seed}'
+        return run_branched_scenarios(Path(model_specification), input_draw, random_seed, scenarios,
+                                      job_checkpoints, checkpoint_interval)
+
+    if job is not None:
+        rows = run_job(*jobs[job])
+        pd.DataFrame(rows).to_hdf(str(job_directory / f'output_{job}.hdf'), key='data', mode='w')
+        return
+
+    rows = []
+    for input_draw, random_seed in jobs:
+        rows.extend(run_job(input_draw, random_seed))
+    write_output(rows, keyspace, output_directory)
@@ -0,0 +1,149 @@
+"""
+Simulation checkpoints
+
+Periodic snapshots of a running simulation so that a preempted run can
+resume from its latest checkpoint instead of starting over.
+
+A checkpoint holds the state table, the simulation clock, the randomness
+index map and the state of every component that implements
+``get_checkpoint_state`` and ``set_checkpoint_state``. It is written as a
+single pickle so numpy-backed columns are stored as raw buffers.
+
+The state table, clock, randomness and component list are private vivarium
+attributes, so checkpoints are only supported for the vivarium versions in
+``SUPPORTED_VIVARIUM_VERSIONS`` and are restored only by the version that
+wrote them.
+"""
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import pandas as pd
+import vivarium
+from loguru import logger
+
+CHECKPOINT_TEMPLATE = 'checkpoint_{step:05d}.pkl'
+SUPPORTED_VIVARIUM_VERSIONS = ['0.9.3']
+
+
+def check_vivarium_version(checkpoint_version: str = None):
+    """Checks that the installed vivarium is one whose internals checkpoints
+    are known to capture, and that it wrote the checkpoint being restored."""
+    if vivarium.__version__ not in SUPPORTED_VIVARIUM_VERSIONS:
+        raise RuntimeError(f'Checkpoints are not supported for vivarium {vivarium.__version__}. '
+                           f'Supported versions are {SUPPORTED_VIVARIUM_VERSIONS}.')
+    if checkpoint_version is not None and checkpoint_version != vivarium.__version__:
+        raise RuntimeError(f'The checkpoint was written with vivarium {checkpoint_version} and cannot be '
+                           f'restored with vivarium {vivarium.__version__}.')
+
+
+def get_simulation_state(sim) -> Dict:
+    """Collects the state a simulation needs to continue from its current time."""
+    check_vivarium_version()
+    return {
+        'vivarium_version': vivarium.__version__,
+        'time': sim._clock._time,
+        'population': sim._population._population,
+        'randomness': {'map': sim._randomness._key_mapping._map,
+                       'map_size': sim._randomness._key_mapping.map_size},
+        'components': {component.name: component.get_checkpoint_state()
+                       for component in sim._component_manager._components
+                       if hasattr(component, 'get_checkpoint_state')},
+    }
+
+
+def set_simulation_state(sim, state: Dict):
+    """Restores a state collected by ``get_simulation_state`` into a
+    simulation set up from the same model specification and configuration.
+
+    Raises
+    ------
+    RuntimeError
+        If the checkpoint was written by another vivarium version.
+    ValueError
+        If the checkpoint has no state for a component of the simulation.
+
+    """
+    check_vivarium_version(state.get('vivarium_version', 'unknown'))
+    components = [component for component in sim._component_manager._components
+                  if hasattr(component, 'set_checkpoint_state')]
+    missing = [component.name for component in components if component.name not in state['components']]
+    if missing:
+        raise ValueError(f'The checkpoint has no state for components {missing}. It was probably '
+                         f'written by a simulation with a different model specification.')
+
+    sim._clock._time = state['time']
+    sim._population._population = state['population']
+    sim._randomness._key_mapping._map = state['randomness']['map']
+    sim._randomness._key_mapping.map_size = state['randomness']['map_size']
+    for component in components:
+        component.set_checkpoint_state(state['components'][component.name])
+
+
+class Checkpointer:
+    """Writes a checkpoint every ``interval`` time steps to ``directory`` and
+    restores simulations from the latest one.
+
+    Only the ``keep`` most recent checkpoints are kept. Checkpoints are
+    written to a temporary file first, so an interrupted write never
+    replaces the latest complete checkpoint.
+
+    """
+
+    def __init__(self, directory: Union[str, Path], interval: int, keep: int = 2):
+        if interval < 1:
+            raise ValueError(f'Checkpoint interval must be at least one time step, not {interval}.')
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self.keep = keep
+        self.step_count = 0
+
+    @property
+    def checkpoints(self):
+        return sorted(self.directory.glob(CHECKPOINT_TEMPLATE.replace('{step:05d}', '*')))
+
+    def save(self, sim) -> Path:
+        path = self.directory / CHECKPOINT_TEMPLATE.format(step=self.step_count)
+        temporary_path = path.with_suffix('.tmp')
+        with temporary_path.open('wb') as f:
+            pickle.dump({'step': self.step_count, **get_simulation_state(sim)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(str(temporary_path), str(path))
+        for old_checkpoint in self.checkpoints[:-self.keep]:
+            old_checkpoint.unlink()
+        logger.debug(f'Checkpoint written to {path}.')
+        return path
+
+    def restore(self, sim) -> Optional[pd.Timestamp]:
+        """Restores ``sim`` from the latest checkpoint, if there is one.
+
+        The simulation must be set up and its initial population created, so
+        it is in the same lifecycle phase as when the checkpoint was taken.
+
+        Returns
+        -------
+            The simulation time restored to, or ``None`` if no checkpoint
+            exists.
+
+        """
+        if not self.checkpoints:
+            return None
+        path = self.checkpoints[-1]
+        with path.open('rb') as f:
+            state = pickle.load(f)
+        set_simulation_state(sim, state)
+        self.step_count = state['step']
+        logger.info(f'Restored simulation at {state["time"]} from {path}.')
+        return state['time']
+
+    def step(self, sim):
+        """Takes one time step, writing a checkpoint every ``interval`` steps."""
+        sim.step()
+        self.step_count += 1
+        if self.step_count % self.interval == 0:
+            self.save(sim)
+
+    def run(self, sim):
+        while sim._clock.time < sim._clock.stop_time:
+            self.step(sim)
@@ -174,9 +174,14 @@ def make_specs(template: str, locations_file: str, single_location: str, output_
 @click.argument('location', type=click.Choice(project_globals.LOCATIONS), required=True)
 @click.option('-p', '--preceding-results', type=click.INT, default=0)
 @click.option('-o', '--output-path', type=click.Path(exists=True, dir_okay=True))
-def make_results(model_versions, location, preceding_results, output_path):
+@click.option('--csv', is_flag=True, help='Also export every table in *.csv format.')
+@click.option('--population-file', type=click.Path(exists=True, dir_okay=False),
+              help=('A *.csv or *.hdf file of national populations used in place of the GBD databases '
+                    'when no population snapshot exists for the location.'))
+def make_results(model_versions, location, preceding_results, output_path, csv, population_file):
     """Generate count-space measure information and final outputs tables in
-    *.hdf and *.csv format. In the event of unfinished results, draws deficient
+    compressed *.hdf format, partitioned by scenario and year. Tables are
+    also exported as *.csv if the CSV flag is passed. In the event of unfinished results, draws deficient
     in random seeds or scenarios are excluded from the analysis.
 
     The results to be processed are the most recent outputs from the run defined
@@ -189,7 +194,7 @@ def make_results(model_versions, location, preceding_results, output_path):
 
     """
     results.process_latest_results(model_versions, location, preceding_results,
-                                   output_path)
+                                   output_path, csv, population_file)
 
 
 @click.command()
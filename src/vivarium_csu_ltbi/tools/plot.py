@@ -1,11 +1,21 @@
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 
 import os
 import datetime
+import hashlib
+import json
+import multiprocessing
 import warnings
+
+from loguru import logger
+
+from vivarium_csu_ltbi.results_processing import storage
+
 warnings.filterwarnings('ignore')
 
 master_dir = '/home/j/Project/simulation_science/latent_tuberculosis_infection/result/final_results_plot/'
@@ -21,6 +31,8 @@ outcomes = [
     'DALYs due to Active TB (per 100,000 person-years)',
     'DALYs due to HIV resulting in other diseases (per 100,000 person-years)',
 ]
+risk_groups = ['PLHIV', 'U5 HHC']
+manifest_file = 'render_manifest.json'
 
 def load_data(path: str, model_version: str):
     output = []
@@ -28,9 +40,9 @@ def load_data(path: str, model_version: str):
     for location in locations:
         master_dir = path + f'{model_version}_{location}_model_results/'
         sub_dir = master_dir + os.listdir(master_dir)[0]
-        f = 'aggregate_final_table.csv'
+        f = 'aggregate_final_table.hdf'
         assert f in os.listdir(sub_dir), f'No such a file in {location}'
-        df = pd.read_csv(sub_dir + '/' + f)
+        df = storage.read_table(sub_dir + '/' + f).reset_index()
         output.append(df)
     return pd.concat(output, ignore_index=True)
 
@@ -128,6 +140,7 @@ def plot_outcome_by_year(df, location, risk_group, outcome, outcome_type):
     fig.savefig(master_dir + f'{location}/' + \
                 f'{risk_group} {outcome_name} {outcome_type} by year.png',
                 bbox_inches='tight')
+    plt.close(fig)
 
 def plot_averted_by_age(df, location, outcome):
     t = df.loc[(df['location'] == location)
@@ -172,6 +185,7 @@ def plot_averted_by_age(df, location, outcome):
     fig.savefig(master_dir + f'{location}/' + \
                 f'PLHIV {outcome_name} averted by age.png',
                 bbox_inches='tight')
+    plt.close(fig)
 
 def plot_person_time_by_year(df, age_group, risk_group, location):
     df = df.loc[(df.outcome == 'Person-Years') & (df.location == location)].copy()
@@ -202,6 +216,7 @@ def plot_person_time_by_year(df, age_group, risk_group, location):
     fig.savefig(master_dir + f'{location}/' + \
                 f'{risk_group} population by year.png',
                 bbox_inches='tight')
+    plt.close(fig)
 
 def compare_across_countries(df, location_names, outcome, risk_group, scenario):
     age = 'All Ages' if risk_group == 'PLHIV' else '0 to 4'
@@ -240,6 +255,7 @@ def compare_across_countries(df, location_names, outcome, risk_group, scenario):
     plt.grid()
     fig.savefig(master_dir + f'{scenario} {risk_group} {outcome_name} averted by year.png',
                 bbox_inches='tight')
+    plt.close(fig)
 
 def plot_coverage(df, location, risk_group):
     age = 'All Ages' if risk_group == 'PLHIV' else '0 to 4'
@@ -252,17 +268,93 @@ def plot_coverage(df, location, risk_group):
                 & (df.risk_group == risk_group)]
     t.rename(columns={'year': 'Year', 'mean': 'Coverage (proportion)'}, inplace=True)
 
-    sns.set(font_scale=3)
-    g = sns.factorplot(x='Year', y='Coverage (proportion)', hue='treatment_group',
-                       col='scenario', size=10, aspect=1,
-                       sharey=True, data=t)
-    
-    g.fig.suptitle(f'{location}, {risk_group}')
-    g._legend.set_title('Treatment Group')
-    plt.subplots_adjust(wspace=0.1, top=0.85)
-    g.savefig(master_dir + f'{location}/' + \
-              f'{risk_group} coverage.png',
-              bbox_inches='tight')
+    # scoped so the large fonts do not leak into figures rendered later by the same process
+    with sns.axes_style('darkgrid'), sns.plotting_context(font_scale=3):
+        g = sns.factorplot(x='Year', y='Coverage (proportion)', hue='treatment_group',
+                           col='scenario', size=10, aspect=1,
+                           sharey=True, data=t)
+
+        g.fig.suptitle(f'{location}, {risk_group}')
+        g._legend.set_title('Treatment Group')
+        plt.subplots_adjust(wspace=0.1, top=0.85)
+        g.savefig(master_dir + f'{location}/' + \
+                  f'{risk_group} coverage.png',
+                  bbox_inches='tight')
+    plt.close(g.fig)
+
+def get_figure_tasks(df: pd.DataFrame):
+    """
+    split the formatted data into the slices each figure reads, grouping it
+    once by location and risk group
+    """
+    groups = {key: group for key, group in df.groupby(['location', 'risk_group'])}
+    empty = df.iloc[:0]
+
+    def data(location, risk_group, outcome=None):
+        t = groups.get((location, risk_group), empty)
+        return t if outcome is None else t.loc[t['outcome'] == outcome]
+
+    tasks = []
+    for location in location_names:
+        for risk_group in risk_groups:
+            for outcome in outcomes:
+                for outcome_type in ['value', 'averted']:
+                    tasks.append((plot_outcome_by_year, data(location, risk_group, outcome),
+                                  (location, risk_group, outcome, outcome_type)))
+            tasks.append((plot_coverage, data(location, risk_group, 'Treatment Coverage (proportion)'),
+                          (location, risk_group)))
+        for outcome in outcomes:
+            tasks.append((plot_averted_by_age, data(location, 'PLHIV', outcome), (location, outcome)))
+        tasks.append((plot_person_time_by_year, data(location, 'PLHIV', 'Person-Years'),
+                      ('All Ages', 'PLHIV', location)))
+        tasks.append((plot_person_time_by_year, data(location, 'U5 HHC', 'Person-Years'),
+                      ('0 to 4', 'U5 HHC', location)))
+    for outcome in outcomes:
+        for risk_group in risk_groups:
+            comparison_data = pd.concat([data(location, risk_group, outcome) for location in location_names])
+            for scenario in ['Intervention 2 (3HP scale up)', 'Intervention 1 (6H scale up)']:
+                tasks.append((compare_across_countries, comparison_data,
+                              (location_names, outcome, risk_group, scenario)))
+    return tasks
+
+def get_task_key(plot, args):
+    return f'{plot.__name__}{args}'
+
+def hash_slice(plot, data: pd.DataFrame, args):
+    """hash the input of a figure: its plot function, arguments and data slice"""
+    h = hashlib.sha256(get_task_key(plot, args).encode())
+    h.update(','.join(data.columns).encode())
+    h.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    return h.hexdigest()
+
+def render(task):
+    plot, data, args = task
+    plot(data, *args)
+
+def render_figures(df: pd.DataFrame, processes: int = None, force: bool = False):
+    """
+    render every figure whose input changed since the last render on a
+    process pool, recording the input hashes in the render manifest
+    """
+    for location in location_names:
+        os.makedirs(master_dir + f'{location}/', exist_ok=True)
+    manifest_path = master_dir + manifest_file
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    tasks = get_figure_tasks(df)
+    hashes = {get_task_key(plot, args): hash_slice(plot, data, args) for plot, data, args in tasks}
+    stale = [(plot, data, args) for plot, data, args in tasks
+             if manifest.get(get_task_key(plot, args)) != hashes[get_task_key(plot, args)]]
+    logger.info(f'Rendering {len(stale)} of {len(tasks)} figures.')
+    if stale:
+        with multiprocessing.Pool(processes) as pool:
+            pool.map(render, stale, chunksize=1)
+
+    with open(manifest_path, 'w') as f:
+        json.dump(hashes, f, indent=2)
 
 if __name__ == '__main__':
     result_dir = '/home/j/Project/simulation_science/latent_tuberculosis_infection/result/make_results/'
@@ -272,26 +364,4 @@ if __name__ == '__main__':
     df = load_data(result_dir, model_version)
     df, t = format_data(df)
     t.to_csv(result_dir + f'{time}_ltbi_final_results_{age_end}_formatted.csv', index=False)
-    # make plot for outcome by year
-    for location in location_names:
-        for risk_group in ['PLHIV', 'U5 HHC']:
-            for outcome in outcomes:
-                for outcome_type in ['value', 'averted']:
-                    plot_outcome_by_year(df, location, risk_group, outcome, outcome_type)
-    # make plot for averted outcome by age
-    for location in location_names:
-        for outcome in outcomes:
-            plot_averted_by_age(df, location, outcome)
-    # make plot for population by year
-    for location in location_names:
-        plot_person_time_by_year(df, 'All Ages', 'PLHIV', location)
-        plot_person_time_by_year(df, '0 to 4', 'U5 HHC', location)
-    # make plot for comparison across countries
-    for outcome in outcomes:
-        for risk_group in ['PLHIV', 'U5 HHC']:
-            for scenario in ['Intervention 2 (3HP scale up)', 'Intervention 1 (6H scale up)']:
-                compare_across_countries(df, location_names, outcome, risk_group, scenario)
-    # make plot for coverage by year
-    for location in location_names:
-        plot_coverage(df, location, 'PLHIV')
-        plot_coverage(df, location, 'U5 HHC')
+    render_figures(df)
@@ -8,7 +8,7 @@ from loguru import logger
 
 import vivarium_csu_ltbi.paths as ltbi_paths
 from vivarium_csu_ltbi import globals as project_globals
-from vivarium_csu_ltbi.results_processing import counts_output, table_output
+from vivarium_csu_ltbi.results_processing import adherence, counts_output, population, storage, table_output
 
 
 def validate_process_latest_results_args(model_versions: Tuple[str], location: str):
@@ -17,7 +17,8 @@ def validate_process_latest_results_args(model_versions: Tuple[str], location: s
 
 
 def process_latest_results(model_versions: Tuple[str], location: str,
-                           preceding_results_num: int = 0, output_path: str = None):
+                           preceding_results_num: int = 0, output_path: str = None, csv: bool = False,
+                           population_file: str = None):
     """Implements the make_results click entrypoint. model_versions and location are required arguments."""
     validate_process_latest_results_args(model_versions, location)
 
@@ -53,12 +54,17 @@ def process_latest_results(model_versions: Tuple[str], location: str,
 
     logger.info("Generating and dumping count-space data.")
     count_space_data = counts_output.get_raw_counts(summed_model_data)
-    measure_data = counts_output.split_measures(count_space_data, location)
-    measure_data.dump(output_path)
+    population_provider = population.FilePopulationProvider(population_file) if population_file else None
+    measure_data = counts_output.split_measures(count_space_data, location, population_provider)
+    measure_data.dump(output_path, csv)
+
+    logger.info("Generating and dumping adherence summaries.")
+    adherence_summary = adherence.summarize_adherence(measure_data.person_time, location)
+    storage.write_table(adherence_summary, output_path / 'adherence_proportion.hdf', csv=csv)
 
     logger.info("Generating and dumping final output table data.")
     final_data = table_output.make_tables(measure_data, location)
-    final_data.dump(output_path)
+    final_data.dump(output_path, csv)
 
 
 def find_most_recent_results(model_version: str, location: str, preceding_results_num: int = 0) -> Path:
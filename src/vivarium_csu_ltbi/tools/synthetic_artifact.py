@@ -0,0 +1,361 @@
+"""
+Synthetic artifacts
+
+Builds a location artifact with every key written by ``build_ltbi_artifact``
+and the same index layout, filled with plausible random values instead of
+GBD estimates. The project data files shipped with the package (coverage,
+coverage shifts and treatment adherence draws) are used as they are.
+
+Synthetic artifacts need no database access, so simulations, benchmarks and
+profiling runs can use them on any machine.
+"""
+from pathlib import Path
+from typing import List, Tuple
+
+import click
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import vivarium_csu_ltbi
+from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi import paths as ltbi_paths
+
+DATA_PATH = Path(vivarium_csu_ltbi.__file__).parent / 'data'
+
+GBD_AGE_BINS = [(0., 0.01917808, 'Early Neonatal'), (0.01917808, 0.07671233, 'Late Neonatal'),
+                (0.07671233, 1., 'Post Neonatal'), (1., 5., '1 to 4')]
+GBD_AGE_BINS += [(float(start), float(start + 5), f'{start} to {start + 4}') for start in range(5, 95, 5)]
+GBD_AGE_BINS += [(95., 125., '95 plus')]
+# Keeps the neonatal split, which the household exposure and birth prevalence rely on.
+COARSE_AGE_BINS = GBD_AGE_BINS[:4] + [(5., 15., '5 to 14'), (15., 60., '15 to 59'), (60., 125., '60 plus')]
+AGE_BINS = {'gbd': GBD_AGE_BINS, 'coarse': COARSE_AGE_BINS}
+
+DEMOGRAPHIC_INDEX = ['location', 'sex', 'age_start', 'year_start', 'age_end', 'year_end']
+HIV_RESTRICTIONS = {'male_only': False, 'female_only': False, 'yll_only': False, 'yld_only': False,
+                    'yll_age_group_id_start': 2, 'yll_age_group_id_end': 235,
+                    'yld_age_group_id_start': 2, 'yld_age_group_id_end': 235}
+
+
+class SyntheticData:
+    """Draw-level random data over a fixed demography."""
+
+    def __init__(self, location: str, draws: int, age_bins: List[Tuple[float, float, str]],
+                 years: Tuple[int, int], seed: int):
+        self.location = location
+        self.draws = draws
+        self.age_bins = age_bins
+        self.random = np.random.RandomState(seed)
+
+        ages = pd.DataFrame(age_bins, columns=['age_start', 'age_end', 'age_group_name'])
+        year_start = np.arange(years[0], years[1] + 1)
+        demography = pd.DataFrame([(location, sex, a.age_start, a.age_end, year, year + 1)
+                                   for sex in ['Female', 'Male']
+                                   for a in ages.itertuples()
+                                   for year in year_start],
+                                  columns=['location', 'sex', 'age_start', 'age_end', 'year_start', 'year_end'])
+        self.demography = demography
+        self.index = pd.MultiIndex.from_arrays([demography[c] for c in DEMOGRAPHIC_INDEX])
+        self.age = ((demography.age_start + demography.age_end.clip(upper=100.)) / 2).values
+
+    @property
+    def draw_columns(self) -> List[str]:
+        return [f'draw_{i}' for i in range(self.draws)]
+
+    def sample(self, mean: np.ndarray, spread: float = 0.1, index: pd.Index = None) -> pd.DataFrame:
+        """Samples draws around ``mean`` with a lognormal draw-level scale and
+        a smaller row-level scale, so draws are correlated across the
+        demography as GBD draws are."""
+        index = self.index if index is None else index
+        mean = np.broadcast_to(mean, (len(index),))
+        draw_scale = self.random.lognormal(0, spread, size=self.draws)
+        row_scale = self.random.lognormal(0, spread / 4, size=(len(index), self.draws))
+        return pd.DataFrame(mean[:, np.newaxis] * draw_scale * row_scale, index=index, columns=self.draw_columns)
+
+    def constant(self, value: float, index: pd.Index = None) -> pd.DataFrame:
+        index = self.index if index is None else index
+        return pd.DataFrame(value, index=index, columns=self.draw_columns)
+
+
+def write_demographic_data(artifact, data: SyntheticData):
+    logger.info('Writing demographic data...')
+    age = data.age
+    width = (data.demography.age_end - data.demography.age_start).clip(upper=30.).values
+    structure = pd.DataFrame({'value': 1e6 * width * np.exp(-age / 35.)}, index=data.index)
+    artifact.write('population.structure', structure)
+
+    age_bins = pd.DataFrame(data.age_bins, columns=['age_start', 'age_end', 'age_group_name'])
+    artifact.write('population.age_bins', age_bins.set_index(['age_start', 'age_end', 'age_group_name']))
+
+    life_expectancy = pd.DataFrame({'age_start': np.arange(0., 111.)})
+    life_expectancy['age_end'] = life_expectancy.age_start.shift(-1).fillna(125.)
+    life_expectancy['value'] = (89. - 0.85 * life_expectancy.age_start).clip(lower=1.6)
+    artifact.write('population.theoretical_minimum_risk_life_expectancy',
+                   life_expectancy.set_index(['age_start', 'age_end']))
+
+    artifact.write('population.demographic_dimensions', pd.DataFrame(index=data.index))
+
+    all_cause = 0.03 * (age < 1) + 5e-4 * np.exp(0.075 * age)
+    artifact.write('cause.all_causes.cause_specific_mortality_rate', data.sample(all_cause))
+
+    births = (structure.reset_index()
+              .groupby(['location', 'sex', 'year_start', 'year_end'])
+              .value.sum() * 0.01)
+    live_births = pd.concat([births * scale for scale in [1., 0.95, 1.05]],
+                            keys=['mean_value', 'lower_value', 'upper_value'], names=['parameter'])
+    live_births = live_births.reorder_levels(['location', 'sex', 'year_start', 'year_end', 'parameter'])
+    artifact.write('covariate.live_births_by_sex.estimate', live_births.sort_index().to_frame('value'))
+
+    artifact.write(f'cause.{ltbi_globals.TUBERCULOSIS_AND_HIV}.cause_specific_mortality_rate',
+                   data.sample(2e-4 + 1e-5 * age))
+
+
+def write_metadata(artifact, data: SyntheticData):
+    artifact.write(f'cause.{ltbi_globals.TUBERCULOSIS_AND_HIV}.restrictions', HIV_RESTRICTIONS)
+
+
+def write_disease_data(artifact, data: SyntheticData):
+    logger.info('Writing disease data...')
+    age = data.age
+    hiv = 0.02 * np.exp(-((age - 35.) / 15.) ** 2) + 1e-3
+    ltbi = 0.05 + 0.35 * (1 - np.exp(-age / 20.))
+    active_negative = 2e-3 * (1 - hiv)
+    active_positive = 2e-2 * hiv
+
+    prevalence = {
+        ltbi_globals.LTBI_SUSCEPTIBLE_HIV: ltbi * (1 - hiv),
+        ltbi_globals.ACTIVETB_SUSCEPTIBLE_HIV: active_negative,
+        ltbi_globals.SUSCEPTIBLE_TB_POSITIVE_HIV: (1 - ltbi) * hiv,
+        ltbi_globals.LTBI_POSITIVE_HIV: ltbi * hiv,
+        ltbi_globals.ACTIVETB_POSITIVE_HIV: active_positive,
+    }
+    prevalence = {state: data.sample(mean, spread=0.05) for state, mean in prevalence.items()}
+    susceptible = 1 - sum(prevalence.values())
+    prevalence[ltbi_globals.SUSCEPTIBLE_TB_SUSCEPTIBLE_HIV] = susceptible
+    for state in ltbi_globals.HIV_TB_STATES:
+        artifact.write(f'sequela.{state}.prevalence', prevalence[state])
+
+    excess_mortality = {
+        ltbi_globals.SUSCEPTIBLE_TB_SUSCEPTIBLE_HIV: 0.,
+        ltbi_globals.LTBI_SUSCEPTIBLE_HIV: 0.,
+        ltbi_globals.ACTIVETB_SUSCEPTIBLE_HIV: 0.2,
+        ltbi_globals.SUSCEPTIBLE_TB_POSITIVE_HIV: 0.05,
+        ltbi_globals.LTBI_POSITIVE_HIV: 0.05,
+        ltbi_globals.ACTIVETB_POSITIVE_HIV: 0.4,
+    }
+    disability_weight = {
+        ltbi_globals.SUSCEPTIBLE_TB_SUSCEPTIBLE_HIV: 0.,
+        ltbi_globals.LTBI_SUSCEPTIBLE_HIV: 0.,
+        ltbi_globals.ACTIVETB_SUSCEPTIBLE_HIV: 0.33,
+        ltbi_globals.SUSCEPTIBLE_TB_POSITIVE_HIV: 0.08,
+        ltbi_globals.LTBI_POSITIVE_HIV: 0.08,
+        ltbi_globals.ACTIVETB_POSITIVE_HIV: 0.41,
+    }
+    for state in ltbi_globals.HIV_TB_STATES:
+        for measure, values in [('excess_mortality_rate', excess_mortality), ('disability_weight', disability_weight)]:
+            value = values[state]
+            artifact.write(f'sequela.{state}.{measure}',
+                           data.sample(np.full(len(age), value)) if value else data.constant(0.))
+
+    ltbi_incidence = data.sample(0.01 + 0.02 * np.exp(-age / 30.))
+    ltbi_incidence.index = ltbi_incidence.index.reorder_levels(['location', 'age_start', 'age_end', 'sex',
+                                                                'year_start', 'year_end'])
+    ltbi_incidence = ltbi_incidence.sort_index()
+    hiv_incidence = data.sample(hiv / 10.)
+    remission = data.sample(np.full(len(age), 2.))
+    transition_rates = {
+        ltbi_globals.SUSCEPTIBLE_TB_SUSCEPTIBLE_HIV_TO_LTBI_SUSCEPTIBLE_HIV: ltbi_incidence,
+        ltbi_globals.SUSCEPTIBLE_TB_SUSCEPTIBLE_HIV_TO_SUSCEPTIBLE_TB_POSITIVE_HIV: hiv_incidence,
+        ltbi_globals.LTBI_SUSCEPTIBLE_HIV_TO_ACTIVETB_SUSCEPTIBLE_HIV: data.sample(np.full(len(age), 1e-3)),
+        ltbi_globals.LTBI_SUSCEPTIBLE_HIV_TO_LTBI_POSITIVE_HIV: hiv_incidence,
+        ltbi_globals.SUSCEPTIBLE_TB_POSITIVE_HIV_TO_LTBI_POSITIVE_HIV: ltbi_incidence,
+        ltbi_globals.LTBI_POSITIVE_HIV_TO_ACTIVETB_POSITIVE_HIV: data.sample(np.full(len(age), 2e-2)),
+        ltbi_globals.ACTIVETB_POSITIVE_HIV_TO_SUSCEPTIBLE_TB_POSITIVE_HIV: remission,
+        ltbi_globals.ACTIVETB_SUSCEPTIBLE_HIV_TO_ACTIVETB_POSITIVE_HIV: hiv_incidence,
+        ltbi_globals.ACTIVETB_SUSCEPTIBLE_HIV_TO_SUSCEPTIBLE_TB_SUSCEPTIBLE_HIV: remission,
+    }
+    for transition in ltbi_globals.HIV_TB_TRANSITIONS:
+        artifact.write(f'sequela.{transition}.transition_rate', transition_rates[transition])
+
+
+def write_exposure_risk_data(artifact, data: SyntheticData):
+    logger.info('Writing household tuberculosis data...')
+    risk = ltbi_globals.HOUSEHOLD_TUBERCULOSIS
+    exposed = data.sample(np.full(len(data.age), 0.05)).clip(upper=1.)
+    exposure = pd.concat([exposed, 1 - exposed], keys=ltbi_globals.HOUSEHOLD_TUBERCULOSIS_EXPOSURE_CATEGORIES,
+                         names=['parameter'])
+    exposure.index = exposure.index.reorder_levels(['location', 'parameter', 'sex', 'age_start',
+                                                    'year_start', 'age_end', 'year_end'])
+    exposure = exposure.sort_index()
+
+    under_five = data.demography.age_end.values <= 5.
+    cat1 = data.sample(np.where(under_five, 4.72, 1.75), spread=0.05)
+    relative_risk = pd.concat([cat1, data.constant(1.)], keys=ltbi_globals.HOUSEHOLD_TUBERCULOSIS_EXPOSURE_CATEGORIES,
+                              names=['parameter'])
+    targets = [('susceptible_tb_susceptible_hiv_to_ltbi_susceptible_hiv', 'transition_rate'),
+               ('susceptible_tb_positive_hiv_to_ltbi_positive_hiv', 'transition_rate')]
+    targets += [(entity, measure) for entity in [ltbi_globals.LTBI_SUSCEPTIBLE_HIV, ltbi_globals.LTBI_POSITIVE_HIV]
+                for measure in ['prevalence', 'birth_prevalence']]
+    relative_risk = pd.concat([relative_risk] * len(targets), keys=targets,
+                              names=['affected_entity', 'affected_measure'])
+    relative_risk.index = relative_risk.index.reorder_levels(['location', 'parameter', 'sex', 'age_start', 'age_end',
+                                                              'year_start', 'year_end', 'affected_entity',
+                                                              'affected_measure'])
+    relative_risk = relative_risk.sort_index()
+
+    mean_rr = exposed.values * cat1.values + (1 - exposed.values)
+    paf = pd.DataFrame((mean_rr - 1) / mean_rr, index=data.index, columns=data.draw_columns)
+    paf = pd.concat([paf] * len(targets), keys=targets, names=['affected_entity', 'affected_measure'])
+    paf.index = paf.index.reorder_levels(['location', 'sex', 'age_start', 'age_end', 'year_start', 'year_end',
+                                          'affected_entity', 'affected_measure'])
+
+    artifact.write(f'risk_factor.{risk}.distribution', ltbi_globals.RISK_DISTRIBUTION_TYPE)
+    artifact.write(f'risk_factor.{risk}.exposure', exposure)
+    artifact.write(f'risk_factor.{risk}.relative_risk', relative_risk)
+    artifact.write(f'risk_factor.{risk}.population_attributable_fraction', paf.sort_index())
+
+
+def write_treatment_data(artifact, data: SyntheticData):
+    logger.info('Writing LTBI treatment data...')
+    age_groups = data.demography[['location', 'sex', 'age_start', 'age_end']].drop_duplicates()
+
+    coverage = pd.read_csv(DATA_PATH / 'baseline_coverage.csv')
+    coverage = coverage[coverage.location == data.location].rename(columns={'year': 'year_start'})
+    coverage['year_end'] = coverage.year_start + 1
+    coverage['value'] /= 100.
+    coverage = age_groups.merge(coverage, on='location')
+    coverage = pd.concat([coverage.assign(treatment_type='6H'), coverage.assign(treatment_type='3HP', value=0.)])
+    coverage = coverage.set_index(['location', 'sex', 'age_start', 'age_end', 'year_start', 'year_end',
+                                   'treatment_subgroup', 'treatment_type'])
+    artifact.write('risk_factor.ltbi_treatment.coverage', _broadcast(coverage.value, data.draw_columns))
+
+    shift = pd.read_csv(DATA_PATH / 'intervention_coverage_shift.csv')
+    shift = shift[shift.location == data.location].rename(columns={'year': 'year_start',
+                                                                   'medication': 'treatment_type'})
+    shift['year_end'] = shift.year_start + 1
+    shift['value'] /= 100.
+    shift = pd.concat([shift.assign(sex='Male'), shift.assign(sex='Female')])
+    shift = shift.set_index(['location', 'sex', 'age_start', 'age_end', 'year_start', 'year_end',
+                             'treatment_subgroup', 'treatment_type', 'scenario'])
+    artifact.write('ltbi_treatment.intervention_coverage_shift', _broadcast(shift.value, data.draw_columns))
+
+    treatment_draws = pd.read_csv(DATA_PATH / 'treatment_adherence_draws.csv').iloc[:data.draws]
+    adherence = {'3HP': treatment_draws.adherence_3hp_real_world.values,
+                 '6H': treatment_draws.adherence_6h_real_world.values}
+    adherence = pd.concat([_repeat_draws(values, data) for values in adherence.values()],
+                          keys=list(adherence), names=['treatment_type'])
+    adherence.index = adherence.index.reorder_levels(DEMOGRAPHIC_INDEX + ['treatment_type'])
+    artifact.write('ltbi_treatment.adherence', adherence)
+
+    relative_risk = {'untreated': treatment_draws.RR_no_tx.values,
+                     '6H_nonadherent': treatment_draws.RR_NA.values,
+                     '3HP_nonadherent': treatment_draws.RR_NA.values,
+                     '6H_adherent': np.ones(data.draws),
+                     '3HP_adherent': np.ones(data.draws)}
+    relative_risk = pd.concat([_repeat_draws(values, data) for values in relative_risk.values()],
+                              keys=list(relative_risk), names=['parameter'])
+    relative_risk.index = relative_risk.index.reorder_levels(DEMOGRAPHIC_INDEX + ['parameter'])
+    targets = [('ltbi_positive_hiv_to_activetb_positive_hiv', 'transition_rate'),
+               ('ltbi_susceptible_hiv_to_activetb_susceptible_hiv', 'transition_rate')]
+    full_relative_risk = pd.concat([relative_risk] * len(targets), keys=targets,
+                                   names=['affected_entity', 'affected_measure'])
+    full_relative_risk.index = full_relative_risk.index.reorder_levels(
+        DEMOGRAPHIC_INDEX + ['parameter', 'affected_entity', 'affected_measure'])
+    artifact.write('risk_factor.ltbi_treatment.relative_risk', full_relative_risk)
+    artifact.write('risk_factor.ltbi_treatment.distribution', 'ordered_polytomous')
+
+    # Mean relative risk of the 6H baseline, with the under five coverage
+    # applied to the five percent of children exposed to household tb.
+    six_h = coverage.xs('6H', level='treatment_type').value.unstack('treatment_subgroup')
+    adherent = treatment_draws.adherence_6h_real_world.values
+    paf = []
+    for subgroup, share, target in [('with_hiv', 1., targets[0]), ('under_five_hhtb', 0.05, targets[1])]:
+        covered = six_h[subgroup].values[:, np.newaxis] * share
+        mean_rr = (covered * adherent + covered * (1 - adherent) * treatment_draws.RR_NA.values
+                   + (1 - covered) * treatment_draws.RR_no_tx.values)
+        target_paf = pd.DataFrame((mean_rr - 1) / mean_rr, index=six_h.index, columns=data.draw_columns)
+        target_paf['affected_entity'], target_paf['affected_measure'] = target
+        paf.append(target_paf.set_index(['affected_entity', 'affected_measure'], append=True))
+    artifact.write('risk_factor.ltbi_treatment.population_attributable_fraction', pd.concat(paf))
+
+
+def _broadcast(values: pd.Series, draw_columns: List[str]) -> pd.DataFrame:
+    return pd.DataFrame(np.repeat(values.values[:, np.newaxis], len(draw_columns), axis=1),
+                        index=values.index, columns=draw_columns)
+
+
+def _repeat_draws(values: np.ndarray, data: SyntheticData) -> pd.DataFrame:
+    return pd.DataFrame(np.tile(values, (len(data.index), 1)), index=data.index, columns=data.draw_columns)
+
+
+def build_synthetic_artifact(path: Path, location: str, draws: int = 10, age_bins: str = 'gbd',
+                             years: Tuple[int, int] = (1990, 2017), seed: int = 12221990) -> Path:
+    """Writes a synthetic artifact for ``location`` to ``path``.
+
+    Parameters
+    ----------
+    path
+        The artifact file to write. Any existing file is replaced.
+    location
+        The location name, as in ``globals.LOCATIONS``. Only the project
+        data files depend on it.
+    draws
+        The number of draws to generate, at most 1000.
+    age_bins
+        Either ``'gbd'`` for the GBD age groups or ``'coarse'`` for the
+        neonatal groups plus the reporting age groups.
+    years
+        The first and last year of the demography.
+    seed
+        Seed for the random values.
+
+    Returns
+    -------
+        The path to the artifact.
+
+    """
+    from vivarium.framework.artifact import Artifact, get_location_term
+
+    if not 0 < draws <= 1000:
+        raise ValueError(f'The number of draws must be between 1 and 1000, not {draws}.')
+    path = Path(path)
+    if path.is_file():
+        path.unlink()
+    artifact = Artifact(str(path), filter_terms=[get_location_term(location)])
+    artifact.write('metadata.locations', [location])
+
+    data = SyntheticData(location, draws, AGE_BINS[age_bins], years, seed)
+    write_demographic_data(artifact, data)
+    write_metadata(artifact, data)
+    write_disease_data(artifact, data)
+    write_exposure_risk_data(artifact, data)
+    write_treatment_data(artifact, data)
+    logger.info(f'Synthetic artifact written to {path}.')
+    return path
+
+
+@click.command()
+@click.option('-l', '--location', default='India', show_default=True,
+              type=click.Choice(ltbi_globals.LOCATIONS),
+              help='The location for which to build an artifact.')
+@click.option('-o', '--output-dir', default=str(ltbi_paths.ARTIFACT_ROOT / 'synthetic'), show_default=True,
+              type=click.Path(file_okay=False),
+              help='The directory to write the artifact to.')
+@click.option('-d', '--draws', default=10, show_default=True, type=click.IntRange(1, 1000),
+              help='The number of draws to generate.')
+@click.option('-a', '--age-bins', default='gbd', show_default=True, type=click.Choice(list(AGE_BINS)),
+              help='The age group resolution of the demography.')
+@click.option('-y', '--years', default=(1990, 2017), show_default=True, type=(int, int),
+              help='The first and last year of the demography.')
+@click.option('-s', '--seed', default=12221990, show_default=True, help='Seed for the random values.')
+def build_synthetic_ltbi_artifact(location, output_dir, draws, age_bins, years, seed):
+    """Build a synthetic artifact with the structure of the LTBI artifact.
+
+    No database access is needed. Values are random but plausible, so the
+    artifact is suitable for testing and benchmarking, not for results.
+
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    build_synthetic_artifact(output_dir / f'{ltbi_globals.formatted_location(location)}.hdf',
+                             location, draws, age_bins, tuple(years), seed)
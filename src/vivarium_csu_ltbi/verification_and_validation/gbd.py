@@ -0,0 +1,119 @@
+"""
+GBD comparison data for verification and validation.
+
+GBD cause outputs are pulled from a provider once per location, cause and
+GBD round and kept in a local cache with one node per cause, so validating
+a location again after a model change reads the cache and does not query
+the databases. ``FileGBDProvider`` serves the same data from a local file
+for work without database access.
+"""
+from pathlib import Path
+from typing import List, Sequence, Union
+
+import pandas as pd
+from loguru import logger
+
+import vivarium_csu_ltbi.paths as ltbi_paths
+
+GBD_ROUND_ID = 5
+AGE_GROUP_IDS = list(range(2, 21)) + [30, 31, 32, 235]
+SEX_IDS = [1, 2, 3]  # Male, female, both
+RATE_METRIC_ID = 3
+MEASURE_IDS = {1: 'death', 2: 'dalys', 3: 'ylds', 4: 'ylls'}
+GBD_COLUMNS = ['cause', 'age_group_id', 'age_group', 'measure', 'sex', 'val', 'upper', 'lower']
+
+
+class DatabaseGBDProvider:
+    """Pulls GBD cause outputs from the IHME databases."""
+
+    def get_cause_outputs(self, location: str, cause_names: List[str], gbd_round_id: int) -> pd.DataFrame:
+        from db_queries import get_ids, get_outputs
+        from gbd_mapping import causes
+
+        location_table = get_ids('location')
+        location_id = location_table.loc[location_table.location_name == location].location_id.values
+        cause_map = {c.gbd_id: c.name for c in causes if c.name in cause_names}
+
+        gbd_outputs = get_outputs('cause', cause_id=list(cause_map.keys()),
+                                  metric_id=[RATE_METRIC_ID], measure_id=list(MEASURE_IDS),
+                                  sex_id=SEX_IDS, age_group_id=AGE_GROUP_IDS,
+                                  location_id=location_id, gbd_round_id=gbd_round_id)
+
+        gbd_outputs['cause'] = gbd_outputs.cause_id.map(cause_map)
+        gbd_outputs['measure'] = gbd_outputs.measure_id.map(MEASURE_IDS)
+        gbd_outputs['age_group'] = gbd_outputs.age_group_name.str.replace(' ', '_').map(lambda x: x.lower())
+        gbd_outputs = gbd_outputs[GBD_COLUMNS].copy()
+        gbd_outputs[['val', 'upper', 'lower']] *= 100_000
+        return gbd_outputs.fillna({'val': 0.0, 'upper': 0.0, 'lower': 0.0})
+
+
+class FileGBDProvider:
+    """Serves GBD cause outputs from a local csv or hdf file.
+
+    The file has a ``location`` column and the columns of ``GBD_COLUMNS``,
+    with rates per 100,000 person years and age group names formatted as in
+    the simulation results. An optional ``gbd_round_id`` column allows one
+    file to hold several rounds.
+
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    def get_cause_outputs(self, location: str, cause_names: List[str], gbd_round_id: int) -> pd.DataFrame:
+        if self.path.suffix == '.csv':
+            data = pd.read_csv(self.path)
+        else:
+            data = pd.read_hdf(self.path)
+        data = data[(data.location == location) & data.cause.isin(cause_names)]
+        if 'gbd_round_id' in data.columns:
+            data = data[data.gbd_round_id == gbd_round_id]
+        missing = set(cause_names).difference(data.cause)
+        if missing:
+            raise ValueError(f'No GBD results for {location}, GBD round {gbd_round_id} '
+                             f'and causes {sorted(missing)} in {self.path}.')
+        return data[GBD_COLUMNS]
+
+
+def get_cause_key(cause: str) -> str:
+    return f'/causes/{cause}'
+
+
+def get_gbd_results(location: str, cause_names: Sequence[str], gbd_round_id: int = GBD_ROUND_ID,
+                    provider=None) -> pd.DataFrame:
+    """Gets GBD cause outputs in rate space for a location.
+
+    Causes already in the cache of the location and round are read from it.
+    The others are pulled from ``provider`` in one request, which defaults to
+    the GBD databases, and added to the cache.
+
+    Parameters
+    ----------
+    location
+        The GBD location name.
+    cause_names
+        The GBD names of the causes.
+    gbd_round_id
+        The GBD round of the results.
+    provider
+        The source of results missing from the cache.
+
+    Returns
+    -------
+        The results with the columns of ``GBD_COLUMNS``, sorted by cause,
+        sex and measure.
+
+    """
+    cache_path = ltbi_paths.get_gbd_comparison_path(location, gbd_round_id)
+    with pd.HDFStore(str(cache_path), mode='a') as store:
+        cached = set(store.keys())
+        missing = [cause for cause in cause_names if get_cause_key(cause) not in cached]
+        if missing:
+            provider = DatabaseGBDProvider() if provider is None else provider
+            logger.info(f'Pulling GBD round {gbd_round_id} results for {location} and causes {missing}.')
+            pulled = provider.get_cause_outputs(location, missing, gbd_round_id)
+            for cause in missing:
+                store.put(get_cause_key(cause), pulled.loc[pulled.cause == cause, GBD_COLUMNS])
+        data = pd.concat([store.get(get_cause_key(cause)) for cause in cause_names], ignore_index=True)
+
+    return data.set_index(['cause', 'sex', 'measure']).sort_index().reset_index()
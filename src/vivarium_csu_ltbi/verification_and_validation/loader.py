@@ -1,14 +1,23 @@
 from pathlib import Path
-from typing import Union
+from typing import List, Sequence, Union
 
 from loguru import logger
+import numpy as np
 import pandas as pd
+import tables
 import yaml
 
 from vivarium_csu_ltbi import globals as ltbi_globals
 from vivarium_csu_ltbi import paths as ltbi_paths
 
-TEMPLATE_COLUMNS = ['cause', 'sex', 'age_group', 'measure', 'input_draw']
+TEMPLATE_COLUMNS = ['cause', 'sex', 'age_group', 'measure', 'scenario', 'input_draw']
+SCHEMA_COLUMNS = ['measure', 'cause', 'year', 'sex', 'age_group', 'risk_group', 'treatment_group']
+# Matches observer columns with and without the year and the household TB
+# and treatment strata, e.g.
+# death_due_to_{cause}_in_{year}_among_{sex}_in_age_group_{age_group}_{risk_group}_treatment_group_{treatment_group}
+COLUMN_PATTERN = (r'^(?P<measure>.+?)(?:_due_to_(?P<cause>.+?))?(?:_in_(?P<year>\d{4}))?'
+                  r'_among_(?P<sex>[a-z]+)_in_age_group_(?P<age_group>.+?)'
+                  r'(?:_(?P<risk_group>(?:un)?exposed_to_hhtb)_treatment_group_(?P<treatment_group>.+))?$')
 
 
 def get_results(location: str, timestamp: str = None) -> pd.DataFrame:
@@ -71,34 +80,194 @@ def load_results_from_output_dir(output_dir: Union[str, Path], drop_missing=True
     if not output_path.exists():
         raise FileNotFoundError(f'Cannot find output file at {str(output_path)}.')
     if not keyspace_path.exists():
-        raise FileNotFoundError(f'Cannon find keyspace file at {str(keyspace_path)}')
+        raise FileNotFoundError(f'Cannot find keyspace file at {str(keyspace_path)}')
 
     data = pd.read_hdf(output_path)  # type: pd.DataFrame
     with keyspace_path.open() as f:
-        keyspace = yaml.load(f.read())
+        keyspace = yaml.full_load(f)
 
-    # TODO: Count scenarios as well.
-    seeds = len(keyspace['random_seed'])
-    draws = len(keyspace['input_draw'])
-    expected_result_count = seeds * draws
+    data = data.loc[get_complete_rows(data, keyspace, drop_missing)]
+    data = data.groupby([ltbi_globals.INPUT_DRAW_COLUMN, ltbi_globals.SCENARIO_COLUMN]).sum()
+    data = data.rename_axis([ltbi_globals.INPUT_DRAW_COLUMN, 'scenario'])
+
+    return data
+
+
+def get_complete_rows(data: pd.DataFrame, keyspace: dict, drop_missing: bool = True) -> np.ndarray:
+    """Flags the rows of draws that have results for every seed and scenario.
+
+    Parameters
+    ----------
+    data
+        Results with ``input_draw`` and ``random_seed`` columns, one row per
+        draw, seed and scenario.
+    keyspace
+        The keyspace of the run.
+    drop_missing
+        If false, every row is kept. Incomplete results are reported either
+        way.
+
+    Returns
+    -------
+        A boolean mask of the rows to keep.
+
+    """
+    seeds = len(keyspace[ltbi_globals.RANDOM_SEED_COLUMN])
+    draws = len(keyspace[ltbi_globals.INPUT_DRAW_COLUMN])
+    scenarios = len(keyspace.get(ltbi_globals.SCENARIO_COLUMN, ltbi_globals.SCENARIOS))
+    expected_result_count = seeds * draws * scenarios
     result_count = len(data)
+    keep = np.ones(result_count, dtype=bool)
 
     if not expected_result_count == result_count:
         logger.warning(f'Results are incomplete. Expected {expected_result_count} rows of data in the results '
                        f'but only found {result_count}.')
         if drop_missing:
             logger.warning(f'Dropping draws with incomplete results.')
-            expected_result_count_per_draw = seeds  # TODO: seeds * scenarios
-            result_count_by_draw = data.groupby('input_draw').size()
-            finished_draws = result_count_by_draw[result_count_by_draw == expected_result_count_per_draw].index.tolist()
-            data = data.loc[data['input_draw'].isin(finished_draws)]
+            draw = data[ltbi_globals.INPUT_DRAW_COLUMN]
+            result_count_by_draw = draw.groupby(draw).transform('size')
+            keep = (result_count_by_draw == seeds * scenarios).values
         else:
             logger.warning(f'Aggregating draws with incomplete results.')
+    return keep
 
-    # TODO: Include scenarios in the groupby.
-    data = data.groupby('input_draw').sum()
 
-    return data
+def get_column_schema(columns: Sequence[str]) -> pd.DataFrame:
+    """Parses observer column names into a typed dimension table.
+
+    Parameters
+    ----------
+    columns
+        The columns of a simulation output.
+
+    Returns
+    -------
+        One row per observer column, indexed by column name, with categorical
+        ``measure``, ``cause``, ``year``, ``sex``, ``age_group``,
+        ``risk_group`` and ``treatment_group`` columns. Dimensions a column
+        does not have are null. Columns that are not observer columns, such
+        as ``input_draw``, are left out.
+
+    """
+    schema = pd.Index(columns).str.extract(COLUMN_PATTERN)
+    schema.index = pd.Index(columns, name='column')
+    schema = schema.loc[schema['measure'].notnull()]
+    schema['sex'] = schema['sex'].str.capitalize()
+    return schema.astype('category')
+
+
+def read_output_columns(output_path: Union[str, Path], columns: List[str]) -> pd.DataFrame:
+    """Reads only ``columns`` from a simulation output.
+
+    ``psimulate`` writes its output in the fixed HDF format, which pandas can
+    only read whole. The column blocks of the frame are read from the file
+    directly instead, selecting the requested columns from each block.
+
+    """
+    with pd.HDFStore(str(output_path), mode='r') as store:
+        key = store.keys()[0]
+        storer = store.get_storer(key)
+        if storer.is_table:
+            return store.select(key, columns=columns)
+        if getattr(storer.group._v_attrs, 'pandas_type', None) != 'frame':
+            return store.get(key)[columns]
+
+        group = storer.group
+        data = {}
+        for block in range(group._v_attrs.nblocks):
+            items = storer.read_index(f'block{block}_items')
+            positions = np.sort(items.get_indexer(columns))
+            positions = positions[positions >= 0]
+            if not len(positions):
+                continue
+            node = getattr(group, f'block{block}_values')
+            if isinstance(node, tables.VLArray):
+                values = np.asarray(node[0])
+                values = values.reshape(len(values), -1)[:, positions]
+            elif getattr(node._v_attrs, 'transposed', False):
+                values = node[:, positions.tolist()]
+            else:
+                values = node[positions.tolist()].T
+            for position, column in zip(range(values.shape[1]), items[positions]):
+                data[column] = values[:, position]
+    return pd.DataFrame(data)[columns]
+
+
+def load_measures(output_dir: Union[str, Path], measures: Sequence[str], causes: Sequence[str] = None,
+                  drop_missing: bool = True) -> pd.DataFrame:
+    """Loads long-format results of ``measures`` from an output directory.
+
+    The column schema of the output is parsed once, only the columns of the
+    requested measures are read, and values are summed over seeds, years and
+    household TB and treatment strata without unpivoting the wide table.
+
+    Parameters
+    ----------
+    output_dir
+        The directory containing the simulation outputs. Expects a directory
+        produced by ``psimulate``.
+    measures
+        The measures to load, e.g. ``death``, ``ylls``, ``ylds`` or
+        ``person_time``.
+    causes
+        The causes to load. Defaults to every cause. Measures without a cause,
+        such as person time, are always loaded.
+    drop_missing
+        If true, drops draws that are missing any seed or scenario.
+
+    Returns
+    -------
+        The results with ``cause``, ``sex``, ``age_group``, ``measure``,
+        ``scenario``, ``input_draw`` and ``value`` columns.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the expected output files are not found.
+
+    """
+    output_dir = Path(output_dir).resolve()
+    output_path = output_dir / 'output.hdf'
+    keyspace_path = output_dir / 'keyspace.yaml'
+
+    if not output_path.exists():
+        raise FileNotFoundError(f'Cannot find output file at {str(output_path)}.')
+    if not keyspace_path.exists():
+        raise FileNotFoundError(f'Cannot find keyspace file at {str(keyspace_path)}')
+    with keyspace_path.open() as f:
+        keyspace = yaml.full_load(f)
+
+    with pd.HDFStore(str(output_path), mode='r') as store:
+        storer = store.get_storer(store.keys()[0])
+        columns = storer.read_index('axis0') if not storer.is_table else storer.non_index_axes[0][1]
+    schema = get_column_schema(columns)
+    selected = schema['measure'].isin(measures)
+    if causes is not None:
+        selected &= schema['cause'].isin(causes) | schema['cause'].isnull()
+    schema = schema.loc[selected, ['cause', 'sex', 'age_group', 'measure']]
+
+    # Sums the columns of each cause, sex, age group and measure with one
+    # reduction over the columns sorted by group.
+    group_columns = ['cause', 'sex', 'age_group', 'measure']
+    codes = np.column_stack([schema[column].cat.codes.values for column in group_columns])
+    groups = np.unique(codes, axis=0, return_inverse=True)[1].reshape(-1)
+    order = np.argsort(groups, kind='mergesort')
+    starts = np.flatnonzero(np.r_[True, np.diff(groups[order]) != 0])
+    group_labels = schema.iloc[order[starts]].reset_index(drop=True)
+
+    index_columns = [ltbi_globals.INPUT_DRAW_COLUMN, ltbi_globals.RANDOM_SEED_COLUMN, ltbi_globals.SCENARIO_COLUMN]
+    data = read_output_columns(output_path, index_columns + schema.index[order].tolist())
+    data = data.loc[get_complete_rows(data, keyspace, drop_missing)]
+    values = data.drop(columns=index_columns).values.astype(np.float64)
+    values = np.add.reduceat(values, starts, axis=1) if len(starts) else values[:, :0]
+
+    totals = pd.DataFrame(values).groupby([data[ltbi_globals.INPUT_DRAW_COLUMN].values,
+                                           data[ltbi_globals.SCENARIO_COLUMN].values], sort=True).sum()
+    output = group_labels.iloc[np.tile(np.arange(len(group_labels)), len(totals))].reset_index(drop=True)
+    output[ltbi_globals.INPUT_DRAW_COLUMN] = np.repeat(totals.index.get_level_values(0).values, len(group_labels))
+    output['scenario'] = np.repeat(totals.index.get_level_values(1).values, len(group_labels))
+    output['value'] = totals.values.ravel()
+    return output[TEMPLATE_COLUMNS + ['value']]
 
 
 def get_sex_from_template(template_string: str):
@@ -112,7 +281,7 @@ def get_age_group_from_template(template_string: str):
 def standardize_shape(data: pd.DataFrame, measure: str):
     """select specific measure of data and unpivot it into long-format dataframe"""
     measure_data = data[[c for c in data.columns if measure in c]]
-    measure_data = measure_data.reset_index().melt(id_vars=['input_draw'], var_name=['label'])
+    measure_data = measure_data.reset_index().melt(id_vars=['input_draw', 'scenario'], var_name='label')
 
     if 'due_to' in measure:
         measure, cause = measure.split('_due_to_', 1)
@@ -164,12 +333,13 @@ def append_demographic_aggregates(data: pd.DataFrame, by_cause=False):
     """aggregate results on demographic groups and append it to input data"""
     extra_cols = ['cause'] if by_cause else []
 
-    age_aggregate = data.groupby(extra_cols + ['sex', 'measure', 'input_draw']).value.sum().reset_index()
+    age_aggregate = data.groupby(extra_cols + ['sex', 'measure', 'scenario', 'input_draw']).value.sum().reset_index()
     age_aggregate['age_group'] = 'all_ages'
 
     data = pd.concat([data, age_aggregate])
 
-    sex_aggregate = data.groupby(extra_cols + ['age_group', 'measure', 'input_draw']).value.sum().reset_index()
+    sex_aggregate = (data.groupby(extra_cols + ['age_group', 'measure', 'scenario', 'input_draw'])
+                     .value.sum().reset_index())
     sex_aggregate['sex'] = 'Both'
 
     data = pd.concat([data, sex_aggregate])
@@ -199,7 +369,7 @@ def get_person_time(data: pd.DataFrame):
 
 def get_table_shell(results: pd.DataFrame, person_time: pd.DataFrame):
     """convert count space results to rate space and calculate mean, lower bound, and upper bound"""
-    results_w_pt = pd.merge(results, person_time, on=['sex', 'age_group', 'input_draw'])
+    results_w_pt = pd.merge(results, person_time, on=['sex', 'age_group', 'scenario', 'input_draw'])
     results_w_pt.rename(columns={'value': 'count'}, inplace=True)
     results_w_pt['rate'] = results_w_pt['count'] / results_w_pt['person_time'] * 100_000
 
@@ -1,12 +1,19 @@
-from ltbi_sim_outputs_processing import *
+import multiprocessing
 
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+import pandas as pd
 import seaborn as sns
 sns.set(style='darkgrid')
-from gbd_mapping import causes
-from db_queries import get_outputs, get_ids
 from matplotlib.backends.backend_pdf import PdfPages
 
+from vivarium_csu_ltbi.verification_and_validation import gbd
+from vivarium_csu_ltbi.verification_and_validation.loader import (TEMPLATE_COLUMNS as template_cols,
+                                                                   load_results_from_output_dir as load_data,
+                                                                   append_cause_aggregates, get_disaggregated_results,
+                                                                   get_person_time)
+
 gbd_names = ['all_causes',
              'drug_susceptible_tuberculosis',
              'multidrug_resistant_tuberculosis_without_extensive_drug_resistance',
@@ -16,13 +23,6 @@ gbd_names = ['all_causes',
              'hiv_aids_extensively_drug_resistant_tuberculosis',
              'hiv_aids_resulting_in_other_diseases']
 
-# create an age_group dict in order to sort age_group by it's id
-age_group_ids = list(range(2, 21)) + [30, 31, 32, 235]
-age_table = get_ids('age_group')
-age_table = age_table[age_table.age_group_id.isin(age_group_ids)]
-age_table['age_group_name'] = age_table.age_group_name.str.replace(' ', '_').map(lambda x: x.lower())
-age_dict = dict(zip(age_table.age_group_name, age_table.age_group_id))
-
 def get_hiv_other_from_sim(df: pd.DataFrame):
     """calculate hiv_other by aggregating three states"""
     susceptible_tb_positive_hiv = df.loc[df.cause == 'susceptible_tb_positive_hiv'].set_index(template_cols[1:])
@@ -34,35 +34,6 @@ def get_hiv_other_from_sim(df: pd.DataFrame):
     hiv_other = hiv_other.reset_index().set_index(template_cols)
     return hiv_other.reset_index()
 
-def get_gbd_results(location_id: int, cause_names: list):
-    """pull gbd results in rate space"""
-    ages = age_group_ids
-    male, female, both = 1, 2, 3
-    rate = 3
-    deaths, dalys, ylds, ylls = 1, 2, 3, 4
-
-    cause_map = {c.gbd_id: c.name for c in causes if c.name in cause_names}
-
-    gbd_outputs = get_outputs('cause', cause_id=list(cause_map.keys()),
-                              metric_id=[rate], measure_id=[deaths, dalys, ylls, ylds],
-                              sex_id=[male, female, both], age_group_id=ages,
-                              location_id=location_id, gbd_round_id=5)
-
-    gbd_outputs = gbd_outputs[['cause_id', 'age_group_name', 'measure_name', 'sex', 'val', 'upper', 'lower']]
-    gbd_outputs['cause'] = gbd_outputs.cause_id.map(cause_map)
-    gbd_outputs['measure'] = gbd_outputs.measure_name.map({'Deaths': 'death',
-                                                           'DALYs (Disability-Adjusted Life Years)': 'dalys',
-                                                           'YLLs (Years of Life Lost)': 'ylls',
-                                                           'YLDs (Years Lived with Disability)': 'ylds'})
-    gbd_outputs['age_group'] = gbd_outputs.age_group_name.str.replace(' ', '_').map(lambda x: x.lower())
-    gbd_outputs = gbd_outputs.drop(columns=['cause_id', 'measure_name', 'age_group_name'])
-    gbd_outputs[['val', 'upper', 'lower']] *= 100_000
-    gbd_outputs = gbd_outputs.fillna(0.0)
-
-    gbd_outputs = gbd_outputs.set_index(['cause', 'sex', 'measure']).sort_index().reset_index()
-
-    return gbd_outputs
-
 def aggregate_gbd_results(df: pd.DataFrame, cause_names: list):
     """aggregate child active TB causes to match sim output format"""
     idx_cols = ['sex', 'age_group', 'measure']
@@ -74,7 +45,7 @@ def aggregate_gbd_results(df: pd.DataFrame, cause_names: list):
                         index=pd.MultiIndex.from_product([sex, age_group, measure], names=idx_cols),
                         columns=val_cols)
     for cause in cause_names:
-        data += df.loc[df.cause == cause].drop(columns='cause').set_index(idx_cols)
+        data += df.loc[df.cause == cause].set_index(idx_cols)[val_cols]
     return data.reset_index()
 
 def filter_gbd_results(df: pd.DataFrame, cause_names: list):
@@ -91,10 +62,16 @@ def filter_gbd_results(df: pd.DataFrame, cause_names: list):
     
     data = pd.concat([all_causes, activetb_susceptible_hiv, activetb_positive_hiv, hiv_other],
                      ignore_index=True, sort=True)
-    data = data.set_index(template_cols[:-1]).reset_index()
+    data = data.set_index(['cause', 'sex', 'age_group', 'measure']).reset_index()
     return data
 
-def make_plots(cause: str, sim_results: pd.DataFrame, gbd_results: pd.DataFrame, location: str, measure: str):
+def get_age_dict(gbd_results: pd.DataFrame) -> dict:
+    """map age_group names to their ids in order to sort age_group by it's id"""
+    age_groups = gbd_results[['age_group', 'age_group_id']].drop_duplicates()
+    return dict(zip(age_groups.age_group, age_groups.age_group_id))
+
+def make_plots(cause: str, sim_results: pd.DataFrame, gbd_results: pd.DataFrame, location: str, measure: str,
+               age_dict: dict):
     """compare sim outputs to gbd results"""
     sim_results = sim_results.loc[sim_results.age_group.map(age_dict).sort_values().index]
     sim_results = sim_results.set_index(['cause', 'sex', 'measure']).sort_index().reset_index()
@@ -142,25 +119,35 @@ def make_plots(cause: str, sim_results: pd.DataFrame, gbd_results: pd.DataFrame,
 
     plt.close(g1.fig)
 
-def plot_multiple_locations(path_dict: dict, cause_names: list, gbd_names: list):
-    location_table = get_ids('location')
+def validate_location(location: str, path: str, cause_names: list, gbd_names: list, provider=None):
+    """plot the sim outputs of one location against gbd results"""
     causes = ['all_causes', 'activetb_susceptible_hiv', 'activetb_positive_hiv', 'hiv_aids_resulting_in_other_diseases']
     measures = ['death', 'dalys', 'ylds', 'ylls']
-    for location, path in path_dict.items():
-        # sim results
-        df = load_data(path)
-        pt = get_person_time(df)
-        results = append_cause_aggregates(get_disaggregated_results(df, cause_names))
-        results = pd.concat([results, get_hiv_other_from_sim(results)], ignore_index=True)
-        results_w_pt = pd.merge(results, pt, on=['sex', 'age_group', 'input_draw'])
-        # gbd results
-        location_id = location_table.loc[location_table.location_name == location].location_id.values
-        gbd = get_gbd_results(location_id, gbd_names)
-        gbd_new = filter_gbd_results(gbd, gbd_names)
-        
-        with PdfPages(f'./ltbi_cause_model_vv_in_{location}.pdf') as pdf:
-            for cause in causes:
-                for measure in measures:
-                    make_plots(cause, results_w_pt, gbd_new, location, measure)
-                    pdf.savefig(bbox_inches='tight')
-
+    # sim results
+    df = load_data(path)
+    pt = get_person_time(df)
+    results = append_cause_aggregates(get_disaggregated_results(df, cause_names))
+    results = pd.concat([results, get_hiv_other_from_sim(results)], ignore_index=True)
+    results_w_pt = pd.merge(results, pt, on=['sex', 'age_group', 'scenario', 'input_draw'])
+    results_w_pt = results_w_pt.loc[results_w_pt.scenario == 'baseline']
+    # gbd results, pulled once per location, cause and round and read from the local cache afterwards
+    gbd_results = gbd.get_gbd_results(location, gbd_names, provider=provider)
+    age_dict = get_age_dict(gbd_results)
+    gbd_new = filter_gbd_results(gbd_results, gbd_names)
+
+    with PdfPages(f'./ltbi_cause_model_vv_in_{location}.pdf') as pdf:
+        for cause in causes:
+            for measure in measures:
+                make_plots(cause, results_w_pt, gbd_new, location, measure, age_dict)
+                pdf.savefig(bbox_inches='tight')
+                plt.close('all')
+
+def _validate_location(args):
+    return validate_location(*args)
+
+def plot_multiple_locations(path_dict: dict, cause_names: list, gbd_names: list, processes: int = None,
+                            provider=None):
+    """validate every location on a process pool, with gbd results from ``provider`` where they are not cached"""
+    tasks = [(location, path, cause_names, gbd_names, provider) for location, path in path_dict.items()]
+    with multiprocessing.Pool(processes) as pool:
+        pool.map(_validate_location, tasks)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_csu_ltbi.results_processing import adherence
+
+GROUP_COLUMNS = ['location'] + adherence.INDEX_COLUMNS
+
+
+def baseline_summary(person_time, location):
+    """The adherence summary as computed with ``describe`` before the grouped pass."""
+    person_time = person_time.assign(location=location)
+    labels = {'all treatment': adherence.ALL_GROUPS, 'treated': adherence.TREATED_GROUPS,
+              'adherent': adherence.ADHERENT_GROUPS}
+    totals = {group: (person_time[person_time.treatment_group.isin(groups)]
+                      .groupby(GROUP_COLUMNS + ['draw']).value.sum())
+              for group, groups in labels.items()}
+    summaries = []
+    for subgroup in adherence.SUBGROUPS:
+        summary = ((totals['adherent'] / totals[subgroup])
+                   .groupby(GROUP_COLUMNS)
+                   .describe(percentiles=[.025, .975])
+                   .filter(['mean', '2.5%', '97.5%'])
+                   .reset_index())
+        summary['population_subgroup'] = subgroup
+        summaries.append(summary)
+    return pd.concat(summaries, ignore_index=True)
+
+
+@pytest.fixture
+def person_time():
+    index = pd.MultiIndex.from_product([['baseline'], ['all_population', 'plwhiv'], ['all_causes'], ['0_to_5'],
+                                        ['male'], [2020], range(10), adherence.ALL_GROUPS],
+                                       names=adherence.INDEX_COLUMNS + ['draw', 'treatment_group'])
+    data = pd.DataFrame({'value': np.random.RandomState(0).rand(len(index)) * 100}, index=index).reset_index()
+    # Nobody in the plwhiv group is treated in draws 0 to 3.
+    sparse = (data.risk_group == 'plwhiv') & (data.draw < 4) & data.treatment_group.isin(adherence.TREATED_GROUPS)
+    data.loc[sparse, 'value'] = 0.
+    return data
+
+
+def test_summary_matches_baseline(person_time):
+    result = adherence.summarize_adherence(person_time, 'peru')
+    expected = baseline_summary(person_time, 'peru')
+    key = GROUP_COLUMNS + ['population_subgroup']
+    result = result.set_index(key).sort_index()
+    expected = expected.set_index(key).sort_index()
+    pd.testing.assert_frame_equal(result[['mean', '2.5%', '97.5%']], expected[['mean', '2.5%', '97.5%']],
+                                  check_names=False)
+
+
+def test_sparse_group_has_interval(person_time):
+    result = adherence.summarize_adherence(person_time, 'peru')
+    sparse = result[(result.risk_group == 'plwhiv') & (result.population_subgroup == 'treated')]
+    assert len(sparse) == 1
+    assert sparse[['mean', '2.5%', '97.5%']].notnull().all(axis=None)
@@ -0,0 +1,48 @@
+import pytest
+import yaml
+from click.testing import CliRunner
+from vivarium.interface.interactive import InteractiveContext
+
+from vivarium_csu_ltbi.tools import benchmark
+
+
+@pytest.mark.parametrize('step_size', [1, 7, 9, 28])
+def test_time_steps_match_clock(step_size):
+    sim = InteractiveContext(components=[], configuration={
+        'time': {'start': {'year': 2020}, 'end': {'year': 2021, 'month': 2}, 'step_size': step_size}})
+    time_steps = 0
+    while sim._clock.time < sim._clock.stop_time:
+        sim.step()
+        time_steps += 1
+    assert benchmark.get_time_steps(sim.configuration) == time_steps
+
+
+def make_result(setup, peak_rss=100., population_size=1000):
+    phases = dict.fromkeys(benchmark.PHASES, 1.)
+    phases['setup'] = setup
+    return benchmark.BenchmarkResult(population_size, 7, 10, phases, peak_rss)
+
+
+def test_compare_to_baselines():
+    baselines = {make_result(1.).key: make_result(1.).to_dict()}
+    assert benchmark.compare_to_baselines([make_result(1.1)], baselines, tolerance=0.2) == []
+    regressions = benchmark.compare_to_baselines([make_result(1.5, peak_rss=200.)], baselines, tolerance=0.2)
+    assert len(regressions) == 2
+    assert benchmark.compare_to_baselines([make_result(5., population_size=10)], baselines, tolerance=0.2) == []
+
+
+def test_first_run_stores_baselines(tmp_path, monkeypatch):
+    results = [make_result(1.)]
+    monkeypatch.setattr(benchmark, 'run_benchmarks', lambda *args: results)
+    artifact = tmp_path / 'india.hdf'
+    artifact.touch()
+    baselines = tmp_path / 'baselines' / 'baselines.yaml'
+    arguments = ['-a', str(artifact), '-b', str(baselines)]
+
+    assert CliRunner().invoke(benchmark.benchmark_ltbi, arguments).exit_code == 0
+    assert yaml.full_load(baselines.read_text()) == {results[0].key: results[0].to_dict()}
+
+    results[:] = [make_result(2.)]
+    result = CliRunner().invoke(benchmark.benchmark_ltbi, arguments)
+    assert result.exit_code != 0
+    assert 'setup' in result.output
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi.tools import branching
+
+SCENARIOS = ['baseline', 'intervention', 'scale_up']
+MODEL_SPECIFICATION = """
+components:
+    test_branching:
+        - ScaleUp()
+configuration:
+    time:
+        start: {year: 2021, month: 1, day: 1}
+        end: {year: 2024, month: 1, day: 1}
+        step_size: 73
+    population:
+        population_size: 10
+    randomness:
+        key_columns: []
+"""
+
+
+class ScaleUp:
+    """Stands in for ``LTBITreatmentScaleUp``, recording the state each
+    scenario starts from."""
+
+    name = 'ltbi_treatment_scale_up'
+    configuration_defaults = {'ltbi_treatment_scale_up': {'scenario': 'baseline'}}
+
+    def setup(self, builder):
+        self.clock = builder.time.clock()
+        self.branch_time = pd.Timestamp('2022-01-01')
+        self.scenario = builder.configuration.ltbi_treatment_scale_up.scenario
+        self.branches = []
+        self.steps = 0
+        builder.event.register_listener('time_step', self.on_time_step)
+        builder.value.register_value_modifier('metrics', self.metrics)
+
+    def set_scenario(self, scenario):
+        self.scenario = scenario
+        self.branches.append((self.steps, self.clock()))
+
+    def on_time_step(self, event):
+        self.steps += 1
+
+    def metrics(self, index, metrics):
+        metrics['scenario_run'] = self.scenario
+        metrics['branches'] = list(self.branches)
+        metrics['steps'] = self.steps
+        return metrics
+
+
+@pytest.fixture
+def model_specification(tmp_path):
+    path = tmp_path / 'model_spec.yaml'
+    path.write_text(MODEL_SPECIFICATION)
+    return path
+
+
+def test_each_scenario_starts_from_branch_point(model_specification):
+    results = branching.run_branched_scenarios(model_specification, 0, 0, scenarios=SCENARIOS,
+                                               checkpoint_directory=None)
+
+    assert [row[ltbi_globals.SCENARIO_COLUMN] for row in results] == SCENARIOS
+    for row in results:
+        assert row['scenario_run'] == row[ltbi_globals.SCENARIO_COLUMN]
+        # Five 73 day steps reach the branch time at the start of 2022.
+        assert row['branches'] == [(5, pd.Timestamp('2022-01-01'))]
+        assert row['steps'] == 15
+
+
+def test_failed_scenario_raises(model_specification, monkeypatch):
+    set_scenario = ScaleUp.set_scenario
+
+    def fail_intervention(self, scenario):
+        if scenario == 'intervention':
+            raise ValueError('no intervention')
+        set_scenario(self, scenario)
+
+    monkeypatch.setattr(ScaleUp, 'set_scenario', fail_intervention)
+    with pytest.raises(RuntimeError, match='no intervention') as error:
+        branching.run_branched_scenarios(model_specification, 0, 0, scenarios=SCENARIOS)
+    assert 'intervention: Traceback' in str(error.value)
+    assert str(error.value).count('Traceback') == 1
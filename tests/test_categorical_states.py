@@ -0,0 +1,92 @@
+import warnings
+
+import pandas as pd
+import pytest
+from vivarium.interface.interactive import InteractiveContext
+
+from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi.components import CategoricalStates, PipelineCache
+from vivarium_csu_ltbi.components.cache import get_value
+from vivarium_csu_ltbi.components.categories import STATE_CATEGORIES, get_categorical_states
+
+EXPOSURE = f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure'
+
+
+def make_states(enabled):
+    states = CategoricalStates()
+    states.enabled = enabled
+    return states
+
+
+@pytest.mark.parametrize('name', list(STATE_CATEGORIES))
+def test_convert_keeps_values(name):
+    values = pd.Series(STATE_CATEGORIES[name] * 3, name=name)
+    converted = make_states(True).convert(values, name)
+    assert isinstance(converted.dtype, pd.CategoricalDtype)
+    assert list(converted.cat.categories) == list(STATE_CATEGORIES[name])
+    pd.testing.assert_series_equal(converted.astype(object), values.astype(object))
+    for state in STATE_CATEGORIES[name]:
+        pd.testing.assert_series_equal(converted == state, values == state)
+
+
+def test_disabled_returns_values():
+    values = pd.Series(ltbi_globals.HIV_TB_STATES, name=ltbi_globals.TUBERCULOSIS_AND_HIV)
+    assert make_states(False).convert(values, ltbi_globals.TUBERCULOSIS_AND_HIV) is values
+
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_initial_placeholder(enabled):
+    name = f'previous_{ltbi_globals.TUBERCULOSIS_AND_HIV}'
+    index = pd.Index(range(5))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        initial = make_states(enabled).initial('', index, name)
+    assert initial.index.equals(index)
+    assert initial.name == name
+    if enabled:
+        assert initial.isnull().all()
+    else:
+        assert (initial == '').all()
+
+
+class Exposure:
+
+    name = 'exposure'
+
+    def setup(self, builder):
+        categories = ltbi_globals.HOUSEHOLD_TUBERCULOSIS_EXPOSURE_CATEGORIES
+        builder.value.register_value_producer(
+            EXPOSURE, source=lambda index: pd.Series([categories[i % 2] for i in index], index=index))
+
+
+class Reader:
+
+    name = 'reader'
+
+    def setup(self, builder):
+        self.categorical_states = get_categorical_states(builder)
+        self.exposure = get_value(builder, EXPOSURE)
+        self.pipeline = builder.value.get_value(EXPOSURE)
+
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_cached_exposure_type(enabled):
+    reader = Reader()
+    sim = InteractiveContext(components=[CategoricalStates(), PipelineCache(), Exposure(), reader],
+                             configuration={'population': {'population_size': 20},
+                                            'randomness': {'key_columns': []},
+                                            'categorical_states': {'enabled': enabled}})
+    index = sim.get_population().index
+    values, expected = reader.exposure(index), reader.pipeline(index)
+    assert isinstance(values.dtype, pd.CategoricalDtype) == enabled
+    pd.testing.assert_series_equal(values.astype(object), expected.astype(object))
+
+
+def test_missing_component_leaves_values_unchanged():
+    reader = Reader()
+    sim = InteractiveContext(components=[PipelineCache(), Exposure(), reader],
+                             configuration={'population': {'population_size': 20},
+                                            'randomness': {'key_columns': []}})
+    assert not reader.categorical_states.enabled
+    index = sim.get_population().index
+    pd.testing.assert_series_equal(reader.exposure(index), reader.pipeline(index))
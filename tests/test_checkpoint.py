@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+from vivarium.interface.interactive import InteractiveContext
+
+from vivarium_csu_ltbi.tools import checkpoint
+
+CONFIGURATION = {'population': {'population_size': 20}, 'randomness': {'key_columns': []}}
+
+
+class StepCounter:
+    """Counts time steps in component state that checkpoints must carry."""
+
+    def __init__(self, name='step_counter'):
+        self._name = name
+
+    @property
+    def name(self):
+        return self._name
+
+    def setup(self, builder):
+        self.steps = 0
+        builder.event.register_listener('time_step', self.on_time_step)
+
+    def on_time_step(self, event):
+        self.steps += 1
+
+    def get_checkpoint_state(self):
+        return {'steps': self.steps}
+
+    def set_checkpoint_state(self, state):
+        self.steps = state['steps']
+
+
+def make_simulation(*components):
+    return InteractiveContext(components=list(components) or [StepCounter()], configuration=CONFIGURATION)
+
+
+def test_save_and_restore(tmp_path):
+    sim = make_simulation()
+    checkpointer = checkpoint.Checkpointer(tmp_path, interval=2)
+    for _ in range(4):
+        checkpointer.step(sim)
+    assert len(checkpointer.checkpoints) == 2
+
+    counter = StepCounter()
+    restored = make_simulation(counter)
+    restored_checkpointer = checkpoint.Checkpointer(tmp_path, interval=2)
+    assert restored_checkpointer.restore(restored) == sim._clock.time
+    assert restored._clock.time == sim._clock.time
+    assert restored_checkpointer.step_count == 4
+    assert counter.steps == 4
+    pd.testing.assert_frame_equal(restored.get_population(), sim.get_population())
+
+    restored_checkpointer.step(restored)
+    sim.step()
+    assert restored._clock.time == sim._clock.time
+
+
+def test_restore_without_checkpoint(tmp_path):
+    assert checkpoint.Checkpointer(tmp_path, interval=1).restore(make_simulation()) is None
+
+
+def test_missing_component_state(tmp_path):
+    checkpointer = checkpoint.Checkpointer(tmp_path, interval=1)
+    checkpointer.step(make_simulation())
+
+    other = make_simulation(StepCounter(), StepCounter('other_counter'))
+    with pytest.raises(ValueError, match='other_counter'):
+        checkpoint.Checkpointer(tmp_path, interval=1).restore(other)
+
+
+def test_other_vivarium_version():
+    sim = make_simulation()
+    state = checkpoint.get_simulation_state(sim)
+    state['vivarium_version'] = '0.8.0'
+    with pytest.raises(RuntimeError, match='0.8.0'):
+        checkpoint.set_simulation_state(sim, state)
@@ -0,0 +1,76 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+from vivarium.framework.utilities import rate_to_probability
+from vivarium_public_health.disease import RateTransition
+
+from vivarium_csu_ltbi.components.disease import BetterRateTransition, TuberculosisAndHIV
+
+STEP = pd.Timedelta(days=7)
+INDEX = pd.RangeIndex(20)
+
+
+@pytest.fixture
+def model():
+    """The TB/HIV model with its rate transitions stubbed with constant
+    per-step rates, and transition recording what each rate transition
+    gives at every evaluation."""
+    model = TuberculosisAndHIV()
+    model.step_size_getter = lambda: STEP
+    model.steps_since_transition = 0
+    model.evaluations = []
+
+    transitions = [transition for state in model.states for transition in state.transition_set.transitions
+                   if isinstance(transition, BetterRateTransition)]
+    rates = np.random.RandomState(0).uniform(0.001, 0.05, size=(len(transitions), len(INDEX)))
+    for transition, rate in zip(transitions, rates):
+        transition.disease_model = model
+        transition.transition_rate = lambda index, rate=rate: pd.Series(rate, index=INDEX).loc[index]
+
+    def transition(index, event_time):
+        model.evaluations.append((event_time, model.steps_since_transition,
+                                  [(t, t._probability(index)) for t in transitions]))
+
+    model.transition = transition
+    return model
+
+
+def run_steps(model, start, steps):
+    for time in pd.date_range(start, periods=steps, freq=STEP):
+        model.on_time_step(types.SimpleNamespace(index=INDEX, time=time))
+
+
+def test_interval_one_matches_single_step_transitions(model):
+    model.transition_interval = 1
+    run_steps(model, '2020-12-11', 6)
+
+    assert len(model.evaluations) == 6
+    for _, steps, probabilities in model.evaluations:
+        assert steps == 1
+        for transition, probability in probabilities:
+            pd.testing.assert_series_equal(probability, RateTransition._probability(transition, INDEX),
+                                           check_exact=True)
+
+
+def test_window_closes_at_last_step_of_year(model):
+    model.transition_interval = 4
+    run_steps(model, '2020-11-13', 12)
+
+    # Windows of four steps, except that December 25th is the last step of
+    # 2020 and closes a window of three.
+    assert [(time, steps) for time, steps, _ in model.evaluations] == [
+        (pd.Timestamp('2020-12-04'), 4), (pd.Timestamp('2020-12-25'), 3), (pd.Timestamp('2021-01-22'), 4)
+    ]
+    assert model.steps_since_transition == 1
+
+
+def test_window_probability_covers_its_steps(model):
+    model.transition_interval = 4
+    run_steps(model, '2020-11-13', 12)
+
+    for _, steps, probabilities in model.evaluations:
+        for transition, probability in probabilities:
+            single_step = rate_to_probability(transition.transition_rate(INDEX))
+            np.testing.assert_allclose(probability, 1 - (1 - single_step) ** steps)
@@ -0,0 +1,143 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_csu_ltbi.components.categories import CategoricalStates
+from vivarium_csu_ltbi.components.exposure import DAYS_PER_YEAR, DynamicHouseholdTuberculosisExposure
+
+PREVALENCE = 0.3
+START = pd.Timestamp('2020-01-01')
+STEP = pd.Timedelta(days=7)
+
+
+class PopulationView:
+    """Holds the population state in a data frame in place of vivarium's
+    population manager."""
+
+    def __init__(self):
+        self.data = pd.DataFrame(columns=['alive'])
+
+    def add(self, index):
+        added = pd.DataFrame({'alive': 'alive'}, index=index)
+        self.data = pd.concat([self.data, added]) if len(self.data) else added
+
+    def get(self, index, query=''):
+        population = self.data.loc[index]
+        return population.query(query) if query else population
+
+    def subview(self, columns):
+        return self
+
+    def update(self, update):
+        for column in update:
+            if column not in self.data:
+                self.data[column] = update[column]
+            else:
+                self.data.loc[update.index, column] = update[column].values
+
+
+class RandomnessStream:
+
+    def __init__(self, seed):
+        self.random = np.random.RandomState(seed)
+
+    def get_draw(self, index, additional_key=None):
+        return pd.Series(self.random.uniform(size=len(index)), index=index)
+
+
+class Exposure(DynamicHouseholdTuberculosisExposure):
+    """The component wired as ``setup`` would, with a constant prevalence."""
+
+    def __init__(self, remission_rate=2.0, maximum_wait=1.0, seed=0):
+        self.remission_rate = remission_rate
+        self.maximum_wait = maximum_wait
+        self.time = START
+        self.clock = lambda: self.time
+        self.categorical_states = CategoricalStates()
+        self.prevalence = lambda index: pd.Series(PREVALENCE, index=index)
+        self.randomness = RandomnessStream(seed)
+        self.exposure_column = 'household_tuberculosis_exposure'
+        self.next_change_column = 'household_tuberculosis_next_change'
+        self.changes_column = 'household_tuberculosis_changes'
+        self.population_view = PopulationView()
+        self._times = np.array([], dtype='datetime64[ns]')
+        self._simulants = np.array([], dtype=np.int64)
+
+    def add_simulants(self, index):
+        self.population_view.add(index)
+        self.on_initialize_simulants(types.SimpleNamespace(index=index))
+
+    def step(self):
+        self.time += STEP
+        self.on_time_step_prepare(types.SimpleNamespace(time=self.time))
+
+    @property
+    def exposed(self):
+        return (self.population_view.data[self.exposure_column] == 'cat1').mean()
+
+
+def assert_schedule_matches_population(exposure):
+    assert np.all(np.diff(exposure._times) >= np.timedelta64(0))
+    population = exposure.population_view.data
+    assert sorted(exposure._simulants) == sorted(population.index)
+    scheduled = pd.Series(exposure._times, index=exposure._simulants)
+    pd.testing.assert_series_equal(scheduled.loc[population.index],
+                                   population[exposure.next_change_column].astype(scheduled.dtype),
+                                   check_names=False)
+
+
+def test_prevalence_stays_at_equilibrium():
+    exposure = Exposure()
+    exposure.add_simulants(pd.RangeIndex(10_000))
+    initial_exposure = exposure.population_view.data[exposure.exposure_column].copy()
+    prevalence = [exposure.exposed]
+    for _ in range(3 * 52):
+        exposure.step()
+        prevalence.append(exposure.exposed)
+
+    assert np.abs(np.array(prevalence) - PREVALENCE).max() < 0.03
+    assert np.mean(prevalence) == pytest.approx(PREVALENCE, abs=0.01)
+    # Exposure turns over rather than staying fixed for life. After three
+    # years, exposure is close to independent of the initial exposure.
+    changed = exposure.population_view.data[exposure.exposure_column] != initial_exposure
+    assert changed.mean() == pytest.approx(2 * PREVALENCE * (1 - PREVALENCE), abs=0.03)
+
+
+def test_new_simulants_are_inserted_in_order():
+    exposure = Exposure()
+    exposure.add_simulants(pd.RangeIndex(500))
+    for added in range(5):
+        exposure.step()
+        exposure.add_simulants(pd.RangeIndex(500 + 100 * added, 600 + 100 * added))
+        assert_schedule_matches_population(exposure)
+
+
+def test_schedule_keeps_ties_in_arrival_order():
+    exposure = Exposure()
+    times = (START + pd.to_timedelta([3, 1, 2], unit='D')).values
+    exposure.schedule(np.array([0, 1, 2]), times)
+    exposure.schedule(np.array([3, 4]), (START + pd.to_timedelta([2, 0], unit='D')).values)
+
+    assert list(exposure._simulants) == [4, 1, 2, 3, 0]
+    assert list(exposure._times) == list((START + pd.to_timedelta([0, 1, 2, 2, 3], unit='D')).values)
+
+
+def test_long_waits_are_resampled():
+    # With an expected wait of a thousand years, every wait exceeds the maximum.
+    exposure = Exposure(remission_rate=1e-3, maximum_wait=0.25)
+    exposure.add_simulants(pd.RangeIndex(200))
+    population = exposure.population_view.data
+    initial_exposure = population[exposure.exposure_column].copy()
+    resample_time = START + pd.Timedelta(days=0.25 * DAYS_PER_YEAR)
+
+    assert not population[exposure.changes_column].any()
+    assert (population[exposure.next_change_column] == resample_time).all()
+
+    while exposure.time < resample_time:
+        exposure.step()
+    population = exposure.population_view.data
+    pd.testing.assert_series_equal(population[exposure.exposure_column], initial_exposure)
+    assert (population[exposure.next_change_column] == exposure.time + pd.Timedelta(days=0.25 * DAYS_PER_YEAR)).all()
+    assert_schedule_matches_population(exposure)
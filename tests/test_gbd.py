@@ -0,0 +1,68 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import vivarium_csu_ltbi.paths as ltbi_paths
+from vivarium_csu_ltbi.verification_and_validation import gbd
+
+CAUSES = ['all_causes', 'tuberculosis', 'hiv_aids']
+
+
+class CountingProvider:
+    """Serves synthetic GBD outputs and records every request."""
+
+    def __init__(self):
+        self.requests = []
+
+    def get_cause_outputs(self, location, cause_names, gbd_round_id):
+        self.requests.append((location, list(cause_names), gbd_round_id))
+        rows = list(itertools.product(cause_names, [2, 3, 30], ['death', 'ylls'], ['Male', 'Female', 'Both']))
+        data = pd.DataFrame(rows, columns=['cause', 'age_group_id', 'measure', 'sex'])
+        data['age_group'] = data.age_group_id.map({2: 'early_neonatal', 3: 'late_neonatal', 30: '80_to_84'})
+        values = np.random.RandomState(gbd_round_id).rand(len(data)) * 100
+        data['val'], data['upper'], data['lower'] = values, values * 1.1, values * .9
+        return data[gbd.GBD_COLUMNS].sample(frac=1, random_state=0)
+
+
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(ltbi_paths, 'GBD_COMPARISON_ROOT', tmp_path / 'gbd_comparison')
+
+
+def sort(data):
+    return data[gbd.GBD_COLUMNS].sort_values(['cause', 'sex', 'measure', 'age_group_id']).reset_index(drop=True)
+
+
+def test_results_match_provider():
+    provider = CountingProvider()
+    result = gbd.get_gbd_results('Peru', CAUSES, provider=provider)
+    # The uncached pull sorted the provider output by cause, sex and measure.
+    expected = provider.get_cause_outputs('Peru', CAUSES, gbd.GBD_ROUND_ID)
+    expected = expected.set_index(['cause', 'sex', 'measure']).sort_index().reset_index()
+    assert list(result.columns) == list(expected.columns)
+    assert result.set_index(['cause', 'sex', 'measure']).index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(sort(result), sort(expected))
+
+
+def test_cached_causes_are_not_pulled_again():
+    provider = CountingProvider()
+    first = gbd.get_gbd_results('Peru', CAUSES[:2], provider=provider)
+    pd.testing.assert_frame_equal(gbd.get_gbd_results('Peru', CAUSES[:2], provider=provider), first)
+    gbd.get_gbd_results('Peru', CAUSES, provider=provider)
+    gbd.get_gbd_results('Peru', CAUSES, gbd_round_id=6, provider=provider)
+    assert provider.requests == [('Peru', CAUSES[:2], 5), ('Peru', CAUSES[2:], 5), ('Peru', CAUSES, 6)]
+
+
+def test_file_provider(tmp_path):
+    data = pd.concat([CountingProvider().get_cause_outputs('Peru', CAUSES, 5).assign(location='Peru'),
+                      CountingProvider().get_cause_outputs('India', CAUSES, 5).assign(location='India')])
+    data.to_csv(tmp_path / 'gbd.csv', index=False)
+    provider = gbd.FileGBDProvider(tmp_path / 'gbd.csv')
+
+    result = gbd.get_gbd_results('Peru', CAUSES[1:], provider=provider)
+    expected = data[(data.location == 'Peru') & data.cause.isin(CAUSES[1:])][gbd.GBD_COLUMNS]
+    pd.testing.assert_frame_equal(sort(result), sort(expected), check_dtype=False)
+    with pytest.raises(ValueError, match='malaria'):
+        gbd.get_gbd_results('Peru', ['malaria'], provider=provider)
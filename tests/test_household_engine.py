@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from vivarium.interpolation import Interpolation
+
+from vivarium_csu_ltbi.data import household_engine
+
+AGE_BINS = [0, 1] + list(range(5, 96, 5)) + [125]
+DRAWS = [0, 3, 7]
+
+
+@pytest.fixture
+def microdata():
+    random = np.random.RandomState(0)
+    sizes = random.randint(1, 6, size=40)
+    return pd.DataFrame({
+        'hh_id': np.repeat([f'household_{i}' for i in range(len(sizes))], sizes),
+        'age': random.uniform(0, 100, size=sizes.sum()).round(),
+        'sex': np.array(household_engine.SEXES)[random.randint(2, size=sizes.sum())],
+    })
+
+
+@pytest.fixture
+def probabilities():
+    index = pd.MultiIndex.from_product([household_engine.SEXES, range(len(AGE_BINS) - 1), DRAWS],
+                                       names=['sex', 'age_group', 'draw'])
+    data = index.to_frame(index=False)
+    data['age_group_start'] = np.array(AGE_BINS[:-1])[data.age_group]
+    data['age_group_end'] = np.array(AGE_BINS[1:])[data.age_group]
+    data['value'] = np.random.RandomState(1).uniform(0.001, 0.05, size=len(data))
+    return data.drop(columns='age_group')
+
+
+def interpolate(probabilities, people, draw):
+    """Case probabilities from an order 0 ``Interpolation``, as looked up
+    before ``BinLookup``."""
+    interpolation = Interpolation(probabilities[probabilities.draw == draw].drop(columns='draw'),
+                                  categorical_parameters=['sex'],
+                                  continuous_parameters=[['age', 'age_group_start', 'age_group_end']],
+                                  order=0, extrapolate=True)
+    return interpolation(people).value.values
+
+
+def baseline_contact(data, probabilities, draw):
+    """Household contact of one draw from the per-household ``groupby`` of
+    the GBD 2019 models before the shared engine."""
+    data = data.assign(pr_actb=interpolate(probabilities, data, draw))
+    no_case = (1 - data.pr_actb).groupby(data.hh_id).prod()
+    result = []
+    for start, end in zip(AGE_BINS[:-1], AGE_BINS[1:]):
+        for sex in household_engine.SEXES:
+            households = data.query(f'age >= {start} and age < {end} and sex == "{sex}"').hh_id.unique()
+            case = probabilities.query(f'draw == {draw} and age_group_start == {start} and sex == "{sex}"').value
+            result.append({'sex': sex, 'age_group_start': start, 'draw': draw,
+                           'value': 1 - no_case.loc[households].mean() / (1 - case.iloc[0])})
+    return pd.DataFrame(result)
+
+
+def test_bin_lookup_matches_interpolation(probabilities):
+    people = pd.DataFrame({'age': [0., 0.5, 1., 4.9, 5., 37., 94.9, 95., 110., 130.],
+                           'sex': ['Male', 'Female'] * 5})
+    lookup = household_engine.BinLookup(probabilities)
+    bins = lookup.get_bins(people.age.values, people.sex)
+    for draw in DRAWS:
+        np.testing.assert_allclose(lookup(bins, draw), interpolate(probabilities, people, draw))
+
+
+def test_bin_lookup_missing_values(probabilities):
+    with pytest.raises(ValueError):
+        household_engine.BinLookup(probabilities.iloc[1:])
+
+
+def test_contact_matches_groupby(microdata, probabilities):
+    compact = household_engine.compact_household_data(microdata)
+    result = household_engine.estimate_household_contact(compact, probabilities, DRAWS,
+                                                         random_state=np.random.RandomState(2))
+
+    # Resampled duplicates count as separate households, so the baseline
+    # runs on a copy of each household per time it was drawn.
+    bootstrap_counts = np.random.RandomState(2).multinomial(
+        compact.household_count, np.full(compact.household_count, 1 / compact.household_count), size=len(DRAWS))
+    household_ids = pd.factorize(microdata.hh_id)[1]
+    expected = []
+    for draw, counts in zip(DRAWS, bootstrap_counts):
+        sample = pd.concat([microdata[microdata.hh_id == household].assign(hh_id=f'{household}_{copy}')
+                            for household, count in zip(household_ids, counts) for copy in range(count)])
+        expected.append(baseline_contact(sample, probabilities, draw))
+    expected = pd.concat(expected).set_index(['draw', 'sex', 'age_group_start']).value.sort_index()
+
+    result = result.set_index(['draw', 'sex', 'age_group_start']).value.sort_index()
+    pd.testing.assert_series_equal(result, expected, check_index_type=False)
+    assert result.notnull().sum() > len(result) / 2
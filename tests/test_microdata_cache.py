@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_csu_ltbi.data import microdata_cache
+
+
+def clean_string_ids(df):
+    """Cleans like the China, Russian_Federation and South_Africa surveys,
+    whose household ids are left as strings."""
+    df = df.dropna()
+    df['age'] = df['age'].replace({'Less than 1 year': '0', '100+': '100'})
+    df['sex'] = df['sex'].str.capitalize()
+    df['age'] = df['age'].astype(float)
+    return df
+
+
+def clean_numeric_ids(df):
+    """Cleans like the other surveys, whose household ids are joined into integers."""
+    df = df.dropna()
+    df['hh_id'] = df['hh_id'].str.split().map(lambda x: int(''.join(x)))
+    df['age'] = df['age'].replace({'95+': 95})
+    df['sex'] = df['sex'].str.capitalize()
+    df['age'] = df['age'].astype(float)
+    return df
+
+
+def make_survey(path, household_ids):
+    random = np.random.RandomState(0)
+    size = 60
+    data = pd.DataFrame({
+        'hh_id': np.array(household_ids)[random.randint(len(household_ids), size=size)],
+        'age': random.randint(0, 90, size=size).astype(str),
+        'sex': np.array(['male', 'female'])[random.randint(2, size=size)],
+    })
+    data.loc[0, 'age'] = 'Less than 1 year' if 'CHN' in household_ids[0] else '95+'
+    data.to_stata(str(path), write_index=False)
+    return path
+
+
+def get_households(data):
+    """The sorted ages of each household, independent of how the households are labelled."""
+    ages = data.assign(age=data.age.astype(float)).sort_values('age').groupby('hh_id', sort=False).age
+    return sorted(tuple(household) for _, household in ages)
+
+
+@pytest.mark.parametrize('household_ids, clean', [
+    (['CHN-001', 'CHN-002', 'CHN-017', 'CHN-100'], clean_string_ids),
+    (['1 01', '1 02', '2 17', '10 0'], clean_numeric_ids),
+])
+def test_cache_keeps_households(tmp_path, household_ids, clean):
+    source = make_survey(tmp_path / 'survey.dta', household_ids)
+    expected = clean(pd.read_stata(str(source)))
+
+    result = microdata_cache.load_microdata(source, clean, 'somewhere', 'test', cache_root=tmp_path / 'cache')
+    assert result.hh_id.dtype == np.int64
+    assert len(result) == len(expected)
+    assert get_households(result) == get_households(expected)
+    assert list(result.sex) == list(expected.sex)
+    assert (result.location == 'somewhere').all()
+
+
+def test_cache_is_reused(tmp_path):
+    source = make_survey(tmp_path / 'survey.dta', ['CHN-001', 'CHN-002'])
+    calls = []
+
+    def clean(df):
+        calls.append(1)
+        return clean_string_ids(df)
+
+    first = microdata_cache.load_microdata(source, clean, 'somewhere', 'test', cache_root=tmp_path / 'cache')
+    second = microdata_cache.load_microdata(source, clean, 'somewhere', 'test', cache_root=tmp_path / 'cache')
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_missing_household_ids_dropped(tmp_path):
+    data = pd.DataFrame({'hh_id': ['a', None, 'b', 'a'], 'age': [1., 2., 3., 4.], 'sex': ['Male'] * 4})
+    microdata_cache.write_microdata(data, tmp_path / 'entry', 'somewhere', tmp_path / 'survey.dta')
+    result = microdata_cache.read_microdata(tmp_path / 'entry')
+    assert list(result.hh_id) == [0, 1, 0]
+    assert list(result.age) == [1., 3., 4.]
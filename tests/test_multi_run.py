@@ -0,0 +1,107 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_csu_ltbi.results_processing import multi_run
+
+DRAW, SCENARIO = multi_run.DRAW_COLUMN, multi_run.SCENARIO_COLUMN
+MEASURE_PATTERNS = {'incidence': '^ltbi.*activetb', 'death': 'death_due_to_activetb',
+                    'DALYs': 'ylds_due_to_activetb|ylls_due_to_activetb'}
+AGE_GROUPS = ['early_neonatal_', 'post_neonatal_', '1_to_4', '5_to_9']
+SUFFIX = '_in_{year}_among_male_in_age_group_{age}_{hh}_to_hhtb'
+
+
+def get_columns(years):
+    columns = []
+    for year, age, hh, hiv in itertools.product(years, AGE_GROUPS, ['exposed', 'unexposed'], ['positive', 'negative']):
+        suffix = SUFFIX.format(year=year, age=age, hh=hh)
+        columns += [f'ltbi_susceptible_hiv_to_activetb_{hiv}_hiv_event_count{suffix}',
+                    f'death_due_to_activetb_{hiv}_hiv{suffix}',
+                    f'ylls_due_to_activetb_{hiv}_hiv{suffix}',
+                    f'ylds_due_to_activetb_{hiv}_hiv{suffix}',
+                    f'activetb_{hiv}_hiv_person_time{suffix}']
+    return columns
+
+
+def make_output(seed, years):
+    rows = pd.DataFrame(list(itertools.product(range(4), [0, 1], ['baseline', '6H_scale_up', '3HP_scale_up'])),
+                        columns=[DRAW, 'random_seed', SCENARIO])
+    columns = get_columns(years)
+    values = np.random.RandomState(seed).poisson(3, (len(rows), len(columns))).astype(float)
+    return pd.concat([rows, pd.DataFrame(values, columns=columns)], axis=1).set_index([DRAW, 'random_seed', SCENARIO])
+
+
+@pytest.fixture
+def runs(tmp_path):
+    runs = {}
+    for run, seed, years in [('end_100', 0, ['2020', '2021', '2025']), ('end_10', 1, ['2020', '2021'])]:
+        runs[run] = {}
+        for location in ['peru', 'india']:
+            path = tmp_path / f'{run}_{location}.hdf'
+            make_output(seed + len(location), years).to_hdf(str(path), key='data')
+            runs[run][location] = path
+    return runs
+
+
+def baseline_merge(paths):
+    """Combines two runs of a location like ``mergeCountry`` and
+    ``clean_aggregate`` did."""
+    first, second = [pd.read_hdf(str(path)) for path in paths]
+    data = first.add(second, fill_value=0).groupby([DRAW, SCENARIO]).sum()
+    return data.drop(columns=list(data.filter(regex='person_time')))
+
+
+def baseline_averted(data, pattern, people):
+    """Percent averted of one measure and subgroup as computed from the
+    stacked columns before the mask product."""
+    long = data.filter(regex=pattern).stack().rename('value').reset_index()
+    information = long.iloc[:, 2]
+    for attribute, column_pattern in multi_run.COLUMN_PATTERNS.items():
+        long[attribute] = information.str.extract(column_pattern, expand=False)
+    in_years = long.year.isin(multi_run.YEARS)
+    if people == 'U5_hh':
+        long = long[long.age_group.isin(multi_run.UNDER_FIVE) & (long.hh_status == 'exposed') & in_years]
+    else:
+        long = long[(long.hiv_status == 'positive') & in_years]
+    totals = long.groupby([DRAW, SCENARIO]).value.sum().unstack(SCENARIO)
+    summaries = {}
+    for scenario, scale_up in multi_run.AVERTED.items():
+        averted = ((totals['baseline'] - totals[scale_up]) * 100 / totals['baseline']).fillna(0)
+        summaries[scenario] = (averted.mean(), np.percentile(averted, 2.5), np.percentile(averted, 97.5))
+    return summaries
+
+
+def test_load_runs_matches_merge(runs):
+    data = multi_run.load_runs(multi_run.get_paths_by_location(runs))
+    for location in ['peru', 'india']:
+        expected = baseline_merge([runs['end_100'][location], runs['end_10'][location]])
+        pd.testing.assert_frame_equal(data.loc[location].reindex(columns=expected.columns), expected,
+                                      check_names=False)
+
+
+def test_summarize_averted_matches_baseline(runs):
+    paths = multi_run.get_paths_by_location(runs)
+    data = multi_run.load_runs(paths)
+    summary = multi_run.summarize_averted(data, MEASURE_PATTERNS)
+    assert len(summary) == 2 * len(MEASURE_PATTERNS) * 2 * len(multi_run.AVERTED)
+
+    summary = summary.set_index(['country', 'measure', 'people', 'scenario'])
+    for location, (measure, pattern), people in itertools.product(['peru', 'india'], MEASURE_PATTERNS.items(),
+                                                                  ['U5_hh', 'PLWHIV']):
+        merged = baseline_merge(paths[location])
+        for scenario, expected in baseline_averted(merged, pattern, people).items():
+            result = summary.loc[(location, measure, people, scenario), ['mean', 'lower', 'upper']]
+            np.testing.assert_allclose(result.values.astype(float), expected)
+
+
+def test_under_five_household_exposure(runs):
+    data = multi_run.load_runs(multi_run.get_paths_by_location(runs))
+    result = multi_run.get_under_five_household_exposure(data)
+    for location in ['peru', 'india']:
+        location_data = data.loc[location].filter(like='hhtb')
+        attributes = multi_run.parse_columns(location_data.columns)
+        under_five = location_data.loc[:, attributes.age_group.isin(multi_run.UNDER_FIVE).values]
+        exposed = under_five.filter(like='_exposed_to_hhtb')
+        assert result[location] == pytest.approx(exposed.values.sum() / under_five.values.sum())
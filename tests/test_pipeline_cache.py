@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+from vivarium.interface.interactive import InteractiveContext
+
+from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi.components import CategoricalStates, PipelineCache
+from vivarium_csu_ltbi.components.cache import CachedPipeline, get_value
+
+EXPOSURE = f'{ltbi_globals.HOUSEHOLD_TUBERCULOSIS}.exposure'
+CONFIGURATION = {'population': {'population_size': 50}, 'randomness': {'key_columns': []}}
+
+
+class Exposure:
+    """Produces an exposure that changes every time step and counts how
+    often it is computed."""
+
+    name = 'exposure'
+
+    def setup(self, builder):
+        self.clock = builder.time.clock()
+        self.calls = 0
+        builder.value.register_value_producer(EXPOSURE, source=self.get_exposure)
+
+    def get_exposure(self, index):
+        self.calls += 1
+        categories = ltbi_globals.HOUSEHOLD_TUBERCULOSIS_EXPOSURE_CATEGORIES
+        return pd.Series([categories[(i + self.clock().day) % 2] for i in index], index=index)
+
+
+class Reader:
+
+    def __init__(self, name):
+        self._name = name
+
+    @property
+    def name(self):
+        return self._name
+
+    def setup(self, builder):
+        self.exposure = get_value(builder, EXPOSURE)
+        self.pipeline = builder.value.get_value(EXPOSURE)
+        self.values = []
+        builder.event.register_listener('time_step', self.on_time_step)
+
+    def on_time_step(self, event):
+        self.values.append((self.exposure(event.index), self.pipeline(event.index)))
+
+
+@pytest.mark.parametrize('cached', [True, False])
+def test_readers_match_pipeline(cached):
+    exposure, readers = Exposure(), [Reader('first_reader'), Reader('second_reader')]
+    components = [exposure] + readers + ([CategoricalStates(), PipelineCache()] if cached else [])
+    sim = InteractiveContext(components=components, configuration=CONFIGURATION)
+    sim.take_steps(3)
+
+    for reader in readers:
+        assert len(reader.values) == 3
+        for values, expected in reader.values:
+            pd.testing.assert_series_equal(values, expected)
+    # Each step the readers' direct pipeline calls compute the exposure, and
+    # without a cache so do their cached ones.
+    assert exposure.calls - 2 * 3 == (3 if cached else 2 * 3)
+
+
+def test_cached_pipeline_extends_to_new_simulants():
+    time = [0]
+    calls = []
+
+    def pipeline(index):
+        calls.append(index)
+        return pd.Series(index * 10 + time[0], index=index)
+
+    cached = CachedPipeline(pipeline, lambda: time[0])
+    everyone, some, others = pd.Index(range(10)), pd.Index([2, 3]), pd.Index([3, 12, 11])
+    pd.testing.assert_series_equal(cached(everyone), pipeline(everyone))
+    pd.testing.assert_series_equal(cached(some), pipeline(some))
+    pd.testing.assert_series_equal(cached(others), pipeline(others))
+    assert len(calls) == 5  # three direct calls, the first read and the new simulants
+
+    time[0] = 1
+    pd.testing.assert_series_equal(cached(some), pipeline(some))
+    cached.invalidate()
+    pd.testing.assert_series_equal(cached(everyone), pipeline(everyone))
+
+
+@pytest.mark.parametrize('subset', [False, True])
+def test_reader_changes_do_not_leak(subset):
+    index = pd.Index(range(10))
+    cached = CachedPipeline(lambda i: pd.Series(i * 10., index=i, name='value'), lambda: 0)
+    first = cached(index[:5] if subset else index)
+    first.loc[first.index[0]] = -1.
+    first.name = 'changed'
+    first.update(pd.Series(-2., index=first.index[1:2]))
+    second = cached(index[:5] if subset else index)
+    pd.testing.assert_series_equal(second, pd.Series(second.index * 10., index=second.index, name='value'))
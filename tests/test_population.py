@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+import pytest
+
+import vivarium_csu_ltbi.paths as ltbi_paths
+from vivarium_csu_ltbi.results_processing import population
+
+
+@pytest.fixture(autouse=True)
+def snapshot_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(ltbi_paths, 'POPULATION_ARTIFACT_ROOT', tmp_path / 'snapshots')
+    monkeypatch.setattr(population, '_SNAPSHOTS', {})
+
+
+def write_population(path, value):
+    ages = [age for ages in population.AGE_AGGREGATES.values() for age in ages]
+    data = pd.DataFrame([{'location': 'peru', 'age': age, 'sex': sex, 'population': value}
+                         for age in ages for sex in ['male', 'female']])
+    data.to_csv(path, index=False)
+
+
+def get_total(snapshot):
+    return snapshot.loc[(snapshot.age == 'all') & (snapshot.sex == 'all'), 'population'].iloc[0]
+
+
+def test_aggregate_population(tmp_path):
+    write_population(tmp_path / 'population.csv', 1.)
+    snapshot = population.get_population_snapshot('peru', provider=population.FilePopulationProvider(
+        tmp_path / 'population.csv'))
+    assert get_total(snapshot) == 2 * 23
+    under_five = snapshot.loc[(snapshot.age == '0_to_5') & (snapshot.sex == 'male'), 'population'].iloc[0]
+    assert under_five == 4
+
+
+def test_snapshot_follows_population_file(tmp_path):
+    write_population(tmp_path / 'one.csv', 1.)
+    write_population(tmp_path / 'two.csv', 2.)
+    one = population.FilePopulationProvider(tmp_path / 'one.csv')
+    two = population.FilePopulationProvider(tmp_path / 'two.csv')
+
+    assert get_total(population.get_population_snapshot('peru', provider=one)) == 2 * 23
+    assert get_total(population.get_population_snapshot('peru', provider=two)) == 4 * 23
+    assert get_total(population.get_population_snapshot('peru', provider=one)) == 2 * 23
+
+
+def test_snapshot_rebuilt_after_file_changes(tmp_path):
+    path = tmp_path / 'population.csv'
+    write_population(path, 1.)
+    provider = population.FilePopulationProvider(path)
+    assert get_total(population.get_population_snapshot('peru', provider=provider)) == 2 * 23
+
+    write_population(path, 3.)
+    stat = path.stat()
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert get_total(population.get_population_snapshot('peru', provider=provider)) == 6 * 23
+
+
+def test_snapshot_read_from_disk(tmp_path):
+    write_population(tmp_path / 'population.csv', 1.)
+    provider = population.FilePopulationProvider(tmp_path / 'population.csv')
+    expected = population.get_population_snapshot('peru', provider=provider)
+
+    population._SNAPSHOTS.clear()
+    pd.testing.assert_frame_equal(population.get_population_snapshot('peru', provider=provider), expected)
@@ -0,0 +1,65 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_csu_ltbi.results_processing import storage
+
+
+@pytest.fixture
+def table():
+    index = pd.MultiIndex.from_product([['baseline', '3HP_scale_up'], [2020, 2021], ['peru'],
+                                        ['exposed_to_hhtb', 'unexposed_to_hhtb'], range(3)],
+                                       names=['scenario', 'year', 'location', 'risk_group', 'input_draw'])
+    data = pd.DataFrame({'value': np.random.RandomState(0).rand(len(index))}, index=index).reset_index()
+    data['measure'] = 'person_time'
+    return data
+
+
+def test_round_trip(tmp_path, table):
+    path = tmp_path / 'table.hdf'
+    storage.write_table(table, path)
+    result = storage.read_table(path)
+    assert result.dtypes.to_dict() == table.dtypes.to_dict()
+    pd.testing.assert_frame_equal(result, table)
+
+
+def test_round_trip_with_index(tmp_path, table):
+    path = tmp_path / 'table.hdf'
+    indexed = table.set_index(['scenario', 'year', 'input_draw'])
+    storage.write_table(indexed, path)
+    pd.testing.assert_frame_equal(storage.read_table(path), indexed)
+
+
+def test_filters_use_column_values(tmp_path, table):
+    path = tmp_path / 'table.hdf'
+    storage.write_table(table, path)
+    result = storage.read_table(path, year=2021, scenario='baseline', risk_group='exposed_to_hhtb')
+    expected = table[(table.year == 2021) & (table.scenario == 'baseline') & (table.risk_group == 'exposed_to_hhtb')]
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
+
+
+def test_empty_selection_keeps_schema(tmp_path, table):
+    path = tmp_path / 'table.hdf'
+    storage.write_table(table, path)
+    result = storage.read_table(path, year=1990)
+    assert result.empty
+    assert list(result.columns) == list(table.columns)
+
+
+def test_unknown_filter_column(tmp_path, table):
+    path = tmp_path / 'table.hdf'
+    storage.write_table(table, path)
+    with pytest.raises(ValueError):
+        storage.read_table(path, sex='male')
+
+
+def test_labels_stored_as_categories(tmp_path, table):
+    path = tmp_path / 'table.hdf'
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        storage.write_table(table, path)
+    with pd.HDFStore(str(path), mode='r') as store:
+        stored = store.get(store.select(storage.PARTITIONS_KEY).key.iloc[0])
+    assert isinstance(stored['measure'].dtype, pd.CategoricalDtype)
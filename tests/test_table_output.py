@@ -0,0 +1,155 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_csu_ltbi.results_processing import table_output, utilities
+
+KEYS = {
+    'scenario': ['baseline', '3HP_scale_up', '6H_scale_up'],
+    'year': ['2020', '2021'],
+    'age': ['0_to_5', '5_to_15'],
+    'sex': ['male', 'female'],
+    'risk_group': ['all_population', 'plwhiv'],
+    'treatment_group': ['untreated', '3HP_adherent', '6H_adherent'],
+    'draw': range(5),
+}
+VALUE_COLUMNS = ['mean', 'ub', 'lb', 'averted_mean', 'averted_ub', 'averted_lb']
+
+
+def pivot_and_summarize(data, index_columns, prefix=''):
+    """Draw summaries from the wide table, as computed before ``summarize_draws``."""
+    data = (data
+            .set_index(index_columns + ['draw'])
+            .unstack())
+    data.columns = data.columns.droplevel()
+    data.columns.name = None
+    mean = data.mean(axis=1)
+    ub = np.percentile(data, 97.5, axis=1)
+    lb = np.percentile(data, 2.5, axis=1)
+    data[prefix + 'mean'] = mean
+    data[prefix + 'ub'] = ub
+    data[prefix + 'lb'] = lb
+    return data[[c for c in data.columns if isinstance(c, str)]]
+
+
+def get_delta(data, join_columns):
+    baseline = data[data.scenario == 'baseline'].drop(columns='scenario').set_index(join_columns)
+    return (baseline - data.set_index(join_columns + ['scenario'])).reset_index()
+
+
+def scale_data(base_data, data_to_scale, join_columns, agg_columns=(), py_multiplier=1):
+    agg_data = base_data.groupby(join_columns).value.sum()
+    scaled = (py_multiplier * data_to_scale.set_index(join_columns + list(agg_columns)).value / agg_data).reset_index()
+    scaled.loc[np.abs(scaled.value) < 1e-10, 'value'] = 0
+    return scaled
+
+
+def baseline_rates(counts, person_time, outcome, by_cause):
+    """Rates per 100,000 person years and their deltas, as computed with
+    index-aligned joins before ``AlignmentIndex``."""
+    counts = counts.assign(location='peru', outcome=outcome)
+    counts = utilities.aggregate_over_treatment_group(counts)
+    extra = ['cause'] if by_cause else []
+    delta_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'treatment_group', 'draw'] + extra
+    delta = get_delta(counts, delta_columns)
+    pt = person_time.drop(columns='cause').assign(location='peru', outcome=outcome)
+    pt = utilities.aggregate_over_treatment_group(pt)
+    scale_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'treatment_group', 'draw', 'scenario']
+    summaries = []
+    for prefix, data in [('', counts), ('averted_', delta)]:
+        scaled = scale_data(pt, data, scale_columns, extra, py_multiplier=100_000)
+        if by_cause:
+            scaled['outcome'] = f'{outcome}_due_to_' + scaled.cause
+            scaled = scaled.drop(columns='cause')
+        summaries.append(pivot_and_summarize(scaled, table_output.INDEX_COLUMNS, prefix=prefix))
+    return pd.concat(summaries, axis=1)
+
+
+def make_counts(seed, **extra_keys):
+    keys = {**KEYS, **extra_keys}
+    index = pd.MultiIndex.from_product(list(keys.values()), names=list(keys))
+    values = np.random.RandomState(seed).gamma(2., 50., len(index))
+    return pd.DataFrame({'value': values}, index=index).reset_index()
+
+
+@pytest.fixture
+def measure_data():
+    person_time = make_counts(0, cause=['all_causes'])
+    person_time['value'] *= 1000
+    ylds = make_counts(3, cause=['activetb'])
+    return SimpleNamespace(person_time=person_time, deaths=make_counts(1, cause=['activetb', 'other_causes']),
+                           ylls=make_counts(2, cause=['activetb', 'other_causes']), ylds=ylds,
+                           tb_cases=make_counts(4))
+
+
+def assert_tables_equal(result, expected):
+    result = result.reorder_levels(table_output.INDEX_COLUMNS).sort_index()[VALUE_COLUMNS]
+    expected = expected.reorder_levels(table_output.INDEX_COLUMNS).sort_index()[VALUE_COLUMNS]
+    pd.testing.assert_frame_equal(result, expected, check_names=False, check_index_type=False)
+
+
+@pytest.mark.parametrize('quantiles', [None, {'upper': 90, 'median': 50, 'lower': 10}])
+def test_summarize_draws_matches_pivot(quantiles):
+    data = make_counts(0)
+    index_columns = ['scenario', 'year', 'age', 'sex', 'risk_group', 'treatment_group']
+    result = utilities.summarize_draws(data, index_columns, prefix='x_', quantiles=quantiles)
+    wide = data.set_index(index_columns + ['draw']).value.unstack()
+    quantiles = utilities.DEFAULT_QUANTILES if quantiles is None else quantiles
+    expected = pd.DataFrame({'x_mean': wide.mean(axis=1),
+                             **{'x_' + name: np.percentile(wide, q, axis=1) for name, q in quantiles.items()}})
+    pd.testing.assert_frame_equal(result, expected, check_names=False)
+
+
+def test_summarize_draws_missing_draw():
+    data = make_counts(0).iloc[1:]
+    index_columns = ['scenario', 'year', 'age', 'sex', 'risk_group', 'treatment_group']
+    result = utilities.summarize_draws(data, index_columns)
+    expected = pivot_and_summarize(data, index_columns)
+    pd.testing.assert_frame_equal(result[['mean', 'ub', 'lb']], expected[['mean', 'ub', 'lb']],
+                                  check_names=False, check_column_type=False)
+    assert result[['ub', 'lb']].isnull().sum().tolist() == [1, 1]
+
+
+def test_coverage_table(measure_data):
+    pt = measure_data.person_time.drop(columns='cause').assign(location='peru', outcome='treatment_coverage')
+    delta = get_delta(pt, ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'draw', 'treatment_group'])
+    scale_columns = ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'draw', 'scenario']
+    expected = pd.concat([
+        pivot_and_summarize(scale_data(pt, pt, scale_columns, ['treatment_group']), table_output.INDEX_COLUMNS),
+        pivot_and_summarize(scale_data(pt, delta, scale_columns, ['treatment_group']), table_output.INDEX_COLUMNS,
+                            prefix='averted_'),
+    ], axis=1)
+    assert_tables_equal(table_output.make_coverage_table(measure_data, 'peru'), expected)
+
+
+def test_person_time_table(measure_data):
+    pt = measure_data.person_time.drop(columns='cause').assign(location='peru', outcome='person_time')
+    pt = utilities.aggregate_over_treatment_group(pt)
+    delta = get_delta(pt, ['outcome', 'location', 'year', 'age', 'sex', 'risk_group', 'draw', 'treatment_group'])
+    expected = pd.concat([pivot_and_summarize(pt, table_output.INDEX_COLUMNS),
+                          pivot_and_summarize(delta, table_output.INDEX_COLUMNS, prefix='averted_')], axis=1)
+    assert_tables_equal(table_output.make_person_time_table(measure_data, 'peru'), expected)
+
+
+def test_deaths_table(measure_data):
+    expected = baseline_rates(measure_data.deaths, measure_data.person_time, 'deaths', by_cause=True)
+    assert_tables_equal(table_output.make_deaths_table(measure_data, 'peru'), expected)
+
+
+def test_dalys_table(measure_data):
+    ylls, ylds = measure_data.ylls, measure_data.ylds
+    columns = [c for c in ylls.columns if c != 'value']
+    ylls = ylls.set_index(columns)
+    counts = (ylls + ylds.set_index(columns).reindex(ylls.index).fillna(0)).reset_index()
+    expected = baseline_rates(counts, measure_data.person_time, 'dalys', by_cause=True)
+    assert_tables_equal(table_output.make_dalys_table(measure_data, 'peru'), expected)
+
+
+def test_shared_alignment_index(measure_data):
+    alignment = table_output.AlignmentIndex(measure_data.person_time)
+    assert_tables_equal(table_output.make_deaths_table(measure_data, 'peru', alignment),
+                        table_output.make_deaths_table(measure_data, 'peru'))
+    with pytest.raises(ValueError):
+        alignment.to_array(make_counts(0, cause=['x']).assign(year='2030'))
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from vivarium_csu_ltbi import globals as ltbi_globals
+from vivarium_csu_ltbi.verification_and_validation import loader
+
+COLUMNS = [
+    'death_due_to_activetb_positive_hiv_in_2020_among_male_in_age_group_1_to_4_exposed_to_hhtb_treatment_group_untreated',
+    'death_due_to_activetb_positive_hiv_in_2021_among_male_in_age_group_1_to_4_unexposed_to_hhtb_treatment_group_6H_adherent',
+    'death_due_to_activetb_susceptible_hiv_in_2020_among_female_in_age_group_5_to_9_exposed_to_hhtb_treatment_group_untreated',
+    'person_time_in_2020_among_male_in_age_group_1_to_4_exposed_to_hhtb_treatment_group_untreated',
+    'person_time_in_2020_among_female_in_age_group_5_to_9_exposed_to_hhtb_treatment_group_untreated',
+]
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    draws, seeds = [0, 1, 2], [10, 11]
+    rows = pd.DataFrame([(d, s, sc) for d in draws for s in seeds for sc in ltbi_globals.SCENARIOS],
+                        columns=[ltbi_globals.INPUT_DRAW_COLUMN, ltbi_globals.RANDOM_SEED_COLUMN,
+                                 ltbi_globals.SCENARIO_COLUMN])
+    rows = rows.iloc[:-1]  # Draw 2 is missing a scenario
+    values = pd.DataFrame(np.random.RandomState(0).poisson(5, (len(rows), len(COLUMNS))).astype(float),
+                          columns=COLUMNS)
+    pd.concat([rows, values], axis=1).to_hdf(str(tmp_path / 'output.hdf'), key='data')
+    with (tmp_path / 'keyspace.yaml').open('w') as f:
+        yaml.dump({ltbi_globals.INPUT_DRAW_COLUMN: draws, ltbi_globals.RANDOM_SEED_COLUMN: seeds,
+                   ltbi_globals.SCENARIO_COLUMN: ltbi_globals.SCENARIOS}, f)
+    return tmp_path
+
+
+def test_get_column_schema():
+    schema = loader.get_column_schema(COLUMNS + ['input_draw'])
+    assert list(schema.index) == COLUMNS
+    first = schema.iloc[0]
+    assert first['measure'] == 'death'
+    assert first['cause'] == 'activetb_positive_hiv'
+    assert first['year'] == '2020'
+    assert first['sex'] == 'Male'
+    assert first['age_group'] == '1_to_4'
+    assert first['risk_group'] == 'exposed_to_hhtb'
+    assert first['treatment_group'] == 'untreated'
+    assert pd.isnull(schema.iloc[3]['cause'])
+
+
+def test_incomplete_draws_dropped(output_dir):
+    data = loader.load_results_from_output_dir(output_dir)
+    assert sorted(data.index.get_level_values(ltbi_globals.INPUT_DRAW_COLUMN).unique()) == [0, 1]
+    assert sorted(data.index.get_level_values('scenario').unique()) == sorted(ltbi_globals.SCENARIOS)
+
+
+def test_read_output_columns(output_dir):
+    expected = pd.read_hdf(str(output_dir / 'output.hdf'))
+    columns = [ltbi_globals.SCENARIO_COLUMN, COLUMNS[2], COLUMNS[0]]
+    pd.testing.assert_frame_equal(loader.read_output_columns(output_dir / 'output.hdf', columns),
+                                  expected[columns], check_dtype=False)
+
+
+def test_load_measures_matches_standardize_shape(output_dir):
+    data = loader.load_results_from_output_dir(output_dir)
+    expected = pd.concat([loader.standardize_shape(data, 'death_due_to_activetb_positive_hiv'),
+                          loader.standardize_shape(data, 'person_time')], ignore_index=True, sort=False)
+    expected['cause'] = expected['cause'].fillna('none')
+    expected['age_group'] = expected['age_group'].str.split('_exposed|_unexposed').str[0]
+    expected = expected.groupby(loader.TEMPLATE_COLUMNS).value.sum()
+
+    result = loader.load_measures(output_dir, ['death', 'person_time'], causes=['activetb_positive_hiv'])
+    result = result.astype({c: object for c in ['cause', 'sex', 'age_group', 'measure']})
+    result['cause'] = result['cause'].fillna('none')
+    result = result.set_index(loader.TEMPLATE_COLUMNS).value.sort_index()
+
+    pd.testing.assert_series_equal(result, expected.sort_index(), check_dtype=False, check_index_type=False)